@@ -5,9 +5,10 @@ import os
 
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
+import hmac
 import logging
+import math
 import threading
-import time
 from multiprocessing import Process
 
 from flask import (
@@ -19,11 +20,26 @@ from flask import (
     flash,
     session,
     jsonify,
+    abort,
+    send_file,
+    Response,
+    stream_with_context,
 )
 from werkzeug.security import check_password_hash, generate_password_hash
 from dotenv import load_dotenv
 
+import catalog_crawler
 import config
+import hls_variants
+import host_guard
+import job_logs
+import job_registry
+import library_index
+import memory_budget
+import poster_cache
+import scheduler
+import series_watcher
+import settings_cache
 from database import (
     get_db,
     setup_database,
@@ -45,9 +61,6 @@ if app.logger.handlers:
     app.logger.removeHandler(app.logger.handlers[0])
 app.logger = logger
 
-active_processes = {}
-auto_download_manager_state = {"enabled": False, "thread": None}
-
 
 def sync_password_hash_from_env():
     logger.info(
@@ -67,26 +80,36 @@ def sync_password_hash_from_env():
                 ("ADMIN_PASSWORD_HASH", env_hash),
             )
             db.commit()
+        settings_cache.invalidate()
         logger.info("Parola hash senkronizasyonu tamamlandı.")
     except Exception as e:
         logger.error(f"Parola hash senkronizasyonu sırasında hata: {e}", exc_info=True)
 
 
-def auto_download_manager():
-    """Arka planda çalışarak otomatik indirmeleri yöneten thread."""
-    logger.info("Otomatik indirme yöneticisi thread'i başlatıldı.")
-    while auto_download_manager_state.get("enabled", False):
-        try:
-            with app.app_context():
-                services.run_auto_download_cycle(active_processes)
-        except Exception as e:
-            logger.error(f"Otomatik indirme yöneticisinde hata: {e}", exc_info=True)
-        time.sleep(config.AUTO_DOWNLOAD_POLL_INTERVAL)
-    logger.info("Otomatik indirme yöneticisi thread'i durduruldu.")
+def boot():
+    """
+    Veritabanını ve varsayılan ayarları hazırlar. Geliştirme sunucusunda app.py,
+    üretimde wsgi.py tarafından (gunicorn worker'ları fork edilmeden önce) bir
+    kez çağrılır.
+    """
+    with app.app_context():
+        setup_database()
+        init_settings()
+    sync_password_hash_from_env()
+    # Önceki davranışla uyumlu olarak otomatik indirme her açılışta pasif başlar.
+    update_setting("AUTO_DOWNLOAD_ENABLED", "false")
+    downloads_folder = get_setting("DOWNLOADS_FOLDER")
+    if downloads_folder and not os.path.exists(downloads_folder):
+        os.makedirs(downloads_folder)
+
+
+WORKER_API_ENDPOINTS = ["worker_claim", "worker_heartbeat", "worker_complete"]
 
 
 @app.before_request
 def require_login():
+    if request.endpoint in WORKER_API_ENDPOINTS:
+        return None
     if not session.get("logged_in") and request.endpoint not in ["login", "static"]:
         return redirect(url_for("login"))
 
@@ -143,18 +166,26 @@ def add_list():
     if config.ALLOWED_DOMAIN not in list_url:
         flash(f"Lütfen geçerli bir {config.ALLOWED_DOMAIN} linki girin.", "warning")
         return redirect(url_for("index"))
-    thread = threading.Thread(
-        target=services.add_movies_from_list_page_async, args=(app, list_url)
-    )
+    if request.form.get("crawl"):
+        catalog_crawler.register(get_db(), list_url)
+        thread = threading.Thread(
+            target=catalog_crawler.crawl_async, args=(app, list_url)
+        )
+        message = "Liste tüm sayfalarıyla arka planda taranıyor; yeni filmler düzenli olarak eklenecek."
+    else:
+        thread = threading.Thread(
+            target=services.add_movies_from_list_page_async, args=(app, list_url)
+        )
+        message = "Toplu ekleme işlemi arka planda başlatıldı..."
     thread.daemon = True
     thread.start()
-    flash("Toplu ekleme işlemi arka planda başlatıldı...", "info")
+    flash(message, "info")
     return redirect(url_for("index"))
 
 
 @app.route("/movie/start/<int:movie_id>", methods=["POST"])
 def start_movie_download(movie_id):
-    success, message = services.start_download(movie_id, "movie", active_processes)
+    success, message = services.start_download(movie_id, "movie")
     flash(message, "info" if success else "warning")
     return redirect(url_for("index"))
 
@@ -166,9 +197,23 @@ def stop_movie_download(movie_id):
     return redirect(url_for("index"))
 
 
+@app.route("/movie/to_front/<int:movie_id>", methods=["POST"])
+def movie_to_front(movie_id):
+    success, message = services.move_to_front(movie_id, "movie")
+    flash(message, "info" if success else "warning")
+    return redirect(url_for("index"))
+
+
+@app.route("/movie/priority/<int:movie_id>", methods=["POST"])
+def set_movie_priority(movie_id):
+    success, message = services.set_priority(movie_id, "movie", request.form.get("priority"))
+    flash(message, "info" if success else "warning")
+    return redirect(url_for("index"))
+
+
 @app.route("/movie/delete/<int:movie_id>", methods=["POST"])
 def delete_movie(movie_id):
-    services.delete_record(movie_id, "movie", active_processes)
+    services.delete_record(movie_id, "movie")
     flash("Film kaydı başarıyla silindi.", "success")
     return redirect(url_for("index"))
 
@@ -203,7 +248,7 @@ def add_series():
 
 @app.route("/series/delete/<int:series_id>", methods=["POST"])
 def delete_series(series_id):
-    success, message = services.delete_series_record(series_id, active_processes)
+    success, message = services.delete_series_record(series_id)
     flash(message, "success" if success else "danger")
     return redirect(url_for("index"))
 
@@ -219,7 +264,7 @@ def start_series_download(series_id):
         # Bu, anında bir indirme başlatılmasını sağlar.
         try:
             logger.info(f"Kuyruğa ekleme sonrası indirme döngüsü tetikleniyor...")
-            services.run_auto_download_cycle(active_processes)
+            services.run_auto_download_cycle()
         except Exception as e:
             logger.error(f"İndirme döngüsü tetiklenirken hata: {e}", exc_info=True)
 
@@ -227,9 +272,46 @@ def start_series_download(series_id):
     return redirect(url_for("index"))
 
 
+@app.route("/series/to_front/<int:series_id>", methods=["POST"])
+def series_to_front(series_id):
+    success, message = services.move_to_front(series_id, "series")
+    flash(message, "info" if success else "warning")
+    return redirect(url_for("index"))
+
+
+@app.route("/series/priority/<int:series_id>", methods=["POST"])
+def set_series_priority(series_id):
+    success, message = services.set_priority(series_id, "series", request.form.get("priority"))
+    flash(message, "info" if success else "warning")
+    return redirect(url_for("index"))
+
+
+@app.route("/series/quality/<int:series_id>", methods=["POST"])
+def set_series_quality(series_id):
+    success, message = services.set_series_quality_policy(
+        series_id, request.form.get("quality_policy")
+    )
+    flash(message, "info" if success else "warning")
+    return redirect(url_for("index"))
+
+
+@app.route("/series/watch/<int:series_id>", methods=["POST"])
+def set_series_watch(series_id):
+    success, message = series_watcher.set_watch(series_id, request.form.get("watch") == "1")
+    flash(message, "info" if success else "warning")
+    return redirect(url_for("index"))
+
+
+@app.route("/episode/to_front/<int:episode_id>", methods=["POST"])
+def episode_to_front(episode_id):
+    success, message = services.move_to_front(episode_id, "episode")
+    flash(message, "info" if success else "warning")
+    return redirect(url_for("index"))
+
+
 @app.route("/episode/start/<int:episode_id>", methods=["POST"])
 def start_episode_download(episode_id):
-    success, message = services.start_download(episode_id, "episode", active_processes)
+    success, message = services.start_download(episode_id, "episode")
     flash(message, "info" if success else "warning")
     return redirect(url_for("index"))
 
@@ -243,7 +325,7 @@ def stop_episode_download(episode_id):
 
 @app.route("/episode/delete/<int:episode_id>", methods=["POST"])
 def delete_episode(episode_id):
-    services.delete_record(episode_id, "episode", active_processes)
+    services.delete_record(episode_id, "episode")
     flash("Bölüm kaydı başarıyla silindi.", "success")
     return redirect(url_for("index"))
 
@@ -266,7 +348,43 @@ def settings():
             "SERIES_FILENAME_TEMPLATE", request.form["series_filename_template"], db
         )
         update_setting("CONCURRENT_DOWNLOADS", request.form["concurrent_downloads"], db)
+        update_setting(
+            "RESOLVER_CONCURRENCY", request.form.get("resolver_concurrency", "1"), db
+        )
         update_setting("SPEED_LIMIT", request.form["speed_limit"], db)
+        update_setting("STAGING_FOLDER", request.form["staging_folder"].strip(), db)
+        update_setting("MOVER_CONCURRENCY", request.form["mover_concurrency"], db)
+        update_setting("MEMORY_BUDGET", request.form.get("memory_budget", "").strip(), db)
+        update_setting("MOVER_SPEED_LIMIT", request.form["mover_speed_limit"], db)
+        postprocess_format = request.form.get("postprocess_format", "")
+        update_setting(
+            "POSTPROCESS_FORMAT",
+            postprocess_format if postprocess_format in ("verify", "mp4", "mkv") else "",
+            db,
+        )
+        update_setting(
+            "POSTPROCESS_CONCURRENCY", request.form.get("postprocess_concurrency", "1"), db
+        )
+        update_setting(
+            "DUPLICATE_POLICY",
+            "flag" if request.form.get("duplicate_policy") == "flag" else "skip",
+            db,
+        )
+        series_watch = request.form.get("series_watch", "all")
+        update_setting(
+            "SERIES_WATCH",
+            series_watch if series_watch in series_watcher.WATCH_MODES else "all",
+            db,
+        )
+        update_setting(
+            "SERIES_WATCH_INTERVAL", request.form.get("series_watch_interval", "6"), db
+        )
+        quality_policy = request.form.get("quality_policy", "").strip()
+        try:
+            hls_variants.parse_quality_policy(quality_policy)
+            update_setting("QUALITY_POLICY", quality_policy, db)
+        except ValueError as e:
+            flash(f"{e} Kalite politikası değiştirilmedi.", "warning")
         settings_updated = True
 
         current_password = request.form.get("current_password")
@@ -292,56 +410,274 @@ def settings():
         if settings_updated:
             flash("Ayarlar başarıyla kaydedildi.", "success")
         db.commit()
+        settings_cache.invalidate()
         return redirect(url_for("settings"))
 
     current_settings = get_all_settings(db)
-    return render_template("settings.html", settings=current_settings)
+    return render_template(
+        "settings.html",
+        settings=current_settings,
+        crawls=catalog_crawler.list_crawls(db),
+    )
+
+
+@app.route("/crawl/delete", methods=["POST"])
+def delete_crawl():
+    catalog_crawler.remove(get_db(), request.form["list_url"])
+    flash("Liste artık taranmayacak.", "info")
+    return redirect(url_for("settings"))
+
+
+@app.route("/library/scan", methods=["POST"])
+def scan_library():
+    thread = threading.Thread(target=library_index.run_scan_async, args=(app,))
+    thread.daemon = True
+    thread.start()
+    flash("Kütüphane taraması arka planda başlatıldı.", "info")
+    return redirect(url_for("settings"))
 
 
 @app.route("/toggle_auto_download", methods=["POST"])
 def toggle_auto_download():
-    is_enabled = auto_download_manager_state["enabled"]
-    if is_enabled:
-        auto_download_manager_state["enabled"] = False
-        if auto_download_manager_state["thread"]:
-            auto_download_manager_state["thread"].join()  # Thread'in bitmesini bekle
+    if scheduler.auto_download_enabled():
+        scheduler.set_auto_download(False)
         flash("Otomatik indirme pasif hale getirildi.", "info")
-        logger.info("Otomatik indirme durumu: PASİF")
     else:
-        auto_download_manager_state["enabled"] = True
-        thread = threading.Thread(target=auto_download_manager, daemon=True)
-        auto_download_manager_state["thread"] = thread
-        thread.start()
+        scheduler.set_auto_download(True)
+        # Liderin bir sonraki turunu beklemeden boş slotları hemen doldur.
+        try:
+            services.run_auto_download_cycle()
+        except Exception as e:
+            logger.error(f"İndirme döngüsü tetiklenirken hata: {e}", exc_info=True)
         flash("Otomatik indirme aktif hale getirildi.", "info")
-        logger.info("Otomatik indirme durumu: AKTİF")
     return redirect(url_for("index"))
 
 
+# --- UZAK WORKER API ---
+def _worker_authorized():
+    token = request.headers.get("X-Worker-Token", "")
+    return bool(config.WORKER_TOKEN) and hmac.compare_digest(token, config.WORKER_TOKEN)
+
+
+def _append_remote_log(item_type, item_id, payload):
+    """Uzak worker'ın heartbeat ile gönderdiği log satırlarını iş arabelleğine ekler."""
+    lines = payload.get("log_lines")
+    if isinstance(lines, list) and lines:
+        job_logs.append(
+            job_logs.job_key(item_type, item_id),
+            [str(line) for line in lines[-config.JOB_LOG_LINES :]],
+        )
+
+
+def _worker_id():
+    payload = request.get_json(silent=True) or {}
+    return (payload.get("worker_id") or "").strip()[:100], payload
+
+
+@app.route("/api/worker/claim", methods=["POST"])
+def worker_claim():
+    if not _worker_authorized():
+        return jsonify({"error": "Unauthorized"}), 401
+    worker_id, _ = _worker_id()
+    if not worker_id:
+        return jsonify({"error": "worker_id gerekli"}), 400
+    job = services.claim_next_job(worker_id)
+    if not job:
+        return "", 204
+    return jsonify(job)
+
+
+@app.route(
+    "/api/worker/jobs/<any(movie, episode):item_type>/<int:item_id>/heartbeat",
+    methods=["POST"],
+)
+def worker_heartbeat(item_type, item_id):
+    if not _worker_authorized():
+        return jsonify({"error": "Unauthorized"}), 401
+    worker_id, payload = _worker_id()
+    progress = payload.get("progress")
+    if progress is not None:
+        try:
+            progress = float(progress)
+        except (TypeError, ValueError):
+            progress = None
+        if progress is None or not math.isfinite(progress):
+            return jsonify({"error": "progress sayı olmalı"}), 400
+    lease_expires_at = services.renew_job_lease(
+        item_id,
+        item_type,
+        worker_id,
+        status=payload.get("status"),
+        progress=progress,
+    )
+    if lease_expires_at is None:
+        return jsonify({"error": "Kira kaybedildi"}), 409
+    _append_remote_log(item_type, item_id, payload)
+    return jsonify({"lease_expires_at": lease_expires_at})
+
+
+@app.route(
+    "/api/worker/jobs/<any(movie, episode):item_type>/<int:item_id>/complete",
+    methods=["POST"],
+)
+def worker_complete(item_type, item_id):
+    if not _worker_authorized():
+        return jsonify({"error": "Unauthorized"}), 401
+    worker_id, payload = _worker_id()
+    recorded = services.complete_remote_job(
+        item_id,
+        item_type,
+        worker_id,
+        bool(payload.get("success")),
+        payload.get("message") or "",
+        payload.get("filepath"),
+        payload.get("quality_info"),
+    )
+    if not recorded:
+        return jsonify({"error": "Kira kaybedildi"}), 409
+    _append_remote_log(item_type, item_id, payload)
+    job_logs.finish(job_logs.job_key(item_type, item_id))
+    return jsonify({"ok": True})
+
+
 @app.route("/status")
 def status_api():
     if not session.get("logged_in"):
         return jsonify({"error": "Unauthorized"}), 401
 
-    movies_data = services.get_all_movies_status()
-    series_data = services.get_all_series_status()
-
-    return jsonify(
-        {
-            "movies": movies_data,
-            "series": series_data,
-            "auto_download_enabled": auto_download_manager_state["enabled"],
-        }
+    # Panel listeleri artık /api/movies ve /api/series'ten sayfalı olarak alır;
+    # lite=1 tüm kütüphaneyi serileştirmeden yalnızca genel durumu döndürür.
+    memory_usage = memory_budget.sample(job_registry.live_jobs(get_db()))
+    status = {
+        "auto_download_enabled": scheduler.auto_download_enabled(),
+        "jobs": memory_usage,
+        "memory": memory_budget.summary(memory_usage),
+        "hosts": host_guard.states(get_db()),
+    }
+    if request.args.get("lite") == "1":
+        return jsonify(status)
+
+    status["movies"] = services.get_all_movies_status()
+    status["series"] = services.get_all_series_status()
+    return jsonify(status)
+
+
+@app.route("/poster/<any(movie, series):item_type>/<int:item_id>")
+def poster(item_type, item_id):
+    table = "movies" if item_type == "movie" else "series"
+    row = get_db().execute(
+        f"SELECT poster_url FROM {table} WHERE id = ?", (item_id,)
+    ).fetchone()
+    if not row or not row["poster_url"]:
+        abort(404)
+    path = poster_cache.lookup(row["poster_url"])
+    if path is None:
+        # Henüz önbellekte değil: arka planda indir, bu seferlik yer tutucu göster.
+        # Yer tutucu tarayıcıda saklanmaz; sonraki istek önbellekteki posteri alır.
+        poster_cache.cache_poster_async(row["poster_url"])
+        response = Response(poster_cache.PLACEHOLDER_SVG, mimetype="image/svg+xml")
+        response.headers["Cache-Control"] = "no-store"
+        return response
+    response = send_file(
+        path,
+        mimetype=poster_cache.guess_mimetype(path),
+        etag=f"{poster_cache.cache_key(row['poster_url'])}-{os.path.getsize(path)}",
+        max_age=31536000,
+        conditional=True,
+    )
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+
+@app.route("/job/<any(movie, episode):item_type>/<int:item_id>/log")
+def job_log(item_type, item_id):
+    """
+    İşin log arabelleğini döndürür. follow=1 ile Server-Sent Events olarak canlı
+    akış yapar; iş bittiğinde 'end' olayı gönderilip akış kapanır.
+    """
+    key = job_logs.job_key(item_type, item_id)
+    lines, finished = job_logs.read_since(key)
+    archived = None if lines else job_logs.load_archived(key)
+
+    if request.args.get("follow") != "1":
+        text_lines = archived or [line for _, line in lines]
+        if not text_lines:
+            abort(404)
+        return Response("\n".join(text_lines) + "\n", mimetype="text/plain")
+
+    table = "movies" if item_type == "movie" else "episodes"
+
+    def generate():
+        after_seq = 0
+        for line in archived or []:
+            yield f"data: {line}\n\n"
+        while True:
+            new_lines, done = job_logs.wait_for_lines(key, after_seq, timeout=15)
+            for seq, line in new_lines:
+                after_seq = seq
+                yield f"data: {line}\n\n"
+            if done:
+                break
+            if not new_lines:
+                row = get_db().execute(
+                    f"SELECT status FROM {table} WHERE id = ?", (item_id,)
+                ).fetchone()
+                if not row or row["status"] not in services.WORKING_STATUSES:
+                    break
+                yield ": keepalive\n\n"
+        yield "event: end\ndata: \n\n"
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
 
 
+@app.route("/api/movies")
+def movies_api():
+    if not session.get("logged_in"):
+        return jsonify({"error": "Unauthorized"}), 401
+    args = request.args
+    try:
+        result = services.query_movies(
+            page=args.get("page", 1),
+            per_page=args.get("per_page", services.LIST_DEFAULT_PER_PAGE),
+            sort=args.get("sort", "created_at"),
+            order=args.get("order", "desc"),
+            status=args.get("status") or None,
+            year=args.get("year") or None,
+            genre=args.get("genre") or None,
+            added_from=args.get("added_from") or None,
+            added_to=args.get("added_to") or None,
+            q=args.get("q") or None,
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(result)
+
+
+@app.route("/api/series")
+def series_api():
+    if not session.get("logged_in"):
+        return jsonify({"error": "Unauthorized"}), 401
+    args = request.args
+    try:
+        result = services.query_series(
+            page=args.get("page", 1),
+            per_page=args.get("per_page", services.LIST_DEFAULT_PER_PAGE),
+            status=args.get("status") or None,
+            q=args.get("q") or None,
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(result)
+
+
 if __name__ == "__main__":
-    with app.app_context():
-        setup_database()
-        init_settings()
-    sync_password_hash_from_env()
-    with app.app_context():
-        downloads_folder = get_setting("DOWNLOADS_FOLDER")
-        if downloads_folder and not os.path.exists(downloads_folder):
-            os.makedirs(downloads_folder)
+    # Geliştirme sunucusu; üretimde gunicorn ile wsgi.py kullanılır.
+    boot()
+    scheduler.start(app)
     logger.info("Uygulama başlatılıyor...")
     app.run(debug=True, host="0.0.0.0", port=5000, use_reloader=False)
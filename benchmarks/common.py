@@ -0,0 +1,76 @@
+# @author: MembaCo.
+
+"""Benchmark araçlarının ortak yardımcıları (boyut ayrıştırma, yüzdelikler, baseline)."""
+
+import argparse
+import json
+import math
+import re
+
+
+def parse_size(value):
+    """'512K', '4M', '1.5G' gibi değerleri bayta çevirir."""
+    match = re.fullmatch(r"\s*([0-9.]+)\s*([KMG]?)B?\s*", str(value), re.IGNORECASE)
+    if not match:
+        raise argparse.ArgumentTypeError(f"Geçersiz boyut: {value}")
+    multiplier = {"": 1, "K": 1024, "M": 1024**2, "G": 1024**3}
+    return int(float(match.group(1)) * multiplier[match.group(2).upper()])
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    # En yakın sıra (nearest-rank): pct * n / 100'ün tavanı; çarpım önce yapılır ki
+    # 0.95 gibi kesirlerin kayan nokta hatası sırayı kaydırmasın.
+    rank = max(0, min(len(ordered) - 1, math.ceil(pct * len(ordered) / 100) - 1))
+    return ordered[rank]
+
+
+def summarize(values):
+    return {
+        "count": len(values),
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+        "max": max(values) if values else None,
+    }
+
+
+def fmt(value):
+    return "-" if value is None else f"{value:.3f}"
+
+
+def load_json(path):
+    if not path:
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_json(path, results):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2, ensure_ascii=False)
+
+
+def _lookup(results, dotted):
+    value = results
+    for part in dotted.split("."):
+        value = value.get(part) if isinstance(value, dict) else None
+    return value
+
+
+def compare_to_baseline(results, baseline, metrics):
+    """
+    Sonuçları önceki bir çalıştırmayla karşılaştırıp yazdırır.
+    metrics: (noktalı_anahtar, yüksek_daha_iyi_mi) çiftleri.
+    """
+    print("\nBaseline karşılaştırması:")
+    for metric, higher_is_better in metrics:
+        old, new = _lookup(baseline, metric), _lookup(results, metric)
+        if not old or new is None:
+            continue
+        delta = (new - old) / old * 100
+        better = delta > 0 if higher_is_better else delta < 0
+        marker = "=" if abs(delta) < 1 else ("+" if better else "-")
+        print(f"  [{marker}] {metric:34s} {fmt(old)} -> {fmt(new)} ({delta:+.1f}%)")
@@ -0,0 +1,311 @@
+# @author: MembaCo.
+
+"""
+Uçtan uca çevrimdışı benchmark: sıraya ekleme → kaynak bulma → indirme.
+
+Yerel sahte siteyi (fake_site.py) başlatır, geçici bir DATA_DIR içinde uygulamanın
+gerçek servis ve worker kodunu çalıştırır; verim, gecikme yüzdelikleri ve kaynak
+kullanımını raporlar. Sonuçlar JSON olarak kaydedilip sonraki çalıştırmalarda
+temel (baseline) olarak karşılaştırılabilir.
+
+Örnek:
+    python benchmarks/e2e_bench.py --movies 10 --episodes 6 --concurrency 3 \\
+        --segments 30 --segment-size 512K --bandwidth 4M --save results.json
+    python benchmarks/e2e_bench.py --baseline results.json
+
+Chrome kurulu olmayan makinelerde --resolver direct, tarayıcı yerine oynatıcı
+sayfasını doğrudan okuyan hafif bir çözücü kullanır.
+"""
+
+import argparse
+import multiprocessing
+import os
+import re
+import resource
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+from common import (  # noqa: E402
+    compare_to_baseline,
+    fmt,
+    load_json,
+    parse_size,
+    save_json,
+    summarize,
+)
+from fake_site import FakeSiteServer, HlsProfile, SiteFixture  # noqa: E402
+
+WORKING_STATUSES = ("Kaynak aranıyor...", "Hazır", "İndiriliyor", "İşleniyor", "Taşınıyor")
+
+
+def direct_manifest_resolver(user_agent):
+    """Tarayıcı olmadan sahte sitenin oynatıcı akışını izleyen çözücü."""
+    import requests
+
+    def resolve(target_url):
+        headers = {"User-Agent": user_agent, "Referer": target_url}
+        page = requests.get(target_url, headers=headers, timeout=20).text
+        player_match = re.search(r'frame\.src = "([^"]+)"', page)
+        if not player_match:
+            return None, None, None
+        base = re.match(r"https?://[^/]+", target_url).group(0)
+        player = requests.get(base + player_match.group(1), headers=headers, timeout=20)
+        manifest_match = re.search(r'data-manifest="([^"]+)"', player.text)
+        if not manifest_match:
+            return None, None, None
+        return base + manifest_match.group(1), headers, []
+
+    return resolve
+
+
+def run(args):
+    work_dir = tempfile.mkdtemp(prefix="avd-bench-")
+    os.environ["DATA_DIR"] = work_dir
+    # Yerel sahte site için sunucu başına hız sınırı (host_guard) ölçümü bozmasın.
+    os.environ.setdefault("HOST_REQUEST_RATE", "100")
+    os.environ.setdefault("HOST_BURST", "100")
+    os.chdir(work_dir)
+
+    import config
+    import job_registry
+    import mover
+    import postprocess
+    import services
+    import settings_cache
+    import worker
+    from app import app
+    from database import get_db, init_settings, setup_database, update_setting
+
+    if args.resolver == "direct":
+        worker.find_manifest_url = direct_manifest_resolver(config.USER_AGENT)
+
+    fixture = SiteFixture(
+        movie_count=args.movies,
+        series_count=1 if args.episodes else 0,
+        seasons_per_series=1,
+        episodes_per_season=args.episodes,
+    )
+    profile = HlsProfile(
+        segment_count=args.segments,
+        segment_size=args.segment_size,
+        latency=args.latency_ms / 1000.0,
+        bandwidth=args.bandwidth,
+    )
+    site = FakeSiteServer(fixture, profile).start()
+    downloads_folder = os.path.join(work_dir, "downloads")
+    os.makedirs(downloads_folder, exist_ok=True)
+
+    results = {"params": vars(args).copy(), "work_dir": work_dir}
+    try:
+        with app.app_context():
+            setup_database()
+            init_settings()
+            db = get_db()
+            update_setting("DOWNLOADS_FOLDER", downloads_folder, db)
+            update_setting("CONCURRENT_DOWNLOADS", str(args.concurrency), db)
+            update_setting("RESOLVER_CONCURRENCY", str(args.resolvers), db)
+            update_setting("SPEED_LIMIT", "", db)
+            if args.staging:
+                update_setting("STAGING_FOLDER", os.path.join(work_dir, "staging"), db)
+            if args.postprocess:
+                update_setting("POSTPROCESS_FORMAT", args.postprocess, db)
+            db.commit()
+            settings_cache.invalidate()
+
+            enqueue_times = []
+            for url in site.movie_urls():
+                started = time.perf_counter()
+                success, message = services.add_movie_to_queue(url)
+                enqueue_times.append(time.perf_counter() - started)
+                if not success:
+                    raise RuntimeError(f"Film sıraya eklenemedi: {message}")
+            for url in site.series_urls():
+                started = time.perf_counter()
+                success, message = services.add_series_to_queue(url)
+                enqueue_times.append(time.perf_counter() - started)
+                if not success:
+                    raise RuntimeError(f"Dizi sıraya eklenemedi: {message}")
+            results["enqueue_seconds"] = summarize(enqueue_times)
+
+            timeline = {}
+            peak_active = 0
+            pipeline_started = time.perf_counter()
+            deadline = pipeline_started + args.timeout
+            while True:
+                services.run_auto_download_cycle()
+                if args.postprocess:
+                    postprocess.run_postprocess_cycle()
+                if args.staging:
+                    mover.run_mover_cycle()
+                active_jobs = len(job_registry.live_jobs(get_db()))
+                peak_active = max(peak_active, active_jobs)
+                now = time.perf_counter()
+                rows = get_db().execute(
+                    "SELECT 'movie' AS type, id, status FROM movies "
+                    "UNION ALL SELECT 'episode' AS type, id, status FROM episodes"
+                ).fetchall()
+                pending = 0
+                for row in rows:
+                    events = timeline.setdefault((row["type"], row["id"]), {})
+                    status = row["status"] or ""
+                    if status not in events:
+                        events[status] = now
+                    if status == "Sırada" or status in WORKING_STATUSES:
+                        pending += 1
+                if not pending and not active_jobs:
+                    break
+                if now > deadline:
+                    raise RuntimeError("Benchmark zaman aşımına uğradı.")
+                time.sleep(args.poll_interval)
+            wall = time.perf_counter() - pipeline_started
+
+        for process in multiprocessing.active_children():
+            process.join()
+
+        queue_wait, resolve, download, post, move, total, failures = [], [], [], [], [], [], []
+        for key, events in timeline.items():
+            start = events.get("Kaynak aranıyor...")
+            downloading = events.get("İndiriliyor")
+            processing = events.get("İşleniyor")
+            moving = events.get("Taşınıyor")
+            done = events.get("Tamamlandı")
+            downloaded = next(
+                (t for t in (processing, moving, done) if t is not None), None
+            )
+            processed = moving if moving is not None else done
+            if start is not None:
+                queue_wait.append(start - pipeline_started)
+            if start is not None and downloading is not None:
+                resolve.append(downloading - start)
+            if downloading is not None and downloaded is not None:
+                download.append(downloaded - downloading)
+            if processing is not None and processed is not None:
+                post.append(processed - processing)
+            if moving is not None and done is not None:
+                move.append(done - moving)
+            if done is not None:
+                total.append(done - pipeline_started)
+            else:
+                failures.append({"item": f"{key[0]}:{key[1]}", "statuses": list(events)})
+
+        downloaded_bytes = 0
+        for root, _, files in os.walk(downloads_folder):
+            downloaded_bytes += sum(os.path.getsize(os.path.join(root, f)) for f in files)
+
+        children = resource.getrusage(resource.RUSAGE_CHILDREN)
+        own = resource.getrusage(resource.RUSAGE_SELF)
+        results.update(
+            {
+                "jobs": len(timeline),
+                "completed": len(total),
+                "failed": failures,
+                "wall_seconds": wall,
+                "jobs_per_minute": len(total) / wall * 60 if wall else 0,
+                "throughput_mib_s": downloaded_bytes / wall / 1024**2 if wall else 0,
+                "downloaded_bytes": downloaded_bytes,
+                "queue_wait_seconds": summarize(queue_wait),
+                "resolve_seconds": summarize(resolve),
+                "download_seconds": summarize(download),
+                "postprocess_seconds": summarize(post),
+                "move_seconds": summarize(move),
+                "job_total_seconds": summarize(total),
+                "peak_active_processes": peak_active,
+                "resources": {
+                    "children_cpu_seconds": children.ru_utime + children.ru_stime,
+                    "children_max_rss_mib": children.ru_maxrss / 1024,
+                    "self_cpu_seconds": own.ru_utime + own.ru_stime,
+                    "self_max_rss_mib": own.ru_maxrss / 1024,
+                },
+                "origin": dict(site.stats),
+            }
+        )
+    finally:
+        site.stop()
+    return results
+
+
+COMPARED_METRICS = [
+    ("wall_seconds", False),
+    ("jobs_per_minute", True),
+    ("throughput_mib_s", True),
+    ("resolve_seconds.p50", False),
+    ("download_seconds.p50", False),
+    ("job_total_seconds.p95", False),
+    ("resources.children_cpu_seconds", False),
+    ("resources.children_max_rss_mib", False),
+]
+
+
+def print_report(results, baseline=None):
+    print(f"Çalışma klasörü       : {results['work_dir']}")
+    print(f"İş sayısı             : {results['jobs']} (tamamlanan {results['completed']})")
+    print(f"Toplam süre (sn)      : {fmt(results['wall_seconds'])}")
+    print(f"İş/dakika             : {fmt(results['jobs_per_minute'])}")
+    print(f"Verim (MiB/sn)        : {fmt(results['throughput_mib_s'])}")
+    print(f"En fazla eş zamanlı   : {results['peak_active_processes']}")
+    for name in (
+        "enqueue_seconds",
+        "queue_wait_seconds",
+        "resolve_seconds",
+        "download_seconds",
+        "postprocess_seconds",
+        "move_seconds",
+        "job_total_seconds",
+    ):
+        stats = results[name]
+        print(
+            f"{name:22s}: p50={fmt(stats['p50'])} p95={fmt(stats['p95'])} "
+            f"p99={fmt(stats['p99'])} max={fmt(stats['max'])}"
+        )
+    for key, value in results["resources"].items():
+        print(f"{key:22s}: {fmt(value)}")
+    print(f"Kaynak sunucu         : {results['origin']}")
+    if results["failed"]:
+        print(f"Başarısız işler       : {results['failed']}")
+
+    if baseline:
+        compare_to_baseline(results, baseline, COMPARED_METRICS)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--movies", type=int, default=5)
+    parser.add_argument("--episodes", type=int, default=3)
+    parser.add_argument("--concurrency", type=int, default=2)
+    parser.add_argument("--resolvers", type=int, default=1, help="Kaynak çözücü havuzu boyutu")
+    parser.add_argument("--segments", type=int, default=20)
+    parser.add_argument("--segment-size", type=parse_size, default=parse_size("256K"))
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--bandwidth", type=parse_size, default=0, help="bayt/sn, örn. 4M")
+    parser.add_argument("--resolver", choices=["browser", "direct"], default="browser")
+    parser.add_argument(
+        "--staging", action="store_true", help="Hazırlık klasörü + taşıma havuzunu kullan"
+    )
+    parser.add_argument(
+        "--postprocess",
+        choices=["verify", "mp4", "mkv"],
+        help="İndirme sonrası işleme havuzunu kullan (ffmpeg/ffprobe gerekir)",
+    )
+    parser.add_argument("--poll-interval", type=float, default=0.1)
+    parser.add_argument("--timeout", type=float, default=600)
+    parser.add_argument("--save", help="Sonuçları JSON olarak kaydet")
+    parser.add_argument("--baseline", help="Karşılaştırılacak önceki JSON sonucu")
+    args = parser.parse_args()
+
+    baseline = load_json(args.baseline)
+    save_path = os.path.abspath(args.save) if args.save else None
+
+    results = run(args)
+    print_report(results, baseline)
+    if save_path:
+        save_json(save_path, results)
+    return 0 if not results["failed"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
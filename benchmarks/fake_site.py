@@ -0,0 +1,333 @@
+# @author: MembaCo.
+
+"""
+Çevrimdışı benchmark için yerel sahte site ve sentetik HLS kaynağı.
+
+Sunulan yollar, services.py ve worker.py'ın ayrıştırdığı sayfa yapısını taklit eder:
+    /film/<slug>/             JSON-LD içeren film sayfası (#fimcnt butonu + player iframe)
+    /player/<slug>            #player butonlu oynatıcı iframe'i (tıklanınca manifest istenir)
+    /dizi/<slug>/             scrape_series_data'nın beklediği sezon/bölüm yapısı
+    /bolum/<slug>-s<S>e<E>/   bölüm sayfası (film sayfasıyla aynı oynatıcı akışı)
+    /liste/                   scrape_movie_links_from_list_page için film kartları
+    /liste/page/<N>/          sayfalı liste (list_page_size > 0 ise; en yeni film başta)
+    /hls/<slug>/master.m3u8   master playlist
+    /hls/<slug>/index.m3u8    medya playlist'i
+    /hls/<slug>/seg<N>.ts     segmentler (gecikme ve bant genişliği sınırı uygulanır)
+    /poster/<slug>.jpg        poster görseli
+"""
+
+import hashlib
+import json
+import threading
+import time
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+TS_PACKET_SIZE = 188
+CHUNK_SIZE = 64 * 1024
+
+
+@dataclass
+class HlsProfile:
+    """Sentetik HLS kaynağının davranışını belirler."""
+
+    segment_count: int = 20
+    segment_size: int = 256 * 1024
+    segment_duration: float = 4.0
+    latency: float = 0.0
+    bandwidth: int = 0  # bayt/sn, 0 = sınırsız
+
+
+@dataclass
+class SiteFixture:
+    """Sahte sitede yayınlanacak film ve dizi sayısı."""
+
+    movie_count: int = 5
+    series_count: int = 1
+    seasons_per_series: int = 1
+    episodes_per_season: int = 3
+    list_page_size: int = 0  # 0 = tüm filmler tek liste sayfasında
+
+
+def movie_slug(index):
+    return f"benchmark-film-{index}"
+
+
+def series_slug(index):
+    return f"benchmark-dizi-{index}"
+
+
+def _ts_payload(size):
+    """Boş (null PID) MPEG-TS paketlerinden oluşan bir segment üretir."""
+    packet = bytes([0x47, 0x1F, 0xFF, 0x10]) + b"\xff" * (TS_PACKET_SIZE - 4)
+    count = max(1, size // TS_PACKET_SIZE)
+    return packet * count
+
+
+def _movie_page(base_url, slug, index):
+    json_ld = {
+        "@context": "https://schema.org",
+        "@graph": [
+            {
+                "@type": "Movie",
+                "name": f"Benchmark Film {index}",
+                "description": f"Benchmark için üretilmiş {index} numaralı film.",
+                "datePublished": f"{2000 + index % 25}-01-01",
+                "genre": ["Aksiyon", "Dram"],
+                "aggregateRating": {"ratingValue": "7.5"},
+                "director": {"name": "Benchmark Yönetmen"},
+                "actor": [{"name": "Oyuncu A"}, {"name": "Oyuncu B"}],
+                "image": f"{base_url}/poster/{slug}.jpg",
+            }
+        ],
+    }
+    return _player_host_page(
+        slug,
+        f"Benchmark Film {index}",
+        f'<script type="application/ld+json">{json.dumps(json_ld)}</script>',
+    )
+
+
+def _player_host_page(slug, title, head_extra=""):
+    return f"""<!DOCTYPE html>
+<html><head><title>{title}</title>{head_extra}</head>
+<body>
+<div class="sheader"><h1>{title}</h1></div>
+<div id="fimcnt" style="width:200px;height:50px">Oynat</div>
+<div class="play-box-iframe"></div>
+<script>
+document.getElementById("fimcnt").addEventListener("click", function () {{
+    var frame = document.createElement("iframe");
+    frame.src = "/player/{slug}";
+    document.querySelector(".play-box-iframe").appendChild(frame);
+}});
+</script>
+</body></html>"""
+
+
+def _player_page(slug):
+    return f"""<!DOCTYPE html>
+<html><head><title>Player</title></head>
+<body>
+<button id="player" data-manifest="/hls/{slug}/master.m3u8">Play</button>
+<script>
+document.getElementById("player").addEventListener("click", function () {{
+    fetch(this.dataset.manifest);
+}});
+</script>
+</body></html>"""
+
+
+def _series_page(base_url, index, fixture):
+    slug = series_slug(index)
+    seasons_html = []
+    for season in range(1, fixture.seasons_per_series + 1):
+        episodes_html = []
+        for episode in range(1, fixture.episodes_per_season + 1):
+            episode_url = f"{base_url}/bolum/{slug}-s{season}e{episode}/"
+            episodes_html.append(
+                f"""<li><div class="numerando">{season} - {episode}</div>
+<div class="episodiotitle"><h2 class="episodiotitle"><a href="{episode_url}">Bölüm {episode}</a></h2></div></li>"""
+            )
+        seasons_html.append(
+            f"""<div class="se-c"><div class="se-q"><span class="se-t">{season}</span></div>
+<ul class="episodios">{"".join(episodes_html)}</ul></div>"""
+        )
+    return f"""<!DOCTYPE html>
+<html><head><title>Benchmark Dizi {index}</title></head>
+<body>
+<div class="data"><h1>Benchmark Dizi {index}</h1></div>
+<div class="poster"><img src="{base_url}/poster/{slug}.jpg"></div>
+<div id="info"><div class="wp-content">Benchmark için üretilmiş dizi.</div></div>
+<div id="seasons">{"".join(seasons_html)}</div>
+</body></html>"""
+
+
+def _list_page(base_url, fixture, page=1):
+    indexes = list(range(fixture.movie_count, 0, -1))
+    size = fixture.list_page_size or len(indexes) or 1
+    page_indexes = indexes[(page - 1) * size : page * size]
+    if page > 1 and not page_indexes:
+        return None
+    cards = "".join(
+        f'<article class="item"><a href="{base_url}/film/{movie_slug(i)}/">Film {i}</a></article>'
+        for i in page_indexes
+    )
+    pagination = ""
+    if page * size < len(indexes):
+        pagination = f'<a class="next page-numbers" href="{base_url}/liste/page/{page + 1}/">Sonraki</a>'
+    return f"<!DOCTYPE html><html><body>{cards}{pagination}</body></html>"
+
+
+def _master_playlist(slug, profile):
+    bandwidth = int(profile.segment_size * 8 / max(profile.segment_duration, 0.1))
+    return (
+        "#EXTM3U\n"
+        f'#EXT-X-STREAM-INF:BANDWIDTH={bandwidth},RESOLUTION=1280x720,CODECS="avc1.64001f,mp4a.40.2"\n'
+        f"/hls/{slug}/index.m3u8\n"
+    )
+
+
+def _media_playlist(slug, profile):
+    lines = [
+        "#EXTM3U",
+        "#EXT-X-VERSION:3",
+        f"#EXT-X-TARGETDURATION:{int(profile.segment_duration + 0.999)}",
+        "#EXT-X-MEDIA-SEQUENCE:0",
+    ]
+    for i in range(profile.segment_count):
+        lines.append(f"#EXTINF:{profile.segment_duration:.3f},")
+        lines.append(f"/hls/{slug}/seg{i}.ts")
+    lines.append("#EXT-X-ENDLIST")
+    return "\n".join(lines) + "\n"
+
+
+class FakeSiteServer:
+    """Sahte siteyi ayrı bir thread'de çalıştırır ve istek sayaçlarını tutar."""
+
+    def __init__(self, fixture=None, profile=None, host="127.0.0.1", port=0):
+        self.fixture = fixture or SiteFixture()
+        self.profile = profile or HlsProfile()
+        self.stats = {"requests": 0, "not_modified": 0, "segments": 0, "bytes_sent": 0}
+        self._stats_lock = threading.Lock()
+        self._segment = _ts_payload(self.profile.segment_size)
+        self._httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def movie_urls(self):
+        return [
+            f"{self.base_url}/film/{movie_slug(i)}/"
+            for i in range(1, self.fixture.movie_count + 1)
+        ]
+
+    def series_urls(self):
+        return [
+            f"{self.base_url}/dizi/{series_slug(i)}/"
+            for i in range(1, self.fixture.series_count + 1)
+        ]
+
+    def list_url(self):
+        return f"{self.base_url}/liste/"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def _count(self, key, amount=1):
+        with self._stats_lock:
+            self.stats[key] += amount
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                server._count("requests")
+                path = self.path.split("?", 1)[0]
+                parts = [p for p in path.split("/") if p]
+                base_url = server.base_url
+                try:
+                    if len(parts) == 2 and parts[0] == "film":
+                        index = int(parts[1].rsplit("-", 1)[1])
+                        self._send_html(_movie_page(base_url, parts[1], index))
+                    elif len(parts) == 2 and parts[0] == "dizi":
+                        index = int(parts[1].rsplit("-", 1)[1])
+                        self._send_html(_series_page(base_url, index, server.fixture))
+                    elif len(parts) == 2 and parts[0] == "bolum":
+                        self._send_html(_player_host_page(parts[1], parts[1]))
+                    elif len(parts) == 2 and parts[0] == "player":
+                        self._send_html(_player_page(parts[1]))
+                    elif parts == ["liste"]:
+                        self._send_html(_list_page(base_url, server.fixture))
+                    elif len(parts) == 3 and parts[:2] == ["liste", "page"]:
+                        html = _list_page(base_url, server.fixture, int(parts[2]))
+                        if html is None:
+                            self.send_error(404)
+                        else:
+                            self._send_html(html)
+                    elif len(parts) == 2 and parts[0] == "poster":
+                        self._send(b"\xff\xd8\xff\xe0" + b"\x00" * 2048, "image/jpeg")
+                    elif len(parts) == 3 and parts[0] == "hls":
+                        self._send_hls(parts[1], parts[2])
+                    else:
+                        self.send_error(404)
+                except (ValueError, IndexError):
+                    self.send_error(404)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+
+            def _send_html(self, html):
+                body = html.encode("utf-8")
+                # Koşullu istekleri (series_watcher) gerçek sunucular gibi yanıtlar.
+                etag = f'"{hashlib.sha1(body).hexdigest()[:16]}"'
+                if self.headers.get("If-None-Match") == etag:
+                    server._count("not_modified")
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                self._send(body, "text/html; charset=utf-8", {"ETag": etag})
+
+            def _send(self, body, content_type, extra_headers=None):
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                for name, value in (extra_headers or {}).items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _send_hls(self, slug, name):
+                profile = server.profile
+                if name == "master.m3u8":
+                    body = _master_playlist(slug, profile).encode("utf-8")
+                    self._send(body, "application/vnd.apple.mpegurl")
+                elif name == "index.m3u8":
+                    body = _media_playlist(slug, profile).encode("utf-8")
+                    self._send(body, "application/vnd.apple.mpegurl")
+                elif name.startswith("seg") and name.endswith(".ts"):
+                    if int(name[3:-3]) >= profile.segment_count:
+                        self.send_error(404)
+                        return
+                    self._send_throttled(server._segment)
+                    server._count("segments")
+                else:
+                    self.send_error(404)
+
+            def _send_throttled(self, body):
+                profile = server.profile
+                if profile.latency:
+                    time.sleep(profile.latency)
+                self.send_response(200)
+                self.send_header("Content-Type", "video/mp2t")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                started = time.monotonic()
+                for offset in range(0, len(body), CHUNK_SIZE):
+                    chunk = body[offset : offset + CHUNK_SIZE]
+                    self.wfile.write(chunk)
+                    server._count("bytes_sent", len(chunk))
+                    if profile.bandwidth:
+                        expected = (offset + len(chunk)) / profile.bandwidth
+                        delay = expected - (time.monotonic() - started)
+                        if delay > 0:
+                            time.sleep(delay)
+
+        return Handler
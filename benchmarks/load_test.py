@@ -0,0 +1,413 @@
+# @author: MembaCo.
+
+"""
+Büyük kütüphane yük testi: web API'yi sentetik bir veritabanı üzerinde zorlar.
+
+Belirtilen ölçekte (film, dizi, sezon, bölüm, durum dağılımı) geçici bir
+database.db üretir, uygulamayı süreç içinde çalıştırır ve eşzamanlı istemcilerle
+/status, öğe işlem rotaları ve ayarlar sayfasına istek gönderir. Uç nokta bazında
+p50/p95/p99 gecikme, yanıt boyutu ve SQLite yazma kilidi bekleme sürelerini raporlar.
+get_all_movies_status/get_all_series_status ayrıca doğrudan ölçülür; --max-p95-ms
+verilirse eşik aşıldığında çıkış kodu 1 olur (CI'da gerileme yakalamak için).
+
+Örnek:
+    python benchmarks/load_test.py --movies 20000 --series 300 --clients 16 \\
+        --duration 30 --save load.json
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+from common import (  # noqa: E402
+    compare_to_baseline,
+    fmt,
+    load_json,
+    save_json,
+    summarize,
+)
+
+BENCH_PASSWORD = "benchmark"
+STATUS_WEIGHTS = {
+    "Tamamlandı": 70,
+    "Sırada": 18,
+    "Hata: İndirme başarısız oldu.": 8,
+    "Duraklatıldı": 4,
+}
+ENDPOINT_WEIGHTS = {
+    "status": 10,
+    "status_lite": 20,
+    "movies_page": 20,
+    "series_page": 10,
+    "search": 5,
+    "movie_action": 15,
+    "episode_action": 10,
+    "settings": 5,
+    "index": 10,
+}
+
+
+def _random_status(rng):
+    return rng.choices(list(STATUS_WEIGHTS), weights=list(STATUS_WEIGHTS.values()))[0]
+
+
+def generate_database(path, args, rng):
+    """Sentetik film, dizi, sezon ve bölüm kayıtlarını toplu olarak ekler."""
+    conn = sqlite3.connect(path)
+    movie_rows = []
+    for i in range(1, args.movies + 1):
+        status = _random_status(rng)
+        movie_rows.append(
+            (
+                f"https://example.invalid/film/synthetic-{i}/",
+                status,
+                f"Sentetik Film {i}",
+                str(1970 + i % 55),
+                "Aksiyon, Dram",
+                "Yük testi için üretilmiş açıklama. " * 8,
+                f"{rng.uniform(1, 10):.1f}",
+                "Sentetik Yönetmen",
+                "Oyuncu A, Oyuncu B, Oyuncu C",
+                f"https://example.invalid/poster/{i}.jpg",
+                "hdfilmcehennemi",
+                100.0 if status == "Tamamlandı" else 0.0,
+            )
+        )
+    conn.executemany(
+        "INSERT INTO movies (url, status, title, year, genre, description, imdb_score, "
+        "director, cast, poster_url, source_site, progress) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        movie_rows,
+    )
+
+    episode_count = 0
+    for s in range(1, args.series + 1):
+        cursor = conn.execute(
+            "INSERT INTO series (title, source_url, poster_url, description) VALUES (?, ?, ?, ?)",
+            (
+                f"Sentetik Dizi {s}",
+                f"https://example.invalid/dizi/synthetic-{s}/",
+                f"https://example.invalid/poster/dizi-{s}.jpg",
+                "Yük testi için üretilmiş dizi.",
+            ),
+        )
+        series_id = cursor.lastrowid
+        for season_number in range(1, args.seasons + 1):
+            cursor = conn.execute(
+                "INSERT INTO seasons (series_id, season_number) VALUES (?, ?)",
+                (series_id, season_number),
+            )
+            season_id = cursor.lastrowid
+            episode_rows = []
+            for e in range(1, args.episodes + 1):
+                status = _random_status(rng)
+                episode_rows.append(
+                    (
+                        season_id,
+                        e,
+                        f"Bölüm {e}",
+                        f"https://example.invalid/bolum/synthetic-{s}-{season_number}-{e}/",
+                        status,
+                        100.0 if status == "Tamamlandı" else 0.0,
+                    )
+                )
+            conn.executemany(
+                "INSERT INTO episodes (season_id, episode_number, title, url, status, progress) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                episode_rows,
+            )
+            episode_count += len(episode_rows)
+    conn.commit()
+    conn.close()
+    return episode_count
+
+
+class LockProbe(threading.Thread):
+    """Ayrı bir bağlantıyla periyodik yazma kilidi alıp bekleme süresini ölçer."""
+
+    def __init__(self, database_path, interval):
+        super().__init__(daemon=True)
+        self.database_path = database_path
+        self.interval = interval
+        self.waits = []
+        self.errors = 0
+        self._stop_event = threading.Event()
+
+    def run(self):
+        conn = sqlite3.connect(self.database_path, timeout=30, isolation_level=None)
+        while not self._stop_event.is_set():
+            started = time.perf_counter()
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                self.waits.append(time.perf_counter() - started)
+                conn.execute(
+                    "UPDATE settings SET value = value WHERE key = 'SPEED_LIMIT'"
+                )
+                conn.execute("COMMIT")
+            except sqlite3.OperationalError:
+                self.errors += 1
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+            self._stop_event.wait(self.interval)
+        conn.close()
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+def _logged_in_session(base_url, username):
+    import requests
+
+    session = requests.Session()
+    response = session.post(
+        f"{base_url}/login",
+        data={"username": username, "password": BENCH_PASSWORD},
+        allow_redirects=False,
+    )
+    if response.status_code != 302 or "login" in response.headers.get("Location", ""):
+        raise RuntimeError("Yük testi oturumu açılamadı.")
+    return session
+
+
+def run_clients(base_url, username, args, rng, movie_ids, episode_ids):
+    samples = defaultdict(list)
+    sizes = defaultdict(list)
+    statuses = defaultdict(lambda: defaultdict(int))
+    lock = threading.Lock()
+    deadline = time.perf_counter() + args.duration
+    endpoints = list(ENDPOINT_WEIGHTS)
+    weights = list(ENDPOINT_WEIGHTS.values())
+
+    def build_request(endpoint, local_rng):
+        if endpoint == "status":
+            return "GET", "/status"
+        if endpoint == "status_lite":
+            return "GET", "/status?lite=1"
+        if endpoint == "movies_page":
+            return "GET", f"/api/movies?page={local_rng.randint(1, 20)}&per_page=50"
+        if endpoint == "series_page":
+            return "GET", f"/api/series?page={local_rng.randint(1, 2)}&per_page=20"
+        if endpoint == "search":
+            return "GET", f"/api/movies?q=Film+{local_rng.randint(1, 999)}"
+        if endpoint == "index":
+            return "GET", "/"
+        if endpoint == "settings":
+            return "GET", "/settings"
+        if endpoint == "movie_action" and movie_ids:
+            action = local_rng.choice(["stop", "delete_file"])
+            return "POST", f"/movie/{action}/{local_rng.choice(movie_ids)}"
+        if endpoint == "episode_action" and episode_ids:
+            action = local_rng.choice(["stop", "delete_file"])
+            return "POST", f"/episode/{action}/{local_rng.choice(episode_ids)}"
+        return "GET", "/status"
+
+    def client(seed):
+        local_rng = random.Random(seed)
+        session = _logged_in_session(base_url, username)
+        while time.perf_counter() < deadline:
+            endpoint = local_rng.choices(endpoints, weights=weights)[0]
+            method, path = build_request(endpoint, local_rng)
+            started = time.perf_counter()
+            response = session.request(method, base_url + path, allow_redirects=False)
+            elapsed = time.perf_counter() - started
+            with lock:
+                samples[endpoint].append(elapsed)
+                sizes[endpoint].append(len(response.content))
+                statuses[endpoint][response.status_code] += 1
+
+    with ThreadPoolExecutor(max_workers=args.clients) as executor:
+        futures = [executor.submit(client, rng.random()) for _ in range(args.clients)]
+        for future in futures:
+            future.result()
+
+    report = {}
+    for endpoint, values in samples.items():
+        report[endpoint] = {
+            "latency_seconds": summarize(values),
+            "requests_per_second": len(values) / args.duration,
+            "response_bytes": summarize(sizes[endpoint]),
+            "status_codes": {str(k): v for k, v in statuses[endpoint].items()},
+        }
+    return report
+
+
+def time_status_functions(app, iterations):
+    import services
+
+    timings = {"get_all_movies_status": [], "get_all_series_status": []}
+    with app.app_context():
+        for _ in range(iterations):
+            for name in timings:
+                started = time.perf_counter()
+                getattr(services, name)()
+                timings[name].append(time.perf_counter() - started)
+    return {name: summarize(values) for name, values in timings.items()}
+
+
+def run(args):
+    import logging
+
+    work_dir = tempfile.mkdtemp(prefix="avd-load-")
+    os.environ["DATA_DIR"] = work_dir
+    os.chdir(work_dir)
+
+    import config
+    from werkzeug.security import generate_password_hash
+    from werkzeug.serving import make_server
+
+    from app import app
+    from database import init_settings, setup_database, update_setting
+
+    logging.getLogger().setLevel(logging.WARNING)
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    rng = random.Random(args.seed)
+
+    setup_database()
+    init_settings()
+    update_setting("ADMIN_PASSWORD_HASH", generate_password_hash(BENCH_PASSWORD))
+    started = time.perf_counter()
+    episode_count = generate_database(config.DATABASE, args, rng)
+    generation_seconds = time.perf_counter() - started
+
+    conn = sqlite3.connect(config.DATABASE)
+    movie_ids = [row[0] for row in conn.execute("SELECT id FROM movies")]
+    episode_ids = [row[0] for row in conn.execute("SELECT id FROM episodes")]
+    conn.close()
+
+    results = {
+        "params": vars(args).copy(),
+        "work_dir": work_dir,
+        "scale": {
+            "movies": len(movie_ids),
+            "series": args.series,
+            "episodes": episode_count,
+            "database_bytes": os.path.getsize(config.DATABASE),
+            "generation_seconds": generation_seconds,
+        },
+        "functions": time_status_functions(app, args.function_iterations),
+    }
+
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    server_thread = threading.Thread(target=server.serve_forever, daemon=True)
+    server_thread.start()
+    base_url = f"http://127.0.0.1:{server.server_port}"
+
+    probe = LockProbe(config.DATABASE, args.lock_probe_interval)
+    probe.start()
+    try:
+        results["endpoints"] = run_clients(
+            base_url, config.ADMIN_USERNAME, args, rng, movie_ids, episode_ids
+        )
+    finally:
+        probe.stop()
+        server.shutdown()
+    results["sqlite_lock_wait_seconds"] = summarize(probe.waits)
+    results["sqlite_lock_errors"] = probe.errors
+    return results
+
+
+COMPARED_METRICS = [
+    ("endpoints.status.latency_seconds.p50", False),
+    ("endpoints.status.latency_seconds.p95", False),
+    ("endpoints.status.latency_seconds.p99", False),
+    ("endpoints.status.requests_per_second", True),
+    ("endpoints.status.response_bytes.p50", False),
+    ("endpoints.movie_action.latency_seconds.p95", False),
+    ("endpoints.settings.latency_seconds.p95", False),
+    ("functions.get_all_movies_status.p95", False),
+    ("functions.get_all_series_status.p95", False),
+    ("sqlite_lock_wait_seconds.p95", False),
+]
+
+
+def print_report(results, baseline=None):
+    scale = results["scale"]
+    print(f"Çalışma klasörü : {results['work_dir']}")
+    print(
+        f"Ölçek           : {scale['movies']} film, {scale['series']} dizi, "
+        f"{scale['episodes']} bölüm, {scale['database_bytes'] / 1024**2:.1f} MiB "
+        f"(üretim {scale['generation_seconds']:.1f} sn)"
+    )
+    for name, stats in results["functions"].items():
+        print(
+            f"{name:28s}: p50={fmt(stats['p50'])} p95={fmt(stats['p95'])} "
+            f"max={fmt(stats['max'])} sn"
+        )
+    for endpoint, stats in sorted(results["endpoints"].items()):
+        latency = stats["latency_seconds"]
+        size = stats["response_bytes"]
+        print(
+            f"{endpoint:16s}: {stats['requests_per_second']:.1f} istek/sn "
+            f"p50={fmt(latency['p50'])} p95={fmt(latency['p95'])} "
+            f"p99={fmt(latency['p99'])} sn, yanıt p50={size['p50']} bayt, "
+            f"kodlar={stats['status_codes']}"
+        )
+    waits = results["sqlite_lock_wait_seconds"]
+    print(
+        f"SQLite kilit bekleme: p50={fmt(waits['p50'])} p95={fmt(waits['p95'])} "
+        f"max={fmt(waits['max'])} sn, hata={results['sqlite_lock_errors']}"
+    )
+    if baseline:
+        compare_to_baseline(results, baseline, COMPARED_METRICS)
+
+
+def check_thresholds(results, max_p95_ms):
+    """Eşik aşımlarını döndürür; boş liste başarı demektir."""
+    limit = max_p95_ms / 1000.0
+    checks = {
+        "/status": results["endpoints"].get("status", {}).get("latency_seconds", {}),
+        **results["functions"],
+    }
+    return [
+        f"{name} p95={stats['p95'] * 1000:.1f} ms > {max_p95_ms} ms"
+        for name, stats in checks.items()
+        if stats.get("p95") is not None and stats["p95"] > limit
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--movies", type=int, default=20000)
+    parser.add_argument("--series", type=int, default=300)
+    parser.add_argument("--seasons", type=int, default=3, help="Dizi başına sezon")
+    parser.add_argument("--episodes", type=int, default=10, help="Sezon başına bölüm")
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=20)
+    parser.add_argument("--function-iterations", type=int, default=5)
+    parser.add_argument("--lock-probe-interval", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--max-p95-ms", type=float, help="Gerileme eşiği (ms)")
+    parser.add_argument("--save", help="Sonuçları JSON olarak kaydet")
+    parser.add_argument("--baseline", help="Karşılaştırılacak önceki JSON sonucu")
+    args = parser.parse_args()
+
+    baseline = load_json(args.baseline)
+    save_path = os.path.abspath(args.save) if args.save else None
+
+    results = run(args)
+    print_report(results, baseline)
+    if save_path:
+        save_json(save_path, results)
+
+    if args.max_p95_ms is not None:
+        violations = check_thresholds(results, args.max_p95_ms)
+        for violation in violations:
+            print(f"EŞİK AŞILDI: {violation}")
+        return 1 if violations else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,259 @@
+# @author: MembaCo.
+
+"""
+Kategori/arşiv sayfalarının sayfalamayı izleyen artımlı taranması.
+
+Toplu ekleme eskiden yalnızca verilen liste sayfasının ilk sayfasını okurdu.
+"Tüm sayfaları tara" seçeneğiyle eklenen bir liste catalog_crawls tablosuna
+kaydedilir ve sayfalamanın sonuna kadar taranır (ilk tarama). Her sayfadan
+sonra bir sonraki sayfanın adresi kaydedilir; tarama yarıda kesilirse (yeniden
+başlatma, ağ hatası, sayfa sınırı) bir sonraki tur kaldığı sayfadan devam eder.
+
+İlk tarama bittikten sonra liste, zamanlayıcı lideri tarafından
+CRAWL_SYNC_INTERVAL aralığıyla yeniden taranır (senkronizasyon). Liste sayfaları
+en yeniden eskiye sıralı olduğundan senkronizasyon, sayfada daha önce görülmüş
+filmlere (CRAWL_KNOWN_STOP) ulaşınca durur; genellikle tek bir liste isteğiyle
+biter. Bir sayfadaki linklerin hangilerinin zaten kayıtlı olduğu tek bir
+sorguyla bulunur; film sayfası yalnızca yeni linkler için indirilir.
+
+Liste ve film sayfası istekleri host_guard'ın sunucu başına ortak hız sınırından
+geçer; site engelleme yanıtları döndürmeye başlarsa tarama sayfa ilerletilmeden
+durur ve devre kapandıktan sonraki turda aynı sayfadan devam eder.
+"""
+
+import logging
+import time
+from urllib.parse import urljoin, urlsplit
+
+import requests
+from bs4 import BeautifulSoup
+
+import config
+import host_guard
+import identity
+from database import get_db
+
+logger = logging.getLogger(__name__)
+
+
+def parse_list_page(html, page_url):
+    """Sayfadaki film linklerini ve (varsa) bir sonraki sayfanın adresini döndürür."""
+    soup = BeautifulSoup(html, "html.parser")
+    movie_links = []
+    for movie_card in soup.find_all("article", class_="item"):
+        link_tag = movie_card.find("a")
+        if link_tag and link_tag.get("href"):
+            movie_links.append(urljoin(page_url, link_tag["href"]))
+
+    next_tag = soup.find("link", rel="next") or soup.select_one(
+        "a[rel~=next], a.next, .pagination a.next, a.next.page-numbers"
+    )
+    next_url = None
+    if next_tag and next_tag.get("href"):
+        next_url = urljoin(page_url, next_tag["href"])
+        # Sayfalama başka bir siteye veya aynı sayfaya işaret ediyorsa izlenmez.
+        if urlsplit(next_url).netloc != urlsplit(page_url).netloc or next_url == page_url:
+            next_url = None
+    return movie_links, next_url
+
+
+def fetch_list_page(page_url):
+    """Liste sayfasını indirip ayrıştırır; (linkler, sonraki_sayfa) döndürür."""
+    response = host_guard.get(page_url, headers={"User-Agent": config.USER_AGENT}, timeout=20)
+    response.raise_for_status()
+    return parse_list_page(response.text, page_url)
+
+
+def known_urls(db, links):
+    """Linklerden movies tablosunda (adres veya kanonik adresle) kayıtlı olanlar."""
+    if not links:
+        return set()
+    canonical = {link: identity.normalize_url(link) for link in links}
+    placeholders = ", ".join("?" for _ in links)
+    rows = db.execute(
+        f"""
+        SELECT url, canonical_url FROM movies
+        WHERE url IN ({placeholders}) OR canonical_url IN ({placeholders})
+        """,
+        (*links, *canonical.values()),
+    ).fetchall()
+    seen = {row["url"] for row in rows} | {row["canonical_url"] for row in rows}
+    return {link for link in links if link in seen or canonical[link] in seen}
+
+
+def register(db, list_url):
+    """Listeyi taranacaklar arasına ekler; zaten kayıtlıysa False döndürür."""
+    cursor = db.execute(
+        "INSERT OR IGNORE INTO catalog_crawls (list_url, created_at) VALUES (?, ?)",
+        (list_url, time.time()),
+    )
+    db.commit()
+    return cursor.rowcount == 1
+
+
+def remove(db, list_url):
+    db.execute("DELETE FROM catalog_crawls WHERE list_url = ?", (list_url,))
+    db.commit()
+
+
+def list_crawls(db):
+    return [
+        dict(row)
+        for row in db.execute(
+            "SELECT * FROM catalog_crawls ORDER BY created_at"
+        ).fetchall()
+    ]
+
+
+def _claim(db, list_url):
+    """Aynı listenin iki yerde birden taranmasını önleyen süreli kilit."""
+    now = time.time()
+    cursor = db.execute(
+        """
+        UPDATE catalog_crawls SET lease_until = ?
+        WHERE list_url = ? AND (lease_until IS NULL OR lease_until < ?)
+        """,
+        (now + config.CRAWL_LEASE_SECONDS, list_url, now),
+    )
+    db.commit()
+    return cursor.rowcount == 1
+
+
+def _checkpoint(db, list_url, next_page_url, pages, added):
+    db.execute(
+        """
+        UPDATE catalog_crawls
+        SET next_page_url = ?, pages = pages + ?, added = added + ?, lease_until = ?
+        WHERE list_url = ?
+        """,
+        (next_page_url, pages, added, time.time() + config.CRAWL_LEASE_SECONDS, list_url),
+    )
+    db.commit()
+
+
+def _finish(db, list_url, result, backfill_done=None):
+    db.execute(
+        """
+        UPDATE catalog_crawls
+        SET last_run_at = ?, last_result = ?, lease_until = NULL,
+            backfill_done = COALESCE(?, backfill_done)
+        WHERE list_url = ?
+        """,
+        (time.time(), result, backfill_done, list_url),
+    )
+    db.commit()
+
+
+def add_links(links):
+    """
+    Yeni linkleri kuyruğa ekler; (eklenen, atlanan, başarısız) döndürür. Site
+    erişilemez hale gelirse kalan linkler denenmeden HostUnavailable fırlatılır.
+    """
+    from services import add_movie_to_queue
+
+    added, skipped, failed = 0, 0, 0
+    for link in links:
+        retry_at = host_guard.retry_at(link)
+        if retry_at:
+            raise host_guard.HostUnavailable(host_guard.host_key(link), retry_at)
+        try:
+            success, message = add_movie_to_queue(link)
+            if success:
+                added += 1
+            elif "zaten kuyrukta mevcut" in message.lower():
+                skipped += 1
+            else:
+                failed += 1
+        except Exception:
+            failed += 1
+            logger.error(
+                f"Toplu ekleme sırasında bir video ({link}) işlenirken hata oluştu.",
+                exc_info=True,
+            )
+    return added, skipped, failed
+
+
+def crawl(db, list_url, max_pages=None):
+    """
+    Listeyi kaldığı yerden tarar ve yeni filmleri kuyruğa ekler. Liste başka bir
+    yerde taranıyorsa None, aksi halde tur özetini döndürür.
+    """
+    if not _claim(db, list_url):
+        return None
+    state = db.execute(
+        "SELECT * FROM catalog_crawls WHERE list_url = ?", (list_url,)
+    ).fetchone()
+    syncing = bool(state["backfill_done"])
+    page_url = state["next_page_url"] or list_url
+    max_pages = max_pages or config.CRAWL_MAX_PAGES_PER_RUN
+    summary = {"pages": 0, "added": 0, "skipped": 0, "failed": 0, "known": 0}
+    visited = set()
+    stop_reason = None
+    try:
+        while page_url and summary["pages"] < max_pages:
+            visited.add(page_url)
+            links, next_url = fetch_list_page(page_url)
+            known = known_urls(db, links)
+            added, skipped, failed = add_links([l for l in links if l not in known])
+            summary["pages"] += 1
+            summary["known"] += len(known)
+            summary["added"] += added
+            summary["skipped"] += skipped
+            summary["failed"] += failed
+            if next_url in visited:
+                next_url = None
+            if syncing and links and len(known) >= min(len(links), config.CRAWL_KNOWN_STOP):
+                stop_reason = "önceden görülen filmlere ulaşıldı"
+                next_url = None
+            elif not next_url:
+                stop_reason = "son sayfaya ulaşıldı"
+            _checkpoint(db, list_url, next_url, 1, added)
+            page_url = next_url
+    except (requests.exceptions.RequestException, host_guard.HostUnavailable) as e:
+        logger.warning(f"Liste taraması yarıda kaldı ({page_url}): {e}")
+        _finish(db, list_url, f"Ağ hatası, {page_url} sayfasından devam edilecek.")
+        return summary
+
+    if page_url:
+        result = f"Sayfa sınırına ulaşıldı, {page_url} sayfasından devam edilecek."
+        _finish(db, list_url, result)
+    else:
+        result = (
+            f"{summary['pages']} sayfa, {summary['added']} yeni film; {stop_reason}."
+        )
+        _finish(db, list_url, result, backfill_done=1)
+    logger.info(f"Liste taraması ({list_url}): {result} {summary}")
+    return summary
+
+
+def due_crawls(db):
+    """İlk taraması bitmemiş veya senkronizasyon zamanı gelmiş listeler."""
+    now = time.time()
+    return [
+        row["list_url"]
+        for row in db.execute(
+            """
+            SELECT list_url FROM catalog_crawls
+            WHERE (lease_until IS NULL OR lease_until < ?)
+              AND (backfill_done = 0 OR next_page_url IS NOT NULL
+                   OR last_run_at IS NULL OR last_run_at < ?)
+            ORDER BY last_run_at
+            """,
+            (now, now - config.CRAWL_SYNC_INTERVAL),
+        ).fetchall()
+    ]
+
+
+def run_due_crawls():
+    db = get_db()
+    for list_url in due_crawls(db):
+        crawl(db, list_url)
+
+
+def crawl_async(app, list_url):
+    """Toplu ekleme formundan istenen taramayı arka planda çalıştırır."""
+    with app.app_context():
+        try:
+            crawl(get_db(), list_url)
+        except Exception as e:
+            logger.error(f"Liste taraması sırasında hata: {e}", exc_info=True)
@@ -25,6 +25,20 @@ DATABASE = os.path.join(DATA_DIR, os.environ.get("DATABASE_FILE", "database.db")
 # --- Web Scraping Ayarları ---
 USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/108.0.0.0 Safari/537.36"
 VIDEO_KEYWORDS = [".m3u8", "manifest", ".txt"]
+# Manifest aranırken tarayıcının hiç yüklemediği ağır içerikler (resim, font,
+# medya önizlemeleri) ve reklam/analitik sunucuları. Kapatmak için "false".
+RESOLVER_BLOCK_ASSETS = os.getenv("RESOLVER_BLOCK_ASSETS", "true").lower() == "true"
+RESOLVER_BLOCKED_URL_PATTERNS = [
+    "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot",
+    "*.mp4", "*.webm", "*.gif",
+    "*doubleclick.net*", "*googlesyndication.com*", "*googletagmanager.com*",
+    "*google-analytics.com*", "*googleadservices.com*", "*adservice.google.*",
+    "*facebook.net*", "*connect.facebook.*", "*mc.yandex.ru*", "*hotjar.com*",
+    "*scorecardresearch.com*", "*popads.net*", "*adsterra*", "*onclickads*",
+]
+# selenium-wire'ın bellekte tuttuğu en fazla istek sayısı (yalnızca manifest
+# desenine uyan istekler kaydedilir).
+RESOLVER_REQUEST_STORAGE_MAX = 50
 # İndirme klasörü artık Ayarlar'dan yönetildiği için buradan kaldırıldı.
 
 # --- Hedef Site Ayarları ---
@@ -32,3 +46,113 @@ ALLOWED_DOMAIN = "hdfilmcehennemi.ltd"
 
 # --- Otomatik İndirme Ayarları ---
 AUTO_DOWNLOAD_POLL_INTERVAL = 10
+# Çok prosesli sunucuda zamanlayıcı liderliğinin yeniden denenme aralığı (sn).
+LEADER_RETRY_INTERVAL = 5
+# Boş indirme slotlarına ek olarak kaynağı önceden hazırlanacak iş sayısı.
+RESOLVE_AHEAD = 1
+# Önceden bulunan manifestin indirme için geçerli sayıldığı en uzun süre (sn).
+MANIFEST_MAX_AGE = int(os.getenv("MANIFEST_MAX_AGE", "600"))
+# Süresi dolan bir kaynak bu kadar kez yeniden hazırlandıktan sonra indirme
+# aşamasında tarayıcıyla doğrudan çözülür.
+MANIFEST_MAX_RESOLVES = 3
+
+# --- Bellek Bütçesi Ayarları (memory_budget.py) ---
+# Ölçüm yokken bir işin tahmini bellek ihtiyacı: Chrome + selenium-wire proxy'si
+# ve yt-dlp (+ ffmpeg). Biten işlerin ölçülen en yüksek değerleri bunların yerini alır.
+RESOLVE_JOB_MEMORY_ESTIMATE = 700 * 1024 * 1024
+DOWNLOAD_JOB_MEMORY_ESTIMATE = 200 * 1024 * 1024
+# Yeni iş kabul edilirken sistemde boş bırakılacak en az bellek.
+MEMORY_HEADROOM = 256 * 1024 * 1024
+# yt-dlp ve alt proseslerine uygulanacak sanal bellek sınırı (RLIMIT_AS), örn. "2G".
+# Boşsa sınır yoktur. Chrome büyük adres alanı ayırdığı için tarayıcıya uygulanmaz.
+DOWNLOAD_RLIMIT_AS = os.getenv("DOWNLOAD_RLIMIT_AS", "")
+
+# --- Kütüphane Dizini Ayarları (library_index.py) ---
+# İndirme klasörünün artımlı olarak yeniden taranma aralığı (sn).
+LIBRARY_SCAN_INTERVAL = int(os.getenv("LIBRARY_SCAN_INTERVAL", "300"))
+
+# --- Hedef Site Hız Sınırı ve Devre Kesici (host_guard.py) ---
+# Tüm prosesler için ortak: sunucu başına saniyede istek sayısı ve birikebilecek en fazla istek.
+HOST_REQUEST_RATE = float(os.getenv("HOST_REQUEST_RATE", "1"))
+HOST_BURST = int(os.getenv("HOST_BURST", "5"))
+# Devre, HOST_ERROR_WINDOW saniyede en az HOST_MIN_REQUESTS istekten HOST_ERROR_RATE
+# oranı engelleme yanıtı (403/429/503, Cloudflare) aldığında açılır.
+HOST_ERROR_WINDOW = 60
+HOST_MIN_REQUESTS = 5
+HOST_ERROR_RATE = 0.5
+# Devre açıkken bekleme süresi: her başarısız denemede ikiye katlanır (sn).
+HOST_BACKOFF_BASE = 30
+HOST_BACKOFF_MAX = 15 * 60
+# Yarı açık devrede deneme isteğinin sonucunun beklendiği en uzun süre (sn).
+HOST_PROBE_TIMEOUT = 90
+# Bir isteğin hak beklerken bekleyebileceği en uzun süre (sn); aşılırsa iş sıraya geri alınır.
+HOST_MAX_WAIT = 60
+
+# --- Katalog Taraması Ayarları (catalog_crawler.py) ---
+# İlk taraması biten listelerin yeniden taranma aralığı (sn); varsayılan günde bir.
+CRAWL_SYNC_INTERVAL = int(os.getenv("CRAWL_SYNC_INTERVAL", str(24 * 3600)))
+# Zamanlayıcının taranacak liste olup olmadığına bakma aralığı (sn).
+CRAWL_CHECK_INTERVAL = 600
+# Bir turda taranacak en fazla sayfa; kalan sayfalar bir sonraki turda devam eder.
+CRAWL_MAX_PAGES_PER_RUN = 50
+# Senkronizasyon, bir sayfada bu kadar kayıtlı filme rastlayınca durur.
+CRAWL_KNOWN_STOP = 5
+# Taramayı yürüten prosesin listeyi kilitli tuttuğu süre (sn); her sayfada yenilenir.
+CRAWL_LEASE_SECONDS = 300
+
+# --- Yeni Bölüm Takibi Ayarları (series_watcher.py) ---
+# Zamanlayıcının kontrol zamanı gelen dizilere bakma aralığı (sn).
+SERIES_WATCH_POLL_INTERVAL = 60
+# Bir turda yenilenecek en fazla dizi.
+SERIES_WATCH_BATCH = 20
+# Kontrol aralığının dizi başına rastgele kaydırılma oranı (0.2 = ±%20).
+SERIES_WATCH_JITTER = 0.2
+
+# --- Otomatik Yeniden Deneme (retry_policy.py) ---
+# Hata sınıfı başına: en fazla deneme, ilk bekleme (sn; her denemede ikiye katlanır)
+# ve yeniden denemeden önce video kaynağının tarayıcıyla yeniden aranıp aranmayacağı.
+RETRY_POLICIES = {
+    "http_403": {"max_attempts": 4, "base_delay": 120, "re_resolve": True},
+    "http_404": {"max_attempts": 2, "base_delay": 3600, "re_resolve": True},
+    "enospc": {"max_attempts": 5, "base_delay": 900, "re_resolve": False},
+    "manifest_timeout": {"max_attempts": 3, "base_delay": 600, "re_resolve": True},
+    "unexpected": {"max_attempts": 3, "base_delay": 300, "re_resolve": False},
+}
+RETRY_MAX_DELAY = 6 * 3600
+
+# --- Uzlaştırma (Reconciliation) Ayarları ---
+# Yarım kalan işlerin ve sahipsiz proseslerin periyodik kontrol aralığı (sn).
+RECONCILE_INTERVAL = 60
+# Yeni başlatılmış proseslerin yanlışlıkla sahipsiz sayılmaması için bekleme süresi (sn).
+RECONCILE_GRACE_PERIOD = 30
+
+# --- Dağıtık Worker Ayarları ---
+# Uzak worker'ların iş API'sine erişimi için paylaşılan anahtar. Boşsa API kapalıdır.
+WORKER_TOKEN = os.getenv("WORKER_TOKEN", "")
+# Bir worker'ın kiraladığı işi heartbeat göndermeden tutabileceği süre (sn).
+WORKER_LEASE_SECONDS = int(os.getenv("WORKER_LEASE_SECONDS", "90"))
+
+# --- Dosya Taşıma (Staging) Ayarları ---
+# Hazırlık klasöründe biten indirmelerin kütüphaneye taşınması için kontrol aralığı (sn).
+MOVER_POLL_INTERVAL = 5
+
+# --- İndirme Sonrası İşleme Ayarları ---
+# 'İşleniyor' durumundaki kayıtların kontrol aralığı (sn).
+POSTPROCESS_POLL_INTERVAL = 5
+
+# --- Poster Önbelleği Ayarları ---
+POSTER_CACHE_DIR = os.path.join(DATA_DIR, "posters")
+# Önbelleğin diskte kaplayabileceği en fazla alan; aşılınca en eski posterler silinir.
+POSTER_CACHE_MAX_BYTES = int(os.getenv("POSTER_CACHE_MAX_MB", "200")) * 1024 * 1024
+# Pillow kuruluysa posterlerin küçültüleceği genişlik (piksel).
+POSTER_THUMBNAIL_WIDTH = 240
+
+# --- İş Logu Ayarları ---
+# Her iş için bellekte tutulan son log satırı sayısı.
+JOB_LOG_LINES = int(os.getenv("JOB_LOG_LINES", "500"))
+# Aynı anda bellekte arabelleği tutulan en fazla iş sayısı.
+JOB_LOG_MAX_JOBS = 200
+# Biten işlerin logu gzip ile diske kaydedilsin mi? (Çalışan işlerin canlı akış
+# için yazılan ara dosyası bu ayardan bağımsızdır ve iş bitince silinir.)
+JOB_LOG_PERSIST = os.getenv("JOB_LOG_PERSIST", "true").lower() == "true"
+JOB_LOG_DIR = os.path.join(DATA_DIR, "job_logs")
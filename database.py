@@ -4,6 +4,8 @@ import sqlite3
 import logging
 from flask import g
 import config
+import migrations
+import settings_cache
 
 logger = logging.getLogger(__name__)
 
@@ -27,74 +29,18 @@ def close_db(e=None):
         db.close()
 
 
+def full_text_search_available(db_conn):
+    row = db_conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'movies_fts'"
+    ).fetchone()
+    return row is not None
+
+
 def setup_database():
+    """Şemayı en son sürüme yükseltir (bkz. migrations.py)."""
     try:
-        db = sqlite3.connect(config.DATABASE)
-        cursor = db.cursor()
-        logger.info("Veritabanı tabloları kontrol ediliyor/oluşturuluyor...")
-
-        # --- FİLM TABLOSU ---
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS movies (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            url TEXT NOT NULL UNIQUE,
-            status TEXT NOT NULL DEFAULT 'Sırada',
-            title TEXT, year TEXT, genre TEXT, description TEXT,
-            imdb_score TEXT, director TEXT, cast TEXT, poster_url TEXT,
-            source_site TEXT, source_url TEXT,
-            progress REAL DEFAULT 0.0,
-            filepath TEXT,
-            pid INTEGER,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-        """)
-
-        # --- DİZİ TABLOLARI ---
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS series (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            title TEXT NOT NULL,
-            source_url TEXT NOT NULL UNIQUE,
-            poster_url TEXT,
-            description TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-        """)
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS seasons (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            series_id INTEGER NOT NULL,
-            season_number INTEGER NOT NULL,
-            FOREIGN KEY (series_id) REFERENCES series (id) ON DELETE CASCADE,
-            UNIQUE (series_id, season_number)
-        )
-        """)
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS episodes (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            season_id INTEGER NOT NULL,
-            episode_number INTEGER NOT NULL,
-            title TEXT,
-            url TEXT NOT NULL UNIQUE,
-            status TEXT NOT NULL DEFAULT 'Sırada',
-            progress REAL DEFAULT 0.0,
-            filepath TEXT,
-            pid INTEGER,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (season_id) REFERENCES seasons (id) ON DELETE CASCADE
-        )
-        """)
-
-        # --- AYARLAR TABLOSU ---
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS settings (
-            key TEXT PRIMARY KEY,
-            value TEXT
-        )
-        """)
-
-        db.commit()
-        db.close()
+        logger.info("Veritabanı şeması kontrol ediliyor...")
+        migrations.migrate(config.DATABASE)
         logger.info("Veritabanı kurulumu başarıyla tamamlandı.")
     except sqlite3.Error as e:
         logger.error(f"Veritabanı kurulumu sırasında hata oluştu: {e}", exc_info=True)
@@ -109,6 +55,18 @@ def init_settings():
         "SERIES_FILENAME_TEMPLATE": "{series_title}/Season {season_number:02d}/{series_title} - S{season_number:02d}E{episode_number:02d} - {episode_title}",
         "CONCURRENT_DOWNLOADS": "1",
         "SPEED_LIMIT": "",
+        "STAGING_FOLDER": "",
+        "MOVER_CONCURRENCY": "1",
+        "MOVER_SPEED_LIMIT": "",
+        "DUPLICATE_POLICY": "skip",
+        "SERIES_WATCH": "all",
+        "SERIES_WATCH_INTERVAL": "6",
+        "POSTPROCESS_FORMAT": "",
+        "POSTPROCESS_CONCURRENCY": "1",
+        "RESOLVER_CONCURRENCY": "1",
+        "MEMORY_BUDGET": "",
+        "AUTO_DOWNLOAD_ENABLED": "false",
+        "QUALITY_POLICY": "",
         "ADMIN_PASSWORD_HASH": config.ADMIN_PASSWORD_HASH,
     }
 
@@ -122,35 +80,28 @@ def init_settings():
             )
         db.commit()
         db.close()
+        settings_cache.invalidate()
         logger.info("Varsayılan ayarlar veritabanına yüklendi.")
     except sqlite3.Error as e:
         logger.error(f"Varsayılan ayarlar yüklenirken hata oluştu: {e}", exc_info=True)
 
 
 def get_setting(key, db_conn=None):
-    close_conn = False
+    # Bağlantı verilmezse değer süreç içi önbellekten okunur.
     if db_conn is None:
-        db_conn = sqlite3.connect(config.DATABASE)
-        close_conn = True
+        return settings_cache.get(key)
 
     cursor = db_conn.cursor()
     row = cursor.execute("SELECT value FROM settings WHERE key = ?", (key,)).fetchone()
-    if close_conn:
-        db_conn.close()
     return row[0] if row else None
 
 
 def get_all_settings(db_conn=None):
-    close_conn = False
     if db_conn is None:
-        db_conn = sqlite3.connect(config.DATABASE)
-        db_conn.row_factory = sqlite3.Row
-        close_conn = True
+        return settings_cache.get_all()
 
     rows = db_conn.execute("SELECT key, value FROM settings").fetchall()
-    if close_conn:
-        db_conn.close()
-    return {row["key"]: row["value"] for row in rows}
+    return {row[0]: row[1] for row in rows}
 
 
 def update_setting(key, value, db_conn=None):
@@ -164,3 +115,6 @@ def update_setting(key, value, db_conn=None):
     if close_conn:
         db_conn.commit()
         db_conn.close()
+    # Bağlantı dışarıdan verildiyse çağıran taraf commit sonrası da invalidate()
+    # çağırmalıdır; aksi halde arada yüklenen görüntü eski değerleri tutabilir.
+    settings_cache.invalidate()
@@ -0,0 +1,27 @@
+# @author: MembaCo.
+
+"""gunicorn yapılandırması (bkz. wsgi.py)."""
+
+import multiprocessing
+import os
+
+bind = os.getenv("BIND", "0.0.0.0:5000")
+workers = int(os.getenv("WEB_CONCURRENCY", str(min(multiprocessing.cpu_count(), 4))))
+# Canlı iş logu (SSE) bağlantıları bir thread'i meşgul eder.
+worker_class = "gthread"
+threads = int(os.getenv("WEB_THREADS", "8"))
+timeout = 120
+# Log kuyruğu, ayar sürüm sayacı ve veritabanı hazırlığı worker'lar arasında
+# paylaşılabilsin diye uygulama ana proseste yüklenir.
+preload_app = True
+# İndirme prosesleri onları başlatan worker'ın çocuğudur; worker'ları periyodik
+# olarak yeniden başlatmak (max_requests) süren indirmeleri bekletir.
+max_requests = 0
+
+
+def post_fork(server, worker):
+    import scheduler
+    from app import app
+
+    # Arka plan yöneticileri ana proseste değil, seçilen tek bir worker'da çalışır.
+    scheduler.start(app)
@@ -0,0 +1,206 @@
+# @author: MembaCo.
+
+"""
+HLS ana oynatma listesinden (master playlist) kaliteye göre varyant seçimi.
+
+Kaynak bulunduğunda manifest bir kez indirilir; ana liste ise varyantlar
+(çözünürlük, bant genişliği, ses grubu) ve ses seçenekleri (dil) ayrıştırılır
+ve kalite politikasına göre bir varyant seçilir. Politika noktalı virgülle
+ayrılmış anahtar=değer çiftlerinden oluşur:
+
+    max_height=720          720p'yi aşmayan en iyi varyant
+    max_bitrate=2500k       bant genişliği sınırı (yalın sayı kbit/sn)
+    smallest_above=720      en az 720p olan en küçük varyant
+    audio=tr                tercih edilen ses dili
+
+Boş politika en yüksek kaliteyi seçer (yt-dlp'nin varsayılanı); bu durumda
+indirme davranışı değişmez, yalnızca seçilen varyant kaydedilir.
+"""
+
+import logging
+import re
+from urllib.parse import urljoin
+
+import requests
+
+import config
+
+logger = logging.getLogger(__name__)
+
+MAX_PLAYLIST_BYTES = 2 * 1024 * 1024
+POLICY_KEYS = ("max_height", "max_bitrate", "smallest_above", "audio")
+_ATTRIBUTE_PATTERN = re.compile(r'([A-Z0-9-]+)=("[^"]*"|[^,]*)')
+# Manifest isteğini yeniden gönderirken taşınmaması gereken başlıklar.
+_SKIPPED_HEADERS = {"content-length", "host", "connection", "accept-encoding"}
+
+
+def parse_attribute_list(text):
+    return {
+        key: value[1:-1] if value.startswith('"') else value
+        for key, value in _ATTRIBUTE_PATTERN.findall(text)
+    }
+
+
+def _bitrate(value):
+    """'2500k', '2.5M' veya yalın kbit/sn değerini bit/sn olarak döndürür."""
+    match = re.fullmatch(r"\s*([0-9.]+)\s*([kKmM]?)\s*", str(value))
+    if not match:
+        raise ValueError(f"Geçersiz bit hızı: {value}")
+    multiplier = {"": 1000, "k": 1000, "m": 1000**2}[match.group(2).lower()]
+    return int(float(match.group(1)) * multiplier)
+
+
+def parse_quality_policy(text):
+    """Politika metnini sözlüğe çevirir; geçersizse ValueError fırlatır."""
+    policy = {}
+    for part in re.split(r"[;,]", text or ""):
+        part = part.strip()
+        if not part or part.lower() == "best":
+            continue
+        key, sep, value = part.partition("=")
+        key, value = key.strip().lower(), value.strip()
+        if not sep or key not in POLICY_KEYS or not value:
+            raise ValueError(f"Geçersiz kalite politikası öğesi: {part}")
+        if key == "audio":
+            policy[key] = value.lower()
+        elif key == "max_bitrate":
+            policy[key] = _bitrate(value)
+        else:
+            policy[key] = int(value.lower().rstrip("p"))
+    return policy
+
+
+def parse_master_playlist(text, base_url):
+    """Ana liste değilse None; aksi halde {'variants': [...], 'audio': [...]}."""
+    if not text.lstrip().startswith("#EXTM3U") or "#EXT-X-STREAM-INF" not in text:
+        return None
+    variants, audio = [], []
+    pending = None
+    for raw_line in text.splitlines():
+        line = raw_line.strip()
+        if line.startswith("#EXT-X-STREAM-INF:"):
+            pending = parse_attribute_list(line.split(":", 1)[1])
+        elif line.startswith("#EXT-X-MEDIA:"):
+            attrs = parse_attribute_list(line.split(":", 1)[1])
+            if attrs.get("TYPE") == "AUDIO":
+                audio.append(
+                    {
+                        "group": attrs.get("GROUP-ID"),
+                        "language": (attrs.get("LANGUAGE") or "").lower(),
+                        "name": attrs.get("NAME") or "",
+                        "default": attrs.get("DEFAULT") == "YES",
+                        "uri": urljoin(base_url, attrs["URI"]) if attrs.get("URI") else None,
+                    }
+                )
+        elif pending is not None and line and not line.startswith("#"):
+            width, _, height = (pending.get("RESOLUTION") or "").partition("x")
+            variants.append(
+                {
+                    "uri": urljoin(base_url, line),
+                    "bandwidth": int(
+                        pending.get("AVERAGE-BANDWIDTH") or pending.get("BANDWIDTH") or 0
+                    ),
+                    "width": int(width) if width.isdigit() else None,
+                    "height": int(height) if height.isdigit() else None,
+                    "codecs": pending.get("CODECS"),
+                    "audio_group": pending.get("AUDIO"),
+                }
+            )
+            pending = None
+    return {"variants": variants, "audio": audio} if variants else None
+
+
+def select_variant(variants, policy):
+    """Politikaya uyan varyantı seçer; hiçbiri uymuyorsa sınıra en yakın olanı."""
+    candidates = [v for v in variants if v["height"]] or list(variants)
+
+    def quality(variant):
+        return (variant["height"] or 0, variant["bandwidth"])
+
+    if "max_height" in policy:
+        within = [v for v in candidates if (v["height"] or 0) <= policy["max_height"]]
+        candidates = within or [min(candidates, key=quality)]
+    if "max_bitrate" in policy:
+        within = [v for v in candidates if v["bandwidth"] <= policy["max_bitrate"]]
+        candidates = within or [min(candidates, key=lambda v: v["bandwidth"])]
+    if "smallest_above" in policy:
+        above = [v for v in candidates if (v["height"] or 0) >= policy["smallest_above"]]
+        if above:
+            return min(above, key=quality)
+    return max(candidates, key=quality)
+
+
+def select_audio(renditions, group, language=None):
+    group_renditions = [r for r in renditions if r["group"] == group]
+    if not group_renditions:
+        return None
+    if language:
+        for rendition in group_renditions:
+            if rendition["language"].startswith(language) or language in rendition["name"].lower():
+                return rendition
+    return next((r for r in group_renditions if r["default"]), group_renditions[0])
+
+
+def request_options(headers, cookies):
+    """Tarayıcıdan yakalanan başlık ve çerezleri requests parametrelerine çevirir."""
+    request_headers = {
+        key: value for key, value in (headers or {}).items() if key.lower() not in _SKIPPED_HEADERS
+    }
+    request_headers.setdefault("User-Agent", config.USER_AGENT)
+    return {
+        "headers": request_headers,
+        "cookies": {c["name"]: c["value"] for c in cookies or [] if "name" in c and "value" in c},
+        "timeout": 15,
+    }
+
+
+def fetch_playlist(manifest_url, headers, cookies):
+    """Manifesti tarayıcının başlık ve çerezleriyle indirir; başarısızsa None."""
+    try:
+        response = requests.get(manifest_url, **request_options(headers, cookies))
+        response.raise_for_status()
+    except requests.exceptions.RequestException as e:
+        logger.warning(f"Manifest kalite seçimi için okunamadı: {e}")
+        return None
+    if len(response.content) > MAX_PLAYLIST_BYTES:
+        return None
+    return response.text
+
+
+def apply_quality_policy(manifest_url, headers, cookies, policy_text):
+    """
+    İndirilecek adresi, yt-dlp format ifadesini (gerekirse) ve kaydedilecek seçim
+    bilgisini döndürür. Manifest ana liste değilse veya okunamazsa adres aynen
+    kullanılır.
+    """
+    try:
+        policy = parse_quality_policy(policy_text)
+    except ValueError as e:
+        logger.warning(f"{e}; en yüksek kalite kullanılacak.")
+        policy = {}
+    text = fetch_playlist(manifest_url, headers, cookies)
+    master = parse_master_playlist(text, manifest_url) if text else None
+    if not master:
+        return manifest_url, None, None
+
+    variant = select_variant(master["variants"], policy)
+    audio = select_audio(master["audio"], variant["audio_group"], policy.get("audio"))
+    info = {
+        "policy": policy_text or "",
+        "resolution": f"{variant['width']}x{variant['height']}" if variant["height"] else None,
+        "bandwidth": variant["bandwidth"],
+        "codecs": variant["codecs"],
+        "audio": (audio["language"] or audio["name"]) if audio else None,
+        "variant_count": len(master["variants"]),
+    }
+    if not policy:
+        # Politika yoksa seçim yt-dlp'ye bırakılır; yalnızca bilgi amaçlı kaydedilir.
+        return manifest_url, None, info
+    if audio and audio["uri"]:
+        # Ses ayrı bir listede: ana liste verilip yt-dlp'ye hangi ikilinin
+        # birleştirileceği format ifadesiyle söylenir.
+        video = f"bv*[height={variant['height']}]" if variant["height"] else "bv*"
+        language = f"[language={audio['language']}]" if audio["language"] else ""
+        format_spec = f"{video}+ba{language}/{video}+ba/b"
+        return manifest_url, format_spec, info
+    return variant["uri"], None, info
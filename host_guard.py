@@ -0,0 +1,284 @@
+# @author: MembaCo.
+
+"""
+Hedef site için sunucu başına ortak hız sınırı (token bucket) ve devre kesici.
+
+Toplu liste eklemeleri, dizi yenilemeleri ve paralel kaynak çözme işleri aynı
+siteye birbirinden habersiz istek gönderir. Site 403/429 veya Cloudflare
+sayfası döndürmeye başladığında her iş ayrı ayrı başarısız olur. Bu modülün
+durumu SQLite'taki host_limits tablosunda tutulur; böylece web prosesi,
+zamanlayıcı thread'leri ve tüm worker prosesleri aynı kovayı ve aynı devreyi
+paylaşır.
+
+    closed      istekler HOST_REQUEST_RATE hızında, HOST_BURST kadar birikerek geçer
+    open        son HOST_ERROR_WINDOW saniyedeki isteklerin en az HOST_ERROR_RATE
+                oranı engelleme yanıtıyla dönmüşse devre açılır; yeni istekler
+                bekletilir (HOST_MAX_WAIT aşılırsa HostUnavailable fırlatılır)
+    half_open   bekleme süresi dolunca tek bir deneme isteğine izin verilir;
+                başarılıysa devre kapanır, değilse bekleme süresi ikiye katlanarak
+                (en fazla HOST_BACKOFF_MAX) yeniden açılır
+
+Retry-After başlıklı bir 429 yanıtı devreyi en az o süre kadar hemen açar.
+Veritabanına erişilemeyen ortamlarda (uzak worker) sınırlama uygulanmaz.
+"""
+
+import logging
+import sqlite3
+import time
+from urllib.parse import urlsplit
+
+import requests
+
+import config
+
+logger = logging.getLogger(__name__)
+
+BLOCKING_STATUS_CODES = {403, 429, 503}
+CHALLENGE_MARKERS = ("just a moment...", "attention required! | cloudflare", "cf-chl-", "cf_chl_")
+
+
+class HostUnavailable(Exception):
+    """Devre açık ve bekleme süresi HOST_MAX_WAIT'i aşıyor."""
+
+    def __init__(self, host, retry_at):
+        self.host = host
+        self.retry_at = retry_at
+        super().__init__(
+            f"{host} geçici olarak erişilemiyor; {max(0, int(retry_at - time.time()))} sn sonra yeniden denenecek."
+        )
+
+
+def host_key(url):
+    host = urlsplit(url if "//" in url else f"//{url}").netloc.lower()
+    return host[4:] if host.startswith("www.") else host
+
+
+def _connect():
+    # mode=rw: veritabanı yoksa (uzak worker) boş bir dosya oluşturulmaz.
+    conn = sqlite3.connect(
+        f"file:{config.DATABASE}?mode=rw", uri=True, timeout=30, isolation_level=None
+    )
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def _load(conn, host, now):
+    row = conn.execute("SELECT * FROM host_limits WHERE host = ?", (host,)).fetchone()
+    if row:
+        return dict(row)
+    state = {
+        "host": host,
+        "state": "closed",
+        "tokens": float(config.HOST_BURST),
+        "refilled_at": now,
+        "window_start": now,
+        "window_requests": 0,
+        "window_failures": 0,
+        "backoff": 0.0,
+        "open_until": None,
+        "probe_until": None,
+        "last_error": None,
+    }
+    conn.execute(
+        f"INSERT INTO host_limits ({', '.join(state)}) VALUES ({', '.join('?' for _ in state)})",
+        tuple(state.values()),
+    )
+    return state
+
+
+def _save(conn, state):
+    columns = [key for key in state if key != "host"]
+    conn.execute(
+        f"UPDATE host_limits SET {', '.join(f'{c} = ?' for c in columns)} WHERE host = ?",
+        (*(state[c] for c in columns), state["host"]),
+    )
+
+
+def _try_acquire(conn, host, now):
+    """Bir istek hakkı alınabildiyse 0, aksi halde beklenecek süreyi döndürür."""
+    state = _load(conn, host, now)
+    if state["state"] == "open":
+        if now < state["open_until"]:
+            return state["open_until"] - now
+        state["state"] = "half_open"
+        state["probe_until"] = None
+        logger.info(f"{host}: Devre yarı açık, deneme isteği gönderilecek.")
+    if state["state"] == "half_open":
+        if state["probe_until"] and now < state["probe_until"]:
+            # Deneme isteği başka bir proseste sürüyor.
+            return min(state["probe_until"] - now, 1.0)
+        state["probe_until"] = now + config.HOST_PROBE_TIMEOUT
+        _save(conn, state)
+        return 0
+    state["tokens"] = min(
+        float(config.HOST_BURST),
+        state["tokens"] + (now - state["refilled_at"]) * config.HOST_REQUEST_RATE,
+    )
+    state["refilled_at"] = now
+    if state["tokens"] >= 1:
+        state["tokens"] -= 1
+        _save(conn, state)
+        return 0
+    _save(conn, state)
+    return (1 - state["tokens"]) / config.HOST_REQUEST_RATE
+
+
+def acquire(url, max_wait=None):
+    """
+    Sunucuya bir istek hakkı alınana kadar bekler. Devre açıksa ve bekleme
+    max_wait'i (varsayılan HOST_MAX_WAIT) aşacaksa HostUnavailable fırlatır.
+    """
+    host = host_key(url)
+    max_wait = config.HOST_MAX_WAIT if max_wait is None else max_wait
+    deadline = time.time() + max_wait
+    while True:
+        now = time.time()
+        try:
+            conn = _connect()
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                wait = _try_acquire(conn, host, now)
+                conn.execute("COMMIT")
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            logger.debug(f"Hız sınırı uygulanamadı ({host}): {e}")
+            return
+        if wait <= 0:
+            return
+        if now + wait > deadline:
+            raise HostUnavailable(host, now + wait)
+        time.sleep(wait)
+
+
+def is_blocked_response(response):
+    """Yanıt sitenin engelleme/koruma sayfası mı?"""
+    if response.status_code in BLOCKING_STATUS_CODES:
+        return True
+    if "text/html" not in response.headers.get("Content-Type", ""):
+        return False
+    head = response.text[:4096].lower()
+    return any(marker in head for marker in CHALLENGE_MARKERS)
+
+
+def is_challenge_page(title_or_html):
+    text = (title_or_html or "").lower()
+    return any(marker in text for marker in CHALLENGE_MARKERS)
+
+
+def _open(state, now, reason, retry_after=None):
+    state["backoff"] = min(
+        config.HOST_BACKOFF_MAX,
+        state["backoff"] * 2 if state["backoff"] else config.HOST_BACKOFF_BASE,
+    )
+    state["state"] = "open"
+    state["open_until"] = now + max(state["backoff"], retry_after or 0)
+    state["probe_until"] = None
+    state["last_error"] = reason
+    logger.warning(
+        f"{state['host']}: Devre açıldı ({reason}); istekler "
+        f"{int(state['open_until'] - now)} sn bekletilecek."
+    )
+
+
+def record(url, ok, reason=None, retry_after=None):
+    """İsteğin sonucunu devre kesiciye bildirir."""
+    host = host_key(url)
+    now = time.time()
+    try:
+        conn = _connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            state = _load(conn, host, now)
+            if state["state"] == "half_open":
+                if ok:
+                    state.update(state="closed", backoff=0.0, open_until=None, probe_until=None)
+                    state.update(window_start=now, window_requests=0, window_failures=0)
+                    logger.info(f"{host}: Deneme isteği başarılı, devre kapandı.")
+                else:
+                    _open(state, now, reason or "deneme isteği başarısız", retry_after)
+            elif state["state"] == "closed":
+                if now - state["window_start"] > config.HOST_ERROR_WINDOW:
+                    state.update(window_start=now, window_requests=0, window_failures=0)
+                state["window_requests"] += 1
+                if not ok:
+                    state["window_failures"] += 1
+                    state["last_error"] = reason
+                if not ok and retry_after:
+                    _open(state, now, reason or "Retry-After", retry_after)
+                elif (
+                    state["window_requests"] >= config.HOST_MIN_REQUESTS
+                    and state["window_failures"] / state["window_requests"] >= config.HOST_ERROR_RATE
+                ):
+                    _open(state, now, reason or "hata oranı")
+            _save(conn, state)
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        logger.debug(f"Devre kesici durumu kaydedilemedi ({host}): {e}")
+
+
+def _retry_after(response):
+    try:
+        return float(response.headers.get("Retry-After", ""))
+    except ValueError:
+        return None
+
+
+def get(url, max_wait=None, **kwargs):
+    """Hız sınırı ve devre kesiciden geçen requests.get; yanıtı olduğu gibi döndürür."""
+    acquire(url, max_wait)
+    try:
+        response = requests.get(url, **kwargs)
+    except requests.exceptions.RequestException as e:
+        record(url, False, f"ağ hatası: {type(e).__name__}")
+        raise
+    if is_blocked_response(response):
+        record(url, False, f"HTTP {response.status_code}", _retry_after(response))
+    else:
+        record(url, True)
+    return response
+
+
+def retry_at(url):
+    """Devre açıksa isteklerin yeniden deneneceği an, değilse None."""
+    try:
+        conn = _connect()
+        try:
+            row = conn.execute(
+                "SELECT state, open_until FROM host_limits WHERE host = ?", (host_key(url),)
+            ).fetchone()
+        finally:
+            conn.close()
+    except sqlite3.Error:
+        return None
+    if row and row["state"] == "open" and row["open_until"] > time.time():
+        return row["open_until"]
+    return None
+
+
+def states(db):
+    """Durum API'si için sunucu başına devre durumu."""
+    now = time.time()
+    return [
+        {
+            "host": row["host"],
+            "state": row["state"],
+            "tokens": round(
+                min(
+                    float(config.HOST_BURST),
+                    row["tokens"] + (now - row["refilled_at"]) * config.HOST_REQUEST_RATE,
+                ),
+                2,
+            ),
+            "retry_in": max(0, int(row["open_until"] - now)) if row["open_until"] else None,
+            "error_rate": (
+                round(row["window_failures"] / row["window_requests"], 2)
+                if row["window_requests"]
+                else 0
+            ),
+            "last_error": row["last_error"],
+        }
+        for row in db.execute("SELECT * FROM host_limits ORDER BY host").fetchall()
+    ]
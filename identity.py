@@ -0,0 +1,136 @@
+# @author: MembaCo.
+
+"""
+Aynı filmin farklı URL'ler (ayna siteler, değişen slug'lar, liste sayfaları)
+altında tekrar indirilmesini önlemek için içerik kimliği yardımcıları.
+
+Bir film; IMDb kimliği, sayfanın canonical adresi veya normalize edilmiş
+"başlık + yıl" anahtarıyla tanınır. Bu alanlar movies tablosunda indeksli
+tutulur ve hem sıraya eklerken hem de indirme başlamadan önce kontrol edilir.
+"""
+
+import re
+import unicodedata
+from urllib.parse import urlsplit, urlunsplit
+
+IMDB_ID_PATTERN = re.compile(r"\b(tt\d{7,9})\b")
+# Başlıklarda içerikten bağımsız olarak sıkça geçen site ekleri.
+TITLE_NOISE_WORDS = {
+    "izle",
+    "full",
+    "hd",
+    "turkce",
+    "dublaj",
+    "altyazili",
+    "altyazi",
+    "tek",
+    "parca",
+}
+_TURKISH_FOLD = str.maketrans({"ı": "i", "İ": "i", "ş": "s", "ğ": "g", "ç": "c", "ö": "o", "ü": "u"})
+
+# Kopya olarak atlanan kayıtların durum öneki.
+DUPLICATE_STATUS_PREFIX = "Atlandı"
+
+
+def normalize_title(title):
+    """Başlığı küçük harfe, aksansız ve noktalamasız tek bir biçime indirger."""
+    if not title:
+        return ""
+    text = str(title).translate(_TURKISH_FOLD).lower()
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    words = re.findall(r"[a-z0-9]+", text)
+    return " ".join(word for word in words if word not in TITLE_NOISE_WORDS)
+
+
+def identity_key(title, year):
+    """'başlık|yıl' anahtarı; başlık veya geçerli bir yıl yoksa None."""
+    normalized = normalize_title(title)
+    year = str(year or "").strip()
+    if not normalized or not re.fullmatch(r"\d{4}", year):
+        return None
+    return f"{normalized}|{year}"
+
+
+def normalize_url(url):
+    """Şema, 'www.', sorgu dizesi ve sondaki eğik çizgi farklarını yok sayar."""
+    if not url:
+        return None
+    parts = urlsplit(url.strip())
+    host = parts.netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    path = parts.path.rstrip("/") or "/"
+    return urlunsplit(("https", host, path, "", ""))
+
+
+def extract_imdb_id(*values):
+    """Verilen metin/liste değerlerinin ilkinde bulunan IMDb kimliğini döndürür."""
+    for value in values:
+        candidates = value if isinstance(value, (list, tuple)) else [value]
+        for candidate in candidates:
+            if isinstance(candidate, dict):
+                candidate = candidate.get("@id") or candidate.get("url")
+            match = IMDB_ID_PATTERN.search(str(candidate or ""))
+            if match:
+                return match.group(1)
+    return None
+
+
+def page_identifiers(soup, json_ld_item=None):
+    """Film sayfasından IMDb kimliğini ve canonical adresi çıkarır."""
+    json_ld_item = json_ld_item or {}
+    imdb_link = soup.find("a", href=IMDB_ID_PATTERN)
+    imdb_id = extract_imdb_id(
+        json_ld_item.get("sameAs"),
+        json_ld_item.get("@id"),
+        imdb_link.get("href") if imdb_link else None,
+    )
+    canonical_tag = soup.find("link", rel="canonical")
+    canonical_url = (
+        canonical_tag.get("href") if canonical_tag and canonical_tag.get("href") else None
+    ) or json_ld_item.get("url")
+    return {
+        "imdb_id": imdb_id,
+        "canonical_url": normalize_url(canonical_url) if canonical_url else None,
+    }
+
+
+def find_duplicate_movie(
+    db, url, title, year, imdb_id=None, canonical_url=None, exclude_id=None, statuses=None
+):
+    """
+    Aynı içeriğe sahip başka bir film kaydını arar. statuses verilirse yalnızca
+    bu durumlardaki kayıtlar dikkate alınır. Bulunan satırı veya None döndürür.
+    """
+    conditions, params = [], []
+    if imdb_id:
+        conditions.append("imdb_id = ?")
+        params.append(imdb_id)
+    for candidate in {normalize_url(url), canonical_url} - {None}:
+        conditions.append("canonical_url = ?")
+        params.append(candidate)
+    key = identity_key(title, year)
+    if key:
+        conditions.append("identity_key = ?")
+        params.append(key)
+    if not conditions:
+        return None
+
+    # Her koşul kendi indeksini kullanabilsin diye OR yerine UNION ile birleştirilir.
+    extra, extra_params = "", []
+    if exclude_id is not None:
+        extra += " AND id != ?"
+        extra_params.append(exclude_id)
+    if statuses:
+        extra += f" AND status IN ({', '.join('?' for _ in statuses)})"
+        extra_params.extend(statuses)
+        # Dosyası diskten silinmiş tamamlanmış kayıtlar yeniden indirmeye engel değildir.
+        extra += " AND (status != 'Tamamlandı' OR filepath IS NOT NULL)"
+    queries, query_params = [], []
+    for condition, param in zip(conditions, params):
+        queries.append(f"SELECT id, title, status FROM movies WHERE {condition}{extra}")
+        query_params.extend([param, *extra_params])
+    return db.execute(
+        f"SELECT * FROM ({' UNION '.join(queries)}) ORDER BY id LIMIT 1", query_params
+    ).fetchone()
@@ -0,0 +1,245 @@
+# @author: MembaCo.
+
+"""
+İş bazlı log arabellekleri.
+
+Her indirme işinin çözücü (resolver) ve yt-dlp çıktısı, ana süreçte sınırlı
+boyutlu bir halka arabellekte (deque) tutulur. Worker prosesleri kayıtlarını
+zaten merkezi log kuyruğuna gönderdiği için buradaki JobLogHandler kuyruk
+dinleyicisine eklenir ve `job` alanı taşıyan kayıtları ilgili arabelleğe yazar.
+İş bittiğinde arabellek (JOB_LOG_PERSIST açıksa) gzip ile DATA_DIR/job_logs
+altına kaydedilir; uygulama yeniden başlasa da son çıktı okunabilir.
+
+yt-dlp'nin ayrıntılı çıktısı `job_only` olarak işaretlenir ve app.log'a yazılmaz.
+
+Birden fazla web prosesiyle (gunicorn) çalışırken bellek arabellekleri yalnızca
+kuyruk dinleyicisinin çalıştığı ana proseste bulunur ve bu proses istek
+karşılamaz. Bu yüzden iş sürerken satırlar, JOB_LOG_PERSIST ayarından bağımsız
+olarak her zaman DATA_DIR/job_logs altındaki bir ara dosyaya (spool) eklenir;
+diğer prosesler canlı akışı bu dosyadan okur. Sıra numarası olarak satırın
+dosyadaki bitiş konumu (bayt) kullanılır; her yoklamada yalnızca yeni eklenen
+kısım okunur.
+"""
+
+import collections
+import gzip
+import logging
+import os
+import threading
+import time
+
+import config
+
+logger = logging.getLogger(__name__)
+
+# yt-dlp çıktısını taşıyan logger; kayıtları yalnızca iş arabelleklerine gider.
+JOB_OUTPUT_LOGGER = "job_output"
+
+# Ara dosyada yeni satır beklenirken yoklama aralığı (sn).
+SPOOL_POLL_INTERVAL = 0.5
+
+_buffers = collections.OrderedDict()
+_finished = set()
+_seq = 0
+_condition = threading.Condition()
+# İş arabelleklerini besleyen dinleyicinin çalıştığı prosesin pid'i.
+_owner_pid = None
+
+
+def job_key(item_type, item_id):
+    return f"{item_type}:{item_id}"
+
+
+def _archive_path(key):
+    item_type, item_id = key.split(":", 1)
+    return os.path.join(config.JOB_LOG_DIR, f"{item_type}_{item_id}.log.gz")
+
+
+def _spool_path(key):
+    item_type, item_id = key.split(":", 1)
+    return os.path.join(config.JOB_LOG_DIR, f"{item_type}_{item_id}.live.log")
+
+
+def _is_owner():
+    """Bu proses iş arabelleklerinin tam akışını alıyor mu?"""
+    return _owner_pid == os.getpid()
+
+
+def _append_spool(key, lines):
+    if not lines:
+        return
+    try:
+        os.makedirs(config.JOB_LOG_DIR, exist_ok=True)
+        with open(_spool_path(key), "a", encoding="utf-8") as f:
+            f.write("".join(line.rstrip("\r\n") + "\n" for line in lines))
+    except OSError as e:
+        logger.warning(f"İş logu ara dosyaya yazılamadı ({key}): {e}")
+
+
+def _read_spool(key, offset=0):
+    """
+    Ara dosyada offset'ten sonraki tam satırları (bitiş_konumu, satır) olarak
+    döndürür; dosya yoksa None. Yarım yazılmış son satır bir sonraki okumaya kalır.
+    """
+    try:
+        with open(_spool_path(key), "rb") as f:
+            if offset > os.fstat(f.fileno()).st_size:
+                # İş yeniden başlatılmış, dosya baştan yazılıyor.
+                offset = 0
+            f.seek(offset)
+            data = f.read()
+    except OSError:
+        return None
+    lines = []
+    # Satırlar '\r' içerebilir (yt-dlp ilerleme çıktısı); yalnızca '\n' ile bölünür.
+    for raw in data[: data.rfind(b"\n") + 1].split(b"\n")[:-1]:
+        offset += len(raw) + 1
+        lines.append((offset, raw.decode("utf-8", "replace")))
+    return lines
+
+
+class JobTagFilter(logging.Filter):
+    """Worker prosesindeki her kayda ait olduğu işi ekler."""
+
+    def __init__(self, key):
+        super().__init__()
+        self.key = key
+
+    def filter(self, record):
+        record.job = self.key
+        return True
+
+
+class MainLogFilter(logging.Filter):
+    """Yalnızca iş arabelleğine ait kayıtların app.log ve stdout'a yazılmasını engeller."""
+
+    def filter(self, record):
+        return not getattr(record, "job_only", False)
+
+
+class JobLogHandler(logging.Handler):
+    """Kuyruk dinleyicisinde çalışır; iş etiketli kayıtları arabelleklere dağıtır."""
+
+    def __init__(self):
+        global _owner_pid
+        super().__init__()
+        _owner_pid = os.getpid()
+
+    def emit(self, record):
+        key = getattr(record, "job", None)
+        if not key:
+            return
+        if getattr(record, "job_finished", False):
+            finish(key)
+            return
+        try:
+            append(key, [self.format(record)])
+        except Exception:
+            self.handleError(record)
+
+
+def _buffer_for(key):
+    buffer = _buffers.get(key)
+    if buffer is None:
+        buffer = collections.deque(maxlen=config.JOB_LOG_LINES)
+        _buffers[key] = buffer
+        while len(_buffers) > config.JOB_LOG_MAX_JOBS:
+            evicted, _ = _buffers.popitem(last=False)
+            _finished.discard(evicted)
+    else:
+        _buffers.move_to_end(key)
+    return buffer
+
+
+def append(key, lines):
+    """Arabelleğe satır ekler ve akış bekleyen istemcileri uyandırır."""
+    global _seq
+    _append_spool(key, lines)
+    if not _is_owner():
+        return
+    with _condition:
+        buffer = _buffer_for(key)
+        # Aynı iş yeniden başlatıldıysa eski 'bitti' işareti geçersizdir.
+        _finished.discard(key)
+        for line in lines:
+            _seq += 1
+            buffer.append((_seq, line.rstrip("\r\n")))
+        _condition.notify_all()
+
+
+def finish(key):
+    """İşi tamamlanmış olarak işaretler ve arabelleği diske kaydeder."""
+    with _condition:
+        _finished.add(key)
+        lines = [line for _, line in _buffers.get(key, ())]
+        _condition.notify_all()
+    if not _is_owner():
+        # Bellekteki arabellek eksik olabilir; tam kayıt ara dosyadadır.
+        lines = [line for _, line in (_read_spool(key) or [])][-config.JOB_LOG_LINES :]
+    if lines and config.JOB_LOG_PERSIST:
+        try:
+            os.makedirs(config.JOB_LOG_DIR, exist_ok=True)
+            temp_path = f"{_archive_path(key)}.tmp"
+            with gzip.open(temp_path, "wt", encoding="utf-8") as f:
+                f.write("\n".join(lines) + "\n")
+            os.replace(temp_path, _archive_path(key))
+        except OSError as e:
+            logger.warning(f"İş logu kaydedilemedi ({key}): {e}")
+    try:
+        os.remove(_spool_path(key))
+    except OSError:
+        pass
+
+
+def read_since(key, after_seq=0):
+    """after_seq'ten sonraki satırları ve işin bitip bitmediğini döndürür."""
+    if not _is_owner():
+        # Sıra numarası olarak satırın ara dosyadaki bitiş konumu kullanılır.
+        lines = _read_spool(key, after_seq)
+        if lines is None:
+            return [], os.path.exists(_archive_path(key))
+        return lines, False
+    with _condition:
+        buffer = _buffers.get(key)
+        if buffer is None:
+            return [], key in _finished
+        return [(seq, line) for seq, line in buffer if seq > after_seq], key in _finished
+
+
+def wait_for_lines(key, after_seq, timeout):
+    """Yeni satır gelene, iş bitene veya süre dolana kadar bekler."""
+    if not _is_owner():
+        deadline = time.monotonic() + timeout
+        while True:
+            lines, finished = read_since(key, after_seq)
+            if lines or finished or time.monotonic() >= deadline:
+                return lines, finished
+            time.sleep(SPOOL_POLL_INTERVAL)
+    with _condition:
+        _condition.wait_for(
+            lambda: key in _finished
+            or (key in _buffers and _buffers[key] and _buffers[key][-1][0] > after_seq),
+            timeout=timeout,
+        )
+    return read_since(key, after_seq)
+
+
+def load_archived(key):
+    """Bellekte olmayan bir işin diske kaydedilmiş logunu okur."""
+    try:
+        with gzip.open(_archive_path(key), "rt", encoding="utf-8") as f:
+            return f.read().splitlines()
+    except OSError:
+        return None
+
+
+def delete_archived(item_type, item_id):
+    key = job_key(item_type, item_id)
+    with _condition:
+        _buffers.pop(key, None)
+        _finished.discard(key)
+    for path in (_archive_path(key), _spool_path(key)):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
@@ -0,0 +1,118 @@
+# @author: MembaCo.
+
+"""
+Yerel indirme proseslerinin paylaşılan kaydı.
+
+Uygulama birden fazla web prosesiyle (gunicorn worker'ları) çalışabildiği için
+hangi işin hangi pid ile çalıştığı proses belleğinde değil, veritabanındaki
+jobs tablosunda tutulur. Bir işi başlatan proses kaydı ekler; iş biten prosesin
+kendisi (veya durdurma isteği) kaydı siler. Çökmüş prosesler, okuma sırasında
+/proc üzerinden canlılık kontrolüyle ayıklanır. Böylece eşzamanlılık limiti,
+durdurma/silme ve uzlaştırma hangi web prosesinde çalışırsa çalışsın aynı
+bilgiyi görür.
+"""
+
+import logging
+import os
+import sys
+import time
+
+logger = logging.getLogger(__name__)
+
+# Kayıt zamanı ile prosesin gerçek başlangıcı arasında tolere edilen fark (sn);
+# pid yeniden kullanıldıysa proses kayıttan belirgin şekilde daha genç olur.
+PID_REUSE_SLACK = 5
+
+# Bu prosesin başlattığı Process nesneleri; biten çocuklar bunlar üzerinden toplanır.
+_children = {}
+
+
+def proc_state_and_age(pid):
+    """Prosesin durum harfini ve saniye cinsinden yaşını /proc üzerinden okur."""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+    except (OSError, IndexError, ValueError):
+        return None, 0
+    start_seconds = int(fields[19]) / os.sysconf("SC_CLK_TCK")
+    return fields[0], uptime - start_seconds
+
+
+def is_alive(pid, started_at):
+    process = _children.get(pid)
+    if process is not None:
+        # is_alive() biten çocuğu da toplar (zombi bırakmaz).
+        if process.is_alive():
+            return True
+        _children.pop(pid, None)
+        return False
+    if sys.platform == "win32":
+        # Windows'ta os.kill prosesi sonlandırır; yalnızca kendi çocuklarımız bilinir.
+        return False
+    if os.path.isdir("/proc"):
+        state, age = proc_state_and_age(pid)
+        if state is None or state == "Z":
+            return False
+        return age + PID_REUSE_SLACK >= time.time() - started_at
+    try:
+        os.kill(pid, 0)
+    except OSError:
+        return False
+    return True
+
+
+def register(db, item_type, item_id, process, stage="download"):
+    """
+    Yeni başlatılan prosesi kaydeder (commit çağırana aittir). stage, işin kaynak
+    çözme ('resolve') mi yoksa indirme ('download') aşamasında mı olduğunu belirtir.
+    """
+    _children[process.pid] = process
+    db.execute(
+        "REPLACE INTO jobs (item_type, item_id, pid, owner_pid, started_at, stage) "
+        "VALUES (?, ?, ?, ?, ?, ?)",
+        (item_type, item_id, process.pid, os.getpid(), time.time(), stage),
+    )
+
+
+def unregister(db, item_type, item_id, pid=None):
+    if pid is None:
+        db.execute("DELETE FROM jobs WHERE item_type = ? AND item_id = ?", (item_type, item_id))
+    else:
+        db.execute(
+            "DELETE FROM jobs WHERE item_type = ? AND item_id = ? AND pid = ?",
+            (item_type, item_id, pid),
+        )
+
+
+def live_jobs(db):
+    """Canlı işlerin listesi; sonlanmış proseslerin kayıtları bu sırada silinir."""
+    live, dead = [], []
+    for row in db.execute("SELECT * FROM jobs").fetchall():
+        (live if is_alive(row["pid"], row["started_at"]) else dead).append(row)
+    if dead:
+        db.executemany(
+            "DELETE FROM jobs WHERE item_type = ? AND item_id = ? AND pid = ?",
+            [(row["item_type"], row["item_id"], row["pid"]) for row in dead],
+        )
+        db.commit()
+        for row in dead:
+            logger.info(
+                f"İş kaydı temizlendi: {row['item_type']} ID {row['item_id']} "
+                f"(PID: {row['pid']}) artık çalışmıyor."
+            )
+    return live
+
+
+def live_pids(db):
+    return {row["pid"] for row in live_jobs(db)}
+
+
+def live_items(db):
+    """
+    Canlı bir prosesi olan (item_type, item_id) çiftleri. Kaydın pid sütunu iş
+    sürerken kısa süreliğine boş olabilir (ör. kaynak hazırlandıktan sonra);
+    bir işin canlı olup olmadığına bu kayıttan bakılır.
+    """
+    return {(row["item_type"], row["item_id"]) for row in live_jobs(db)}
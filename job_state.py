@@ -0,0 +1,78 @@
+# @author: MembaCo.
+
+"""
+Film ve bölüm kayıtlarının tamsayı durum kodları (state sütunu).
+
+status sütunu kullanıcıya gösterilen metni ('Sırada', 'Hata: ...') tutmaya
+devam eder ve tüm yazma işlemleri onu günceller. state ve error_detail
+sütunları migrations.py'deki tetikleyicilerle status'tan türetilir; zamanlayıcı
+ve panel sorguları metin karşılaştırmaları ve NOT IN listeleri yerine state
+üzerindeki bileşik indeksleri kullanır.
+
+Hata ve atlama durumlarında metnin ön ekten sonraki kısmı error_detail'e yazılır.
+Tanınmayan metinler FAILED sayılır; panel filtreleri strict modla bunları reddeder.
+"""
+
+QUEUED = 0
+RESOLVING = 1
+READY = 2
+DOWNLOADING = 3
+PROCESSING = 4
+MOVING = 5
+COMPLETED = 6
+PAUSED = 7
+RETRY_WAIT = 8
+FAILED = 9
+SKIPPED = 10
+
+# Sabit metinli durumlar; sırası ve değerleri veritabanında saklandığından değiştirilmez.
+LABELS = {
+    QUEUED: "Sırada",
+    RESOLVING: "Kaynak aranıyor...",
+    READY: "Hazır",
+    DOWNLOADING: "İndiriliyor",
+    PROCESSING: "İşleniyor",
+    MOVING: "Taşınıyor",
+    COMPLETED: "Tamamlandı",
+    PAUSED: "Duraklatıldı",
+    RETRY_WAIT: "Yeniden denenecek",
+}
+# Metni serbest olan durumların ön ekleri ('Hata: ...', 'Atlandı: ...').
+PREFIXES = {FAILED: "Hata", SKIPPED: "Atlandı"}
+
+WORKING = (RESOLVING, DOWNLOADING)
+PIPELINE = (PROCESSING, MOVING)
+
+
+def from_status(status, strict=False):
+    """Durum metninin kodu; panel filtresindeki 'Hata' ve 'Atlandı' ön ekleri de tanınır.
+
+    strict=True ise tanınmayan metin FAILED sayılmaz, ValueError yükseltilir.
+    """
+    for state, label in LABELS.items():
+        if status == label:
+            return state
+    for state, prefix in PREFIXES.items():
+        if (status or "").startswith(prefix):
+            return state
+    if strict:
+        raise ValueError(f"Geçersiz durum: {status}")
+    return FAILED
+
+
+def state_sql(column):
+    """status sütunundan state değerini hesaplayan SQL ifadesi (from_status ile aynı kurallar)."""
+    cases = " ".join(f"WHEN '{label}' THEN {state}" for state, label in LABELS.items())
+    prefixes = " ".join(
+        f"WHEN {column} LIKE '{prefix}%' THEN {state}" for state, prefix in PREFIXES.items()
+    )
+    return f"CASE {column} {cases} ELSE CASE {prefixes} ELSE {FAILED} END END"
+
+
+def error_detail_sql(column):
+    """Hata/atlama metninin ön ek ve ':' sonrası kısmı; diğer durumlarda NULL."""
+    cases = " ".join(
+        f"WHEN {column} LIKE '{prefix}:%' THEN TRIM(SUBSTR({column}, {len(prefix) + 2}))"
+        for prefix in PREFIXES.values()
+    )
+    return f"CASE {cases} ELSE NULL END"
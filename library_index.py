@@ -0,0 +1,249 @@
+# @author: MembaCo.
+
+"""
+İndirme klasörünün (DOWNLOADS_FOLDER) artımlı dizini.
+
+Uygulama yalnızca kendi indirdiği dosyaları bilir; veritabanı yeniden
+oluşturulduğunda veya dosyalar elle kopyalandığında aynı içerik yeniden
+indirilir. Bu modül klasördeki video dosyalarını library_files tablosunda
+(yol, boyut, mtime) tutar ve dosyaları dosya adı şablonlarıyla film ve
+bölümlere eşler: eşleşen kayıtlar indirilmeden 'Tamamlandı' olarak işaretlenir,
+kaybolan dosyaların filepath değeri temizlenir.
+
+Yeniden taramalar ucuzdur: bir klasöre dosya eklendiğinde, silindiğinde veya
+yeniden adlandırıldığında klasörün mtime değeri değişir. mtime'ı değişmemiş
+klasörlerin içeriği listelenmez; yalnızca bilinen alt klasörlerine inilir. Çok
+terabaytlık bir kütüphanede tur maliyeti dosya sayısıyla değil, klasör
+sayısıyla orantılıdır.
+"""
+
+import logging
+import os
+import time
+import unicodedata
+
+import job_state
+import settings_cache
+from database import get_db
+from worker import build_output_parts
+
+logger = logging.getLogger(__name__)
+
+VIDEO_EXTENSIONS = {".mp4", ".mkv", ".webm", ".ts", ".m4v", ".avi", ".mov"}
+# Bu kadar yeni mtime'lı klasörler kaydedilmez; aynı saniye içinde gelen bir
+# değişiklik kaçırılmasın diye bir sonraki turda yeniden listelenir.
+MTIME_SETTLE_SECONDS = 2
+# Dosya eşleşmesiyle 'Tamamlandı'ya alınmayacak durumlar (işlemde olanlar ve atlananlar).
+_UNCLAIMABLE_STATES = (*job_state.WORKING, *job_state.PIPELINE, job_state.SKIPPED)
+
+
+def _key(relative_path):
+    """Uzantısız göreli yolu büyük/küçük harf ve Unicode farklarından arındırır."""
+    relative_path = relative_path.replace(os.sep, "/")
+    return unicodedata.normalize("NFC", relative_path).lower()
+
+
+def _file_key(root, path):
+    return _key(os.path.relpath(os.path.splitext(path)[0], root))
+
+
+def _list_directory(path):
+    files, subdirs = {}, []
+    with os.scandir(path) as entries:
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(entry.path)
+                elif (
+                    entry.is_file()
+                    and os.path.splitext(entry.name)[1].lower() in VIDEO_EXTENSIONS
+                ):
+                    stat = entry.stat()
+                    files[entry.path] = (stat.st_size, stat.st_mtime)
+            except OSError:
+                continue
+    return files, subdirs
+
+
+def scan(db, root):
+    """
+    Klasör ağacını artımlı olarak tarar ve dizini günceller. Eklenen ve silinen
+    dosya yollarının listesini döndürür; commit çağırana aittir.
+    """
+    root = os.path.abspath(root)
+    known_dirs, children = {}, {}
+    for row in db.execute("SELECT path, parent, mtime FROM library_dirs"):
+        known_dirs[row["path"]] = row["mtime"]
+        children.setdefault(row["parent"], []).append(row["path"])
+
+    added, removed, seen = [], [], set()
+    now = time.time()
+    stack = [root] if os.path.isdir(root) else []
+    while stack:
+        directory = stack.pop()
+        try:
+            mtime = os.stat(directory).st_mtime
+        except OSError:
+            continue
+        seen.add(directory)
+        if known_dirs.get(directory) == mtime:
+            stack.extend(children.get(directory, ()))
+            continue
+        try:
+            files, subdirs = _list_directory(directory)
+        except OSError as e:
+            logger.warning(f"Kütüphane klasörü okunamadı: {directory} ({e})")
+            continue
+        indexed = {
+            row["path"]: (row["size"], row["mtime"])
+            for row in db.execute(
+                "SELECT path, size, mtime FROM library_files WHERE dir = ?", (directory,)
+            )
+        }
+        for path, (size, file_mtime) in files.items():
+            if indexed.get(path) != (size, file_mtime):
+                if path not in indexed:
+                    added.append(path)
+                db.execute(
+                    "REPLACE INTO library_files (path, dir, size, mtime, match_key) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (path, directory, size, file_mtime, _file_key(root, path)),
+                )
+        gone = [path for path in indexed if path not in files]
+        db.executemany("DELETE FROM library_files WHERE path = ?", [(p,) for p in gone])
+        removed.extend(gone)
+        db.execute(
+            "REPLACE INTO library_dirs (path, parent, mtime) VALUES (?, ?, ?)",
+            (
+                directory,
+                os.path.dirname(directory) if directory != root else None,
+                mtime if now - mtime > MTIME_SETTLE_SECONDS else 0,
+            ),
+        )
+        stack.extend(subdirs)
+
+    vanished = [path for path in known_dirs if path not in seen]
+    for directory in vanished:
+        removed.extend(
+            row["path"]
+            for row in db.execute("SELECT path FROM library_files WHERE dir = ?", (directory,))
+        )
+        db.execute("DELETE FROM library_files WHERE dir = ?", (directory,))
+        db.execute("DELETE FROM library_dirs WHERE path = ?", (directory,))
+    return added, removed
+
+
+def find_file(db, item_id, item_type, settings):
+    """Kaydın dosya adı şablonuna karşılık gelen dizindeki dosyayı döndürür."""
+    _, output_parts = build_output_parts(db, item_id, item_type, settings)
+    if not output_parts:
+        return None
+    row = db.execute(
+        "SELECT path FROM library_files WHERE match_key = ? LIMIT 1",
+        (_key("/".join(output_parts)),),
+    ).fetchone()
+    return row["path"] if row else None
+
+
+def claim_existing_file(db, item_id, item_type, settings=None):
+    """
+    Kaydın dosyası kütüphanede zaten varsa kaydı indirmeden 'Tamamlandı'ya alır
+    ve dosya yolunu döndürür; yoksa None.
+    """
+    path = find_file(db, item_id, item_type, settings or settings_cache.get_all())
+    if not path or not os.path.isfile(path):
+        return None
+    table = "movies" if item_type == "movie" else "episodes"
+    placeholders = ", ".join("?" for _ in _UNCLAIMABLE_STATES)
+    cursor = db.execute(
+        f"""
+        UPDATE {table} SET status = 'Tamamlandı', progress = 100, filepath = ?, pid = NULL
+        WHERE id = ? AND state NOT IN ({placeholders})
+        """,
+        (path, item_id, *_UNCLAIMABLE_STATES),
+    )
+    db.commit()
+    if cursor.rowcount != 1:
+        return None
+    logger.info(f"ID {item_id} ({item_type}): Dosya kütüphanede zaten mevcut, indirilmeyecek: {path}")
+    return path
+
+
+def _claim_candidates(db, settings):
+    """Dosyası henüz bilinmeyen kayıtları dizindeki dosyalarla eşler."""
+    placeholders = ", ".join("?" for _ in _UNCLAIMABLE_STATES)
+    claimed = 0
+    for table, item_type in (("movies", "movie"), ("episodes", "episode")):
+        rows = db.execute(
+            f"""
+            SELECT id FROM {table}
+            WHERE state NOT IN ({placeholders})
+              AND (state != ? OR filepath IS NULL)
+            """,
+            (*_UNCLAIMABLE_STATES, job_state.COMPLETED),
+        ).fetchall()
+        for row in rows:
+            if claim_existing_file(db, row["id"], item_type, settings):
+                claimed += 1
+    return claimed
+
+
+def _forget_missing_files(db, paths):
+    """Silinen dosyaları gösteren kayıtların filepath değerini temizler."""
+    forgotten = 0
+    for table in ("movies", "episodes"):
+        for path in paths:
+            forgotten += db.execute(
+                f"UPDATE {table} SET filepath = NULL WHERE filepath = ? AND state = ?",
+                (path, job_state.COMPLETED),
+            ).rowcount
+    return forgotten
+
+
+def _forget_stale_filepaths(db):
+    """İlk taramada: diskte artık bulunmayan dosyaları gösteren kayıtları düzeltir."""
+    stale = [
+        row["filepath"]
+        for table in ("movies", "episodes")
+        for row in db.execute(
+            f"SELECT filepath FROM {table} WHERE state = ? AND filepath IS NOT NULL",
+            (job_state.COMPLETED,),
+        ).fetchall()
+        if not os.path.isfile(row["filepath"])
+    ]
+    return _forget_missing_files(db, stale)
+
+
+def run_scan_cycle():
+    """İndirme klasörünü tarar, yeni dosyaları kayıtlarla eşler ve bir özet döndürür."""
+    db = get_db()
+    settings = settings_cache.get_all()
+    root = settings.get("DOWNLOADS_FOLDER") or "downloads"
+    started = time.perf_counter()
+    first_scan = db.execute("SELECT 1 FROM library_dirs LIMIT 1").fetchone() is None
+    added, removed = scan(db, root)
+    summary = {
+        "added": len(added),
+        "removed": len(removed),
+        "forgotten": _forget_missing_files(db, removed),
+    }
+    if first_scan:
+        summary["forgotten"] += _forget_stale_filepaths(db)
+    db.commit()
+    # Eşleşme yalnızca yeni dosya geldiğinde aranır; yeni eklenen kayıtlar sıradan
+    # seçilirken (services._next_queued_item) ayrıca tek tek kontrol edilir.
+    summary["claimed"] = _claim_candidates(db, settings) if added or first_scan else 0
+    if any(summary.values()):
+        logger.info(
+            f"Kütüphane taraması ({time.perf_counter() - started:.2f} sn): {summary}"
+        )
+    return summary
+
+
+def run_scan_async(app):
+    """Ayarlar sayfasından istenen taramayı arka planda çalıştırır."""
+    with app.app_context():
+        try:
+            run_scan_cycle()
+        except Exception as e:
+            logger.error(f"Kütüphane taraması sırasında hata: {e}", exc_info=True)
@@ -1,29 +1,72 @@
 # @author: MembaCo.
 
+import atexit
 import logging
-from logging.handlers import RotatingFileHandler
+import multiprocessing
+import multiprocessing.queues
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 import sys
 import os
 
 # config.py'dan DATA_DIR'ı almak için import ediyoruz.
 import config
+import job_logs
 
 # Log dosyasının tam yolunu belirliyoruz.
 LOG_FILE = os.path.join(config.DATA_DIR, "app.log")
 
- 
+# Ana süreçteki dinleyici ve worker'ların kayıt gönderdiği kuyruk.
+_log_queue = None
+_listener = None
+
+
+class LogQueue(multiprocessing.queues.SimpleQueue):
+    """
+    Worker'ların ve indirme proseslerinin kayıt gönderdiği kuyruk.
+
+    multiprocessing.Queue kayıtları arka plandaki bir besleyici thread ile
+    gönderir; multiprocessing dışında fork eden sunucuların (gunicorn) worker'larında
+    bu thread kopyalanmadığından kayıtlar kaybolur. SimpleQueue doğrudan boruya
+    yazar ve fork sonrasında ek bir işlem gerektirmez. QueueHandler ve
+    QueueListener'ın kullandığı put_nowait/get(block) arayüzü burada tamamlanır.
+    """
+
+    def __init__(self):
+        super().__init__(ctx=multiprocessing.get_context())
+
+    def put_nowait(self, obj):
+        self.put(obj)
+
+    def get(self, block=True, timeout=None):
+        return super().get()
+
+
+def _build_formatter():
+    return logging.Formatter(
+        "%(asctime)s - %(name)s - %(levelname)s - %(process)d - %(message)s",
+        datefmt="%Y-%m-%d %H:%M:%S",
+    )
+
+
 def setup_logging():
-    """Uygulama genelinde kullanılacak merkezi loglama yapılandırmasını kurar."""
+    """
+    Uygulama genelinde kullanılacak merkezi loglama yapılandırmasını kurar.
+
+    Log dosyasına ve stdout'a yalnızca ana süreçteki tek bir QueueListener yazar;
+    Flask thread'leri ve indirme prosesleri kayıtlarını bir kuyruğa bırakır. Böylece
+    dosya döndürme (rotation) tek bir yerden yapılır ve eşzamanlı yazımlar
+    birbirine karışmaz.
+    """
+    global _log_queue, _listener
     logger = logging.getLogger()
     logger.setLevel(logging.INFO)
+    if _listener is not None:
+        return logger
 
     if logger.hasHandlers():
         logger.handlers.clear()
 
-    formatter = logging.Formatter(
-        "%(asctime)s - %(name)s - %(levelname)s - %(process)d - %(message)s",
-        datefmt="%Y-%m-%d %H:%M:%S",
-    )
+    formatter = _build_formatter()
 
     stdout_handler = logging.StreamHandler(sys.stdout)
     stdout_handler.setFormatter(formatter)
@@ -38,6 +81,49 @@ def setup_logging():
     )
     file_handler.setFormatter(formatter)
 
-    logger.addHandler(stdout_handler)
-    logger.addHandler(file_handler)
+    # İş etiketli kayıtlar ayrıca iş arabelleklerine gider; yalnızca işe ait
+    # ayrıntılı yt-dlp çıktısı ana loglara yazılmaz.
+    main_log_filter = job_logs.MainLogFilter()
+    stdout_handler.addFilter(main_log_filter)
+    file_handler.addFilter(main_log_filter)
+    job_handler = job_logs.JobLogHandler()
+    job_handler.setFormatter(
+        logging.Formatter("%(asctime)s %(levelname)s %(message)s", datefmt="%H:%M:%S")
+    )
+
+    _log_queue = LogQueue()
+    _listener = QueueListener(
+        _log_queue, stdout_handler, file_handler, job_handler, respect_handler_level=True
+    )
+    _listener.start()
+    atexit.register(_listener.stop)
+
+    logger.addHandler(QueueHandler(_log_queue))
+    return logger
+
+
+def get_log_queue():
+    """Worker proseslerine aktarılacak log kuyruğunu döndürür."""
+    return _log_queue
+
+
+def setup_worker_logging(log_queue, job=None):
+    """
+    İndirme prosesinde loglamayı ana süreçteki dinleyiciye yönlendirir. Worker
+    dosyaya hiç dokunmaz; kuyruk verilmemişse (ör. tek başına çalıştırma) yalnızca
+    stdout'a yazılır. job verilirse her kayıt o işin log arabelleğine de düşer.
+    """
+    logger = logging.getLogger()
+    logger.setLevel(logging.INFO)
+    if logger.hasHandlers():
+        logger.handlers.clear()
+
+    if log_queue is not None:
+        handler = QueueHandler(log_queue)
+    else:
+        handler = logging.StreamHandler(sys.stdout)
+        handler.setFormatter(_build_formatter())
+    if job:
+        handler.addFilter(job_logs.JobTagFilter(job))
+    logger.addHandler(handler)
     return logger
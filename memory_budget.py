@@ -0,0 +1,178 @@
+# @author: MembaCo.
+
+"""
+İşlerin bellek kullanımının izlenmesi ve belleğe göre iş kabulü.
+
+Her iş (kaynak çözme: Chrome + selenium-wire proxy'si, indirme: yt-dlp) bir
+proses ağacıdır. Ağacın toplam RSS'i /proc üzerinden tek geçişte ölçülür ve
+durum API'sinde gösterilir. Otomatik yönetici yeni bir işi başlatmadan önce
+çalışan işlerin bellek ihtiyacını ve yeni işin tahmini ihtiyacını toplar;
+toplam MEMORY_BUDGET ayarını veya sistemdeki kullanılabilir belleği aşacaksa
+iş bir sonraki tura bırakılır.
+
+Bir aşamanın tahmini, o aşamada biten son işlerin ölçülen en yüksek RSS
+değeridir; henüz ölçüm yoksa config'deki varsayılan kullanılır. /proc
+bulunmayan sistemlerde ölçüm yapılmaz ve yalnızca bütçe tahminlerle uygulanır.
+"""
+
+import collections
+import logging
+import os
+import threading
+
+import config
+import settings_cache
+
+logger = logging.getLogger(__name__)
+
+STAGES = ("resolve", "download")
+DEFAULT_ESTIMATES = {
+    "resolve": config.RESOLVE_JOB_MEMORY_ESTIMATE,
+    "download": config.DOWNLOAD_JOB_MEMORY_ESTIMATE,
+}
+
+_lock = threading.Lock()
+# Çalışan işlerin şimdiye kadarki en yüksek RSS'i: (item_type, item_id, pid) -> (aşama, bayt)
+_job_peaks = {}
+# Biten işlerin en yüksek RSS değerleri, aşama başına.
+_stage_peaks = {stage: collections.deque(maxlen=20) for stage in STAGES}
+
+
+def _page_size():
+    try:
+        return os.sysconf("SC_PAGE_SIZE")
+    except (AttributeError, ValueError, OSError):
+        return 4096
+
+
+def _scan_processes():
+    """Tüm proseslerin ebeveyn pid'lerini ve RSS değerlerini tek geçişte okur."""
+    parents, rss = {}, {}
+    page_size = _page_size()
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        pid = int(entry)
+        try:
+            with open(f"/proc/{pid}/stat") as f:
+                fields = f.read().rsplit(")", 1)[1].split()
+            with open(f"/proc/{pid}/statm") as f:
+                resident_pages = int(f.read().split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        parents[pid] = int(fields[1])
+        rss[pid] = resident_pages * page_size
+    return parents, rss
+
+
+def process_tree_rss(root_pids):
+    """Verilen her kök prosesin kendisi ve tüm alt proseslerinin toplam RSS'i (bayt)."""
+    if not root_pids or not os.path.isdir("/proc"):
+        return {}
+    parents, rss = _scan_processes()
+    children = collections.defaultdict(list)
+    for pid, parent in parents.items():
+        children[parent].append(pid)
+    totals = {}
+    for root in root_pids:
+        if root not in rss:
+            continue
+        total, stack = 0, [root]
+        while stack:
+            pid = stack.pop()
+            total += rss.get(pid, 0)
+            stack.extend(children.get(pid, ()))
+        totals[root] = total
+    return totals
+
+
+def estimate(stage):
+    """Aşamadaki yeni bir işin ihtiyaç duyacağı tahmini bellek (bayt)."""
+    with _lock:
+        observed = _stage_peaks[stage]
+        return max(observed) if observed else DEFAULT_ESTIMATES[stage]
+
+
+def sample(jobs):
+    """
+    Canlı iş kayıtlarının (job_registry.live_jobs) bellek kullanımını ölçer,
+    aşama tahminlerini günceller ve iş başına bir liste döndürür.
+    """
+    totals = process_tree_rss([job["pid"] for job in jobs])
+    usage, live_keys = [], set()
+    with _lock:
+        for job in jobs:
+            key = (job["item_type"], job["item_id"], job["pid"])
+            live_keys.add(key)
+            rss = totals.get(job["pid"])
+            if rss is not None:
+                _, peak = _job_peaks.get(key, (job["stage"], 0))
+                _job_peaks[key] = (job["stage"], max(peak, rss))
+            usage.append(
+                {
+                    "item_type": job["item_type"],
+                    "item_id": job["item_id"],
+                    "pid": job["pid"],
+                    "stage": job["stage"],
+                    "rss": rss,
+                }
+            )
+        for key in [k for k in _job_peaks if k not in live_keys]:
+            stage, peak = _job_peaks.pop(key)
+            if peak:
+                _stage_peaks[stage].append(peak)
+    return usage
+
+
+def available_memory():
+    """/proc/meminfo'daki MemAvailable değeri (bayt); okunamazsa None."""
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+def projected_usage(usage):
+    """Çalışan işlerin, henüz tahmin ettikleri kadar büyümemiş olsalar da ayrılan payı."""
+    return sum(max(job["rss"] or 0, estimate(job["stage"])) for job in usage)
+
+
+def admit(stage, usage):
+    """
+    Yeni bir işin mevcut işlerle birlikte belleğe sığıp sığmayacağını söyler.
+    Hiç iş çalışmıyorsa her zaman kabul edilir; aksi halde sıra hiç ilerlemezdi.
+    """
+    if not usage:
+        return True
+    needed = estimate(stage)
+    budget = settings_cache.get_typed("MEMORY_BUDGET")
+    if budget and projected_usage(usage) + needed > budget:
+        return False
+    available = available_memory()
+    if available is not None:
+        growth = sum(
+            max(0, estimate(job["stage"]) - (job["rss"] or 0)) for job in usage
+        )
+        if growth + needed + config.MEMORY_HEADROOM > available:
+            return False
+    return True
+
+
+def reserve(stage, usage):
+    """Kabul edilen işi, aynı turdaki sonraki kararlar için kullanım listesine ekler."""
+    usage.append({"item_type": None, "item_id": None, "pid": None, "stage": stage, "rss": None})
+
+
+def summary(usage):
+    """Durum API'si için toplam kullanım, bütçe ve aşama tahminleri."""
+    return {
+        "used": sum(job["rss"] or 0 for job in usage),
+        "projected": projected_usage(usage),
+        "budget": settings_cache.get_typed("MEMORY_BUDGET"),
+        "available": available_memory(),
+        "estimates": {stage: estimate(stage) for stage in STAGES},
+    }
@@ -0,0 +1,451 @@
+# @author: MembaCo.
+
+"""
+Sürümlü veritabanı şeması.
+
+Şema sürümü SQLite'ın PRAGMA user_version değerinde tutulur. Uygulama her
+açılışta (database.setup_database) sürümü okur ve MIGRATIONS listesinde daha
+yüksek numaralı adımları sırayla çalıştırır. Her adım tek bir BEGIN IMMEDIATE
+işleminde uygulanır ve sürüm aynı işlemde yükseltilir; adım yarıda kalırsa
+veritabanı önceki sürümde kalır. Aynı anda açılan birden fazla proses
+(gunicorn worker'ları) kilidi sırayla alır; kilidi alan proses sürümü yeniden
+okuduğundan bir adım iki kez uygulanmaz.
+
+Şema değişiklikleri setup_database'e değil, listenin sonuna yeni bir adım
+olarak eklenir. Adımlar yalnızca sütun/tablo/indeks ekleyip geriye dönük uyumlu
+kaldığından çalışan uygulama durdurulmadan yerinde uygulanabilir.
+
+Sürüm 1, sürümleme öncesindeki şemadır: hangi eski sürümden gelirse gelsin
+eksik tablo ve sütunları tamamlar (_ensure_column), bu yüzden yeniden
+çalıştırılması güvenlidir.
+"""
+
+import logging
+import sqlite3
+
+import config
+import job_state
+from identity import identity_key, normalize_url
+
+logger = logging.getLogger(__name__)
+
+
+def _ensure_column(cursor, table, column, definition):
+    """Eski veritabanlarında eksik olan sütunu ekler (ALTER TABLE ... ADD COLUMN)."""
+    columns = {row[1] for row in cursor.execute(f"PRAGMA table_info({table})")}
+    if column not in columns:
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+        logger.info(f"'{table}' tablosuna '{column}' sütunu eklendi.")
+
+
+def _execute_script(cursor, script):
+    """
+    Betiği ifade ifade çalıştırır. executescript() açık işlemi commit ettiğinden
+    adımların tek işlemde kalması için kullanılmaz.
+    """
+    statement = ""
+    for line in script.splitlines(keepends=True):
+        statement += line
+        if sqlite3.complete_statement(statement):
+            cursor.execute(statement)
+            statement = ""
+    if statement.strip():
+        cursor.execute(statement)
+
+
+def _setup_full_text_search(cursor):
+    """
+    Film ve dizi aramaları için FTS5 dizinlerini ve senkron tutan tetikleyicileri
+    kurar. SQLite FTS5 olmadan derlenmişse arama LIKE ile yapılmaya devam eder.
+    """
+    try:
+        movies_fts_exists = cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'movies_fts'"
+        ).fetchone()
+        cursor.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS movies_fts USING fts5(
+            title, description, director, "cast",
+            content='movies', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+        )
+        """)
+        _execute_script(cursor, """
+        CREATE TRIGGER IF NOT EXISTS movies_fts_ai AFTER INSERT ON movies BEGIN
+            INSERT INTO movies_fts (rowid, title, description, director, "cast")
+            VALUES (new.id, new.title, new.description, new.director, new."cast");
+        END;
+        CREATE TRIGGER IF NOT EXISTS movies_fts_ad AFTER DELETE ON movies BEGIN
+            INSERT INTO movies_fts (movies_fts, rowid, title, description, director, "cast")
+            VALUES ('delete', old.id, old.title, old.description, old.director, old."cast");
+        END;
+        CREATE TRIGGER IF NOT EXISTS movies_fts_au
+        AFTER UPDATE OF title, description, director, "cast" ON movies BEGIN
+            INSERT INTO movies_fts (movies_fts, rowid, title, description, director, "cast")
+            VALUES ('delete', old.id, old.title, old.description, old.director, old."cast");
+            INSERT INTO movies_fts (rowid, title, description, director, "cast")
+            VALUES (new.id, new.title, new.description, new.director, new."cast");
+        END;
+        """)
+        if not movies_fts_exists:
+            cursor.execute("INSERT INTO movies_fts (movies_fts) VALUES ('rebuild')")
+
+        series_fts_exists = cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'series_fts'"
+        ).fetchone()
+        cursor.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS series_fts USING fts5(
+            title, description,
+            content='series', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+        )
+        """)
+        _execute_script(cursor, """
+        CREATE TRIGGER IF NOT EXISTS series_fts_ai AFTER INSERT ON series BEGIN
+            INSERT INTO series_fts (rowid, title, description)
+            VALUES (new.id, new.title, new.description);
+        END;
+        CREATE TRIGGER IF NOT EXISTS series_fts_ad AFTER DELETE ON series BEGIN
+            INSERT INTO series_fts (series_fts, rowid, title, description)
+            VALUES ('delete', old.id, old.title, old.description);
+        END;
+        CREATE TRIGGER IF NOT EXISTS series_fts_au
+        AFTER UPDATE OF title, description ON series BEGIN
+            INSERT INTO series_fts (series_fts, rowid, title, description)
+            VALUES ('delete', old.id, old.title, old.description);
+            INSERT INTO series_fts (rowid, title, description)
+            VALUES (new.id, new.title, new.description);
+        END;
+        """)
+        if not series_fts_exists:
+            cursor.execute("INSERT INTO series_fts (series_fts) VALUES ('rebuild')")
+    except sqlite3.OperationalError as e:
+        logger.warning(f"FTS5 kullanılamıyor, arama LIKE ile yapılacak: {e}")
+
+
+def _backfill_movie_identities(cursor):
+    """Kimlik sütunları eklenmeden önce kaydedilmiş filmler için anahtarları üretir."""
+    rows = cursor.execute(
+        "SELECT id, url, title, year FROM movies WHERE canonical_url IS NULL"
+    ).fetchall()
+    for movie_id, url, title, year in rows:
+        cursor.execute(
+            "UPDATE movies SET identity_key = ?, canonical_url = ? WHERE id = ?",
+            (identity_key(title, year), normalize_url(url), movie_id),
+        )
+    if rows:
+        logger.info(f"{len(rows)} film için içerik kimliği oluşturuldu.")
+
+
+def _baseline(cursor):
+    """Sürüm 1: sürümleme öncesi şema (eski veritabanlarındaki eksikleri tamamlar)."""
+    # --- FİLM TABLOSU ---
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS movies (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        url TEXT NOT NULL UNIQUE,
+        status TEXT NOT NULL DEFAULT 'Sırada',
+        title TEXT, year TEXT, genre TEXT, description TEXT,
+        imdb_score TEXT, director TEXT, cast TEXT, poster_url TEXT,
+        source_site TEXT, source_url TEXT,
+        progress REAL DEFAULT 0.0,
+        filepath TEXT,
+        pid INTEGER,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """)
+
+    # --- DİZİ TABLOLARI ---
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS series (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        title TEXT NOT NULL,
+        source_url TEXT NOT NULL UNIQUE,
+        poster_url TEXT,
+        description TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS seasons (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        series_id INTEGER NOT NULL,
+        season_number INTEGER NOT NULL,
+        FOREIGN KEY (series_id) REFERENCES series (id) ON DELETE CASCADE,
+        UNIQUE (series_id, season_number)
+    )
+    """)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS episodes (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        season_id INTEGER NOT NULL,
+        episode_number INTEGER NOT NULL,
+        title TEXT,
+        url TEXT NOT NULL UNIQUE,
+        status TEXT NOT NULL DEFAULT 'Sırada',
+        progress REAL DEFAULT 0.0,
+        filepath TEXT,
+        pid INTEGER,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (season_id) REFERENCES seasons (id) ON DELETE CASCADE
+    )
+    """)
+
+    # --- DAĞITIK WORKER KİRALAMA (LEASE) SÜTUNLARI ---
+    for table in ("movies", "episodes"):
+        _ensure_column(cursor, table, "lease_owner", "TEXT")
+        _ensure_column(cursor, table, "lease_expires_at", "REAL")
+        cursor.execute(
+            f"CREATE INDEX IF NOT EXISTS idx_{table}_lease ON {table} (lease_expires_at) "
+            "WHERE lease_owner IS NOT NULL"
+        )
+
+    # --- ÖNCELİK VE ADİL SIRALAMA (FAIR-SHARE) ---
+    # Bölümlere dizi kimliği kopyalanır; böylece zamanlayıcı her diziyi ayrı bir
+    # kulvar olarak, JOIN yapmadan ve yalnızca indeks aramalarıyla seçebilir.
+    for table in ("movies", "episodes", "series"):
+        _ensure_column(cursor, table, "priority", "INTEGER NOT NULL DEFAULT 0")
+    _ensure_column(cursor, "episodes", "series_id", "INTEGER")
+    cursor.execute("""
+    UPDATE episodes SET series_id = (
+        SELECT series_id FROM seasons WHERE seasons.id = episodes.season_id
+    ) WHERE series_id IS NULL
+    """)
+    _execute_script(cursor, """
+    CREATE TRIGGER IF NOT EXISTS episodes_series_ai AFTER INSERT ON episodes
+    WHEN new.series_id IS NULL BEGIN
+        UPDATE episodes SET
+            series_id = (SELECT series_id FROM seasons WHERE id = new.season_id),
+            priority = MAX(new.priority, COALESCE((
+                SELECT ser.priority FROM seasons s JOIN series ser ON ser.id = s.series_id
+                WHERE s.id = new.season_id
+            ), 0))
+        WHERE id = new.id;
+    END;
+    CREATE INDEX IF NOT EXISTS idx_movies_queue ON movies (priority, created_at, id)
+        WHERE status = 'Sırada';
+    CREATE INDEX IF NOT EXISTS idx_episodes_queue ON episodes (priority, series_id, created_at, id)
+        WHERE status = 'Sırada';
+    """)
+
+    # --- KALİTE POLİTİKASI (hls_variants.py) ---
+    _ensure_column(cursor, "series", "quality_policy", "TEXT")
+    for table in ("movies", "episodes"):
+        _ensure_column(cursor, table, "quality_info", "TEXT")
+
+    # --- YENİ BÖLÜM TAKİBİ (series_watcher.py) ---
+    _ensure_column(cursor, "series", "watch", "INTEGER NOT NULL DEFAULT 0")
+    _ensure_column(cursor, "series", "etag", "TEXT")
+    _ensure_column(cursor, "series", "last_modified", "TEXT")
+    _ensure_column(cursor, "series", "episodes_hash", "TEXT")
+    _ensure_column(cursor, "series", "last_checked_at", "REAL")
+    _ensure_column(cursor, "series", "next_check_at", "REAL")
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_series_next_check ON series (next_check_at)"
+    )
+
+    # --- OTOMATİK YENİDEN DENEME (retry_policy.py) ---
+    for table in ("movies", "episodes"):
+        _ensure_column(cursor, table, "error_code", "TEXT")
+        _ensure_column(cursor, table, "attempts", "INTEGER NOT NULL DEFAULT 0")
+        _ensure_column(cursor, table, "next_attempt_at", "REAL")
+
+    # --- İNDİRME SONRASI İŞLEME SONUÇLARI ---
+    for table in ("movies", "episodes"):
+        _ensure_column(cursor, table, "postprocess_info", "TEXT")
+
+    # --- KOPYA İÇERİK KİMLİK SÜTUNLARI ---
+    _ensure_column(cursor, "movies", "identity_key", "TEXT")
+    _ensure_column(cursor, "movies", "imdb_id", "TEXT")
+    _ensure_column(cursor, "movies", "canonical_url", "TEXT")
+    _execute_script(cursor, """
+    CREATE INDEX IF NOT EXISTS idx_movies_identity_key ON movies (identity_key);
+    CREATE INDEX IF NOT EXISTS idx_movies_imdb_id ON movies (imdb_id);
+    CREATE INDEX IF NOT EXISTS idx_movies_canonical_url ON movies (canonical_url);
+    """)
+    _backfill_movie_identities(cursor)
+
+    # --- LİSTELEME VE FİLTRELEME İNDEKSLERİ ---
+    _execute_script(cursor, """
+    CREATE INDEX IF NOT EXISTS idx_movies_created_at ON movies (created_at);
+    CREATE INDEX IF NOT EXISTS idx_movies_status ON movies (status);
+    CREATE INDEX IF NOT EXISTS idx_movies_year ON movies (year);
+    CREATE INDEX IF NOT EXISTS idx_episodes_season ON episodes (season_id, episode_number);
+    CREATE INDEX IF NOT EXISTS idx_episodes_status ON episodes (status);
+    """)
+    _setup_full_text_search(cursor)
+
+    # --- AYARLAR TABLOSU ---
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS settings (
+        key TEXT PRIMARY KEY,
+        value TEXT
+    )
+    """)
+
+    # --- ÇALIŞAN İŞ KAYDI (job_registry.py) ---
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS jobs (
+        item_type TEXT NOT NULL,
+        item_id INTEGER NOT NULL,
+        pid INTEGER NOT NULL,
+        owner_pid INTEGER NOT NULL,
+        started_at REAL NOT NULL,
+        PRIMARY KEY (item_type, item_id)
+    )
+    """)
+    # 'resolve' (tarayıcıyla kaynak çözme) veya 'download' (yt-dlp aktarımı)
+    _ensure_column(cursor, "jobs", "stage", "TEXT NOT NULL DEFAULT 'download'")
+
+    # --- KÜTÜPHANE DİZİNİ (library_index.py) ---
+    _execute_script(cursor, """
+    CREATE TABLE IF NOT EXISTS library_dirs (
+        path TEXT PRIMARY KEY,
+        parent TEXT,
+        mtime REAL NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS library_files (
+        path TEXT PRIMARY KEY,
+        dir TEXT NOT NULL,
+        size INTEGER NOT NULL,
+        mtime REAL NOT NULL,
+        match_key TEXT NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_library_files_dir ON library_files (dir);
+    CREATE INDEX IF NOT EXISTS idx_library_files_match_key ON library_files (match_key);
+    """)
+
+    # --- KATALOG TARAMASI (catalog_crawler.py) ---
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS catalog_crawls (
+        list_url TEXT PRIMARY KEY,
+        next_page_url TEXT,
+        backfill_done INTEGER NOT NULL DEFAULT 0,
+        pages INTEGER NOT NULL DEFAULT 0,
+        added INTEGER NOT NULL DEFAULT 0,
+        created_at REAL NOT NULL,
+        last_run_at REAL,
+        last_result TEXT,
+        lease_until REAL
+    )
+    """)
+
+    # --- SUNUCU BAŞINA HIZ SINIRI VE DEVRE KESİCİ (host_guard.py) ---
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS host_limits (
+        host TEXT PRIMARY KEY,
+        state TEXT NOT NULL DEFAULT 'closed',
+        tokens REAL NOT NULL,
+        refilled_at REAL NOT NULL,
+        window_start REAL NOT NULL,
+        window_requests INTEGER NOT NULL DEFAULT 0,
+        window_failures INTEGER NOT NULL DEFAULT 0,
+        backoff REAL NOT NULL DEFAULT 0,
+        open_until REAL,
+        probe_until REAL,
+        last_error TEXT
+    )
+    """)
+
+    # --- ÖNCEDEN ÇÖZÜLMÜŞ KAYNAKLAR (worker.resolve_video) ---
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS resolved_manifests (
+        item_type TEXT NOT NULL,
+        item_id INTEGER NOT NULL,
+        manifest_url TEXT NOT NULL,
+        download_url TEXT NOT NULL,
+        format_spec TEXT,
+        headers TEXT NOT NULL,
+        cookies TEXT NOT NULL,
+        resolved_at REAL NOT NULL,
+        attempts INTEGER NOT NULL DEFAULT 1,
+        PRIMARY KEY (item_type, item_id)
+    )
+    """)
+
+
+def _job_state(cursor):
+    """
+    Sürüm 2: tamsayı durum kodu (state) ve ayrı hata ayrıntısı (error_detail).
+
+    status metni tüm yazma yollarında güncellenmeye devam eder; tetikleyiciler
+    state ve error_detail'i aynı işlemde türetir. Böylece eski kod yolları ve
+    uzak worker'lar değişmeden çalışır. Metin karşılaştırmalı kısmi indeksler,
+    zamanlayıcı ve panel sorgularına göre tasarlanmış state indeksleriyle
+    değiştirilir.
+    """
+    for table in ("movies", "episodes"):
+        cursor.execute(
+            f"ALTER TABLE {table} ADD COLUMN state INTEGER NOT NULL DEFAULT {job_state.QUEUED}"
+        )
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN error_detail TEXT")
+        cursor.execute(
+            f"UPDATE {table} SET state = {job_state.state_sql('status')}, "
+            f"error_detail = {job_state.error_detail_sql('status')}"
+        )
+        _execute_script(cursor, f"""
+        CREATE TRIGGER {table}_state_ai AFTER INSERT ON {table} BEGIN
+            UPDATE {table} SET state = {job_state.state_sql('new.status')},
+                error_detail = {job_state.error_detail_sql('new.status')}
+            WHERE id = new.id;
+        END;
+        CREATE TRIGGER {table}_state_au AFTER UPDATE OF status ON {table}
+        WHEN new.status IS NOT old.status BEGIN
+            UPDATE {table} SET state = {job_state.state_sql('new.status')},
+                error_detail = {job_state.error_detail_sql('new.status')}
+            WHERE id = new.id;
+        END;
+        """)
+
+    _execute_script(cursor, """
+    DROP INDEX IF EXISTS idx_movies_queue;
+    DROP INDEX IF EXISTS idx_episodes_queue;
+    DROP INDEX IF EXISTS idx_movies_status;
+    DROP INDEX IF EXISTS idx_episodes_status;
+
+    -- Sıradan seçim: en yüksek öncelik, kulvar (series_id) ve en eski iş aramaları.
+    CREATE INDEX idx_movies_state_queue ON movies (state, priority, created_at, id);
+    CREATE INDEX idx_episodes_state_queue
+        ON episodes (state, priority, series_id, created_at, id);
+    -- Zamanı gelen yeniden denemeler (retry_policy.release_due_retries).
+    CREATE INDEX idx_movies_state_retry ON movies (state, next_attempt_at);
+    CREATE INDEX idx_episodes_state_retry ON episodes (state, next_attempt_at);
+    -- Panelin durum filtresi (eklenme tarihine göre sıralı).
+    CREATE INDEX idx_movies_state_created ON movies (state, created_at);
+    """)
+
+
+# (sürüm, açıklama, adım) — yalnızca sona ekleme yapılır, mevcut adımlar değiştirilmez.
+MIGRATIONS = [
+    (1, "Sürümleme öncesi şema", _baseline),
+    (2, "Tamsayı durum kodu ve hata ayrıntısı", _job_state),
+]
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def current_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(database=None):
+    """Veritabanını en son şema sürümüne yükseltir ve uygulanan adım sayısını döndürür."""
+    conn = sqlite3.connect(database or config.DATABASE, timeout=60, isolation_level=None)
+    applied = 0
+    try:
+        for version, description, step in MIGRATIONS:
+            if current_version(conn) >= version:
+                continue
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Kilit beklenirken başka bir proses bu adımı uygulamış olabilir.
+                if current_version(conn) >= version:
+                    conn.execute("COMMIT")
+                    continue
+                step(conn.cursor())
+                conn.execute(f"PRAGMA user_version = {version}")
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            applied += 1
+            logger.info(f"Veritabanı şeması yükseltildi (sürüm {version}): {description}.")
+    finally:
+        conn.close()
+    return applied
@@ -0,0 +1,135 @@
+# @author: MembaCo.
+
+"""
+Hazırlık (staging) klasöründe tamamlanan indirmeleri kütüphaneye taşıyan havuz.
+
+İndirme işlemleri STAGING_FOLDER ayarlıysa dosyaları hızlı bir yerel diske yazar ve
+kaydı 'Taşınıyor' durumuna alır. Bu modül, ana süreçte çalışan sınırlı sayıda
+thread ile bu dosyaları DOWNLOADS_FOLDER altındaki şablonlu yollarına taşır.
+Kaydın filepath ve durumu, dosya son konumuna ulaştıktan sonra tek bir UPDATE ile
+değiştirilir; yarım kalan bir taşıma asla 'Tamamlandı' olarak görünmez.
+"""
+
+import errno
+import logging
+import os
+import shutil
+import sqlite3
+import time
+
+import config
+import job_state
+import settings_cache
+import stage_pool
+
+logger = logging.getLogger(__name__)
+
+MOVING_STATUS = job_state.LABELS[job_state.MOVING]
+COPY_CHUNK_SIZE = 4 * 1024 * 1024
+
+
+def library_path_for(staged_path, staging_folder, downloads_folder):
+    """Hazırlık klasöründeki bir dosyanın kütüphanedeki karşılığını hesaplar."""
+    relative = os.path.relpath(staged_path, staging_folder)
+    if relative.startswith(os.pardir):
+        relative = os.path.basename(staged_path)
+    return os.path.join(downloads_folder, relative)
+
+
+def _copy_throttled(source, destination, bytes_per_second):
+    started = time.monotonic()
+    copied = 0
+    with open(source, "rb") as src, open(destination, "wb") as dst:
+        while True:
+            chunk = src.read(COPY_CHUNK_SIZE)
+            if not chunk:
+                break
+            dst.write(chunk)
+            copied += len(chunk)
+            if bytes_per_second:
+                delay = copied / bytes_per_second - (time.monotonic() - started)
+                if delay > 0:
+                    time.sleep(delay)
+        dst.flush()
+        os.fsync(dst.fileno())
+    shutil.copystat(source, destination)
+
+
+def move_file(source, destination, bytes_per_second=None):
+    """
+    Dosyayı hedefe taşır. Aynı dosya sisteminde (ve limit yoksa) tek bir rename
+    yeterlidir; aksi halde geçici bir dosyaya kopyalanıp atomik olarak yeniden
+    adlandırılır, ardından kaynak silinir.
+    """
+    os.makedirs(os.path.dirname(destination) or ".", exist_ok=True)
+    if not bytes_per_second:
+        try:
+            os.replace(source, destination)
+            return
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+    temp_destination = f"{destination}.moving"
+    try:
+        _copy_throttled(source, temp_destination, bytes_per_second)
+        os.replace(temp_destination, destination)
+    except BaseException:
+        if os.path.exists(temp_destination):
+            os.remove(temp_destination)
+        raise
+    os.remove(source)
+
+
+def _finish_move(item_type, item_id, staged_path, settings):
+    table = "movies" if item_type == "movie" else "episodes"
+    staging_folder = settings.get("STAGING_FOLDER") or ""
+    downloads_folder = settings.get("DOWNLOADS_FOLDER", "downloads")
+    destination = library_path_for(staged_path, staging_folder, downloads_folder)
+    conn = sqlite3.connect(config.DATABASE, timeout=30)
+    try:
+        started = time.monotonic()
+        move_file(
+            staged_path,
+            destination,
+            settings_cache.get_typed("MOVER_SPEED_LIMIT"),
+        )
+        conn.execute(
+            f"UPDATE {table} SET filepath = ?, status = 'Tamamlandı' WHERE id = ? AND status = ?",
+            (destination, item_id, MOVING_STATUS),
+        )
+        conn.commit()
+        logger.info(
+            f"ID {item_id} ({item_type}): Dosya kütüphaneye taşındı "
+            f"({time.monotonic() - started:.1f} sn): {destination}"
+        )
+    except (OSError, sqlite3.Error) as e:
+        logger.error(
+            f"ID {item_id} ({item_type}): Dosya kütüphaneye taşınamadı: {e}",
+            exc_info=True,
+        )
+        conn.execute(
+            f"UPDATE {table} SET status = ? WHERE id = ? AND status = ?",
+            ("Hata: Dosya kütüphaneye taşınamadı", item_id, MOVING_STATUS),
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+_pool = stage_pool.StagePool("mover", job_state.MOVING, _finish_move, "MOVER_CONCURRENCY")
+
+
+def run_mover_cycle():
+    """'Taşınıyor' durumundaki kayıtları taşıma havuzuna gönderir."""
+    _pool.run_cycle()
+
+
+def mover_manager():
+    """Arka planda taşıma kuyruğunu izleyen thread."""
+    logger.info("Dosya taşıma yöneticisi thread'i başlatıldı.")
+    while True:
+        try:
+            run_mover_cycle()
+        except Exception as e:
+            logger.error(f"Dosya taşıma yöneticisinde hata: {e}", exc_info=True)
+        time.sleep(config.MOVER_POLL_INTERVAL)
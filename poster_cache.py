@@ -0,0 +1,200 @@
+# @author: MembaCo.
+
+"""
+Poster görselleri için yerel önbellek.
+
+Posterler meta veri çekilirken bir kez indirilir, (Pillow kuruluysa) küçük
+resimlere dönüştürülür ve DATA_DIR altında saklanır. Panel görselleri kaynak
+siteden değil /poster rotasından, uzun süreli önbellek başlıkları ve ETag ile
+alır. Önbellek boyutu POSTER_CACHE_MAX_MB ile sınırlıdır; sınır aşıldığında en
+uzun süredir kullanılmayan dosyalar silinir.
+"""
+
+import hashlib
+import io
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+import config
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow yoksa posterler orijinal boyutlarıyla saklanır.
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+MAX_DOWNLOAD_BYTES = 10 * 1024 * 1024
+# Son erişim zamanını her istekte değil, en fazla bu aralıkla güncelle (sn).
+TOUCH_INTERVAL = 3600
+# Poster henüz önbelleğe alınmamışken gösterilen yer tutucu; kaynak siteye
+# yönlendirme yapılmaz.
+PLACEHOLDER_SVG = (
+    '<svg xmlns="http://www.w3.org/2000/svg" width="100" height="150" viewBox="0 0 100 150">'
+    '<rect width="100" height="150" fill="#1f2937"/>'
+    '<text x="50" y="80" fill="#9ca3af" font-family="sans-serif" font-size="11" '
+    'text-anchor="middle">Poster</text></svg>'
+)
+
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="poster")
+_lock = threading.Lock()
+_pending = set()
+_total_bytes = None
+
+
+def cache_key(poster_url):
+    return hashlib.sha1(poster_url.encode("utf-8")).hexdigest()
+
+
+def cached_path(key):
+    return os.path.join(config.POSTER_CACHE_DIR, key)
+
+
+def thumbnail_url(item_type, item_id, poster_url):
+    """Panelin kullanacağı yerel poster adresi. Poster değişirse adres de değişir."""
+    if not poster_url:
+        return None
+    return f"/poster/{item_type}/{item_id}?v={cache_key(poster_url)[:12]}"
+
+
+def guess_mimetype(path):
+    with open(path, "rb") as f:
+        head = f.read(12)
+    if head.startswith(b"\xff\xd8"):
+        return "image/jpeg"
+    if head.startswith(b"\x89PNG"):
+        return "image/png"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    if head[:3] == b"GIF":
+        return "image/gif"
+    return "application/octet-stream"
+
+
+def _make_thumbnail(data):
+    if Image is None:
+        return data
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            image = image.convert("RGB")
+            image.thumbnail((config.POSTER_THUMBNAIL_WIDTH, config.POSTER_THUMBNAIL_WIDTH * 2))
+            output = io.BytesIO()
+            image.save(output, format="JPEG", quality=85, optimize=True)
+            return output.getvalue()
+    except Exception as e:
+        logger.warning(f"Poster küçük resme dönüştürülemedi, orijinali saklanacak: {e}")
+        return data
+
+
+def _download(poster_url):
+    headers = {"User-Agent": config.USER_AGENT}
+    with requests.get(poster_url, headers=headers, timeout=15, stream=True) as response:
+        response.raise_for_status()
+        data = bytearray()
+        for chunk in response.iter_content(64 * 1024):
+            data.extend(chunk)
+            if len(data) > MAX_DOWNLOAD_BYTES:
+                raise ValueError("Poster dosyası çok büyük")
+    return bytes(data)
+
+
+def _current_total_bytes():
+    global _total_bytes
+    if _total_bytes is None:
+        total = 0
+        if os.path.isdir(config.POSTER_CACHE_DIR):
+            for entry in os.scandir(config.POSTER_CACHE_DIR):
+                if entry.is_file():
+                    total += entry.stat().st_size
+        _total_bytes = total
+    return _total_bytes
+
+
+def enforce_size_cap():
+    """Önbellek sınırı aşıldıysa en eski erişilen dosyaları siler (LRU)."""
+    global _total_bytes
+    limit = config.POSTER_CACHE_MAX_BYTES
+    with _lock:
+        if _current_total_bytes() <= limit:
+            return 0
+        entries = []
+        for entry in os.scandir(config.POSTER_CACHE_DIR):
+            if entry.is_file() and not entry.name.endswith(".tmp"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        target = limit * 0.9
+        removed = 0
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+                total -= size
+                removed += 1
+            except OSError:
+                continue
+        _total_bytes = total
+    if removed:
+        logger.info(f"Poster önbelleğinden {removed} dosya silindi (sınır: {limit} bayt).")
+    return removed
+
+
+def fetch_poster(poster_url):
+    """Posteri indirip önbelleğe yazar; dosya yolunu veya hata durumunda None döndürür."""
+    global _total_bytes
+    key = cache_key(poster_url)
+    path = cached_path(key)
+    if os.path.exists(path):
+        return path
+    try:
+        data = _make_thumbnail(_download(poster_url))
+        os.makedirs(config.POSTER_CACHE_DIR, exist_ok=True)
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(data)
+        os.replace(temp_path, path)
+        with _lock:
+            if _total_bytes is not None:
+                _total_bytes += len(data)
+        enforce_size_cap()
+        return path
+    except (requests.exceptions.RequestException, OSError, ValueError) as e:
+        logger.warning(f"Poster önbelleğe alınamadı: {poster_url} ({e})")
+        return None
+    finally:
+        with _lock:
+            _pending.discard(key)
+
+
+def cache_poster_async(poster_url):
+    """Posteri arka planda önbelleğe alır; aynı poster için tek indirme yapılır."""
+    if not poster_url or not poster_url.startswith(("http://", "https://")):
+        return
+    key = cache_key(poster_url)
+    with _lock:
+        if key in _pending or os.path.exists(cached_path(key)):
+            return
+        _pending.add(key)
+    _executor.submit(fetch_poster, poster_url)
+
+
+def lookup(poster_url):
+    """Önbellekteki dosyanın yolunu döndürür ve LRU için erişim zamanını günceller."""
+    path = cached_path(cache_key(poster_url))
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return None
+    if time.time() - mtime > TOUCH_INTERVAL:
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+    return path
@@ -0,0 +1,193 @@
+# @author: MembaCo.
+
+"""
+İndirme sonrası işleme (post-processing) havuzu.
+
+yt-dlp, --hls-use-mpegts nedeniyle MPEG-TS içerikli dosyalar üretir. İndirme
+prosesi baytlar diske yazılır yazılmaz kaydı 'İşleniyor' durumuna alıp çıkar,
+böylece indirme slotu hemen boşalır. Bu modül, ana süreçte kendi eşzamanlılık
+limitiyle çalışan thread'lerle:
+  - ffmpeg ile yeniden kodlamadan (stream copy) MP4/MKV'ye dönüştürür,
+  - MP4 için faststart uygular,
+  - ffprobe ile hızlı bir bütünlük kontrolü yapar,
+  - sonucu kaydın postprocess_info sütununa JSON olarak yazar.
+ffmpeg/ffprobe düşük CPU ve G/Ç önceliğiyle (nice/ionice) çalıştırılır.
+Ardından kayıt hazırlık klasöründeyse 'Taşınıyor', değilse 'Tamamlandı' olur.
+"""
+
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import subprocess
+import time
+
+import config
+import job_state
+import settings_cache
+import stage_pool
+
+logger = logging.getLogger(__name__)
+
+POSTPROCESS_STATUS = job_state.LABELS[job_state.PROCESSING]
+SUPPORTED_FORMATS = {"mp4": "mp4", "mkv": "matroska"}
+FFMPEG_TIMEOUT = 3 * 60 * 60
+FFPROBE_TIMEOUT = 120
+
+
+def _low_priority_prefix():
+    """Mümkünse komutu en düşük CPU ve G/Ç önceliğiyle çalıştıran önek."""
+    prefix = []
+    if shutil.which("nice"):
+        prefix += ["nice", "-n", "19"]
+    if shutil.which("ionice"):
+        prefix += ["ionice", "-c", "3"]
+    return prefix
+
+
+def probe(path):
+    """ffprobe ile süre, format ve akış bilgilerini okur; dosya bozuksa hata fırlatır."""
+    result = subprocess.run(
+        _low_priority_prefix()
+        + [
+            "ffprobe",
+            "-v",
+            "error",
+            "-show_entries",
+            "format=format_name,duration,size:stream=codec_type,codec_name",
+            "-of",
+            "json",
+            path,
+        ],
+        capture_output=True,
+        text=True,
+        timeout=FFPROBE_TIMEOUT,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"ffprobe başarısız: {result.stderr.strip()[-300:]}")
+    data = json.loads(result.stdout or "{}")
+    fmt = data.get("format", {})
+    streams = data.get("streams", [])
+    duration = float(fmt.get("duration") or 0)
+    if duration <= 0 or not any(s.get("codec_type") == "video" for s in streams):
+        raise RuntimeError("Dosyada geçerli bir video akışı bulunamadı.")
+    return {
+        "format": fmt.get("format_name"),
+        "duration": round(duration, 2),
+        "size": int(fmt.get("size") or os.path.getsize(path)),
+        "streams": [f"{s.get('codec_type')}:{s.get('codec_name')}" for s in streams],
+    }
+
+
+def remux(source, target_format):
+    """
+    Dosyayı yeniden kodlamadan hedef kapsayıcıya aktarır ve yeni yolu döndürür.
+    Çıktı önce geçici bir dosyaya yazılır; başarılı olursa kaynağın yerini alır.
+    """
+    target = f"{os.path.splitext(source)[0]}.{target_format}"
+    temp_target = f"{target}.remux"
+    command = _low_priority_prefix() + [
+        "ffmpeg",
+        "-nostdin",
+        "-y",
+        "-loglevel",
+        "error",
+        "-i",
+        source,
+        "-map",
+        "0",
+        "-c",
+        "copy",
+    ]
+    if target_format == "mp4":
+        command += ["-movflags", "+faststart"]
+    command += ["-f", SUPPORTED_FORMATS[target_format], temp_target]
+    try:
+        result = subprocess.run(
+            command, capture_output=True, text=True, timeout=FFMPEG_TIMEOUT
+        )
+        if result.returncode != 0:
+            raise RuntimeError(f"ffmpeg başarısız: {result.stderr.strip()[-300:]}")
+        os.replace(temp_target, target)
+    finally:
+        if os.path.exists(temp_target):
+            os.remove(temp_target)
+    if os.path.abspath(target) != os.path.abspath(source):
+        os.remove(source)
+    return target
+
+
+def _next_status(filepath, settings):
+    staging_folder = settings.get("STAGING_FOLDER") or ""
+    if staging_folder and os.path.abspath(filepath).startswith(
+        os.path.abspath(staging_folder) + os.sep
+    ):
+        return "Taşınıyor"
+    return "Tamamlandı"
+
+
+def _process_item(item_type, item_id, filepath, settings):
+    table = "movies" if item_type == "movie" else "episodes"
+    target_format = (settings.get("POSTPROCESS_FORMAT") or "").lower()
+    info = {}
+    status = None
+    started = time.monotonic()
+    try:
+        if target_format in SUPPORTED_FORMATS:
+            if shutil.which("ffmpeg"):
+                try:
+                    filepath = remux(filepath, target_format)
+                    info["remux"] = target_format
+                except (RuntimeError, OSError, subprocess.TimeoutExpired) as e:
+                    # Dönüştürme başarısızsa orijinal dosya olduğu gibi kullanılır.
+                    info["remux_error"] = str(e)
+                    logger.warning(f"ID {item_id} ({item_type}): Dönüştürme yapılamadı: {e}")
+            else:
+                info["remux_error"] = "ffmpeg bulunamadı"
+        if shutil.which("ffprobe"):
+            try:
+                info["probe"] = probe(filepath)
+            except (RuntimeError, ValueError, OSError, subprocess.TimeoutExpired) as e:
+                info["probe_error"] = str(e)
+                status = "Hata: Dosya doğrulanamadı"
+        info["seconds"] = round(time.monotonic() - started, 2)
+        status = status or _next_status(filepath, settings)
+        log = logger.error if status.startswith("Hata") else logger.info
+        log(f"ID {item_id} ({item_type}): İşleme tamamlandı ({status}): {info}")
+    except Exception as e:
+        logger.error(f"ID {item_id} ({item_type}): İşleme sırasında hata: {e}", exc_info=True)
+        info["error"] = str(e)
+        status = "Hata: İşleme başarısız"
+
+    conn = sqlite3.connect(config.DATABASE, timeout=30)
+    try:
+        conn.execute(
+            f"UPDATE {table} SET status = ?, filepath = ?, postprocess_info = ? "
+            "WHERE id = ? AND status = ?",
+            (status, filepath, json.dumps(info, ensure_ascii=False), item_id, POSTPROCESS_STATUS),
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+_pool = stage_pool.StagePool(
+    "postprocess", job_state.PROCESSING, _process_item, "POSTPROCESS_CONCURRENCY"
+)
+
+
+def run_postprocess_cycle():
+    """'İşleniyor' durumundaki kayıtları işleme havuzuna gönderir."""
+    _pool.run_cycle()
+
+
+def postprocess_manager():
+    """Arka planda işleme kuyruğunu izleyen thread."""
+    logger.info("İndirme sonrası işleme yöneticisi thread'i başlatıldı.")
+    while True:
+        try:
+            run_postprocess_cycle()
+        except Exception as e:
+            logger.error(f"İşleme yöneticisinde hata: {e}", exc_info=True)
+        time.sleep(config.POSTPROCESS_POLL_INTERVAL)
@@ -0,0 +1,153 @@
+# @author: MembaCo.
+
+"""
+Yarım kalmış işlerin ve sahipsiz proseslerin uzlaştırılması.
+
+Konteyner bir indirme sırasında yeniden başlarsa kayıtlar 'İndiriliyor' /
+'Kaynak aranıyor...' durumunda ölü bir pid ile kalır; start_download bunları
+yeniden başlatmayı reddeder, otomatik yönetici de seçmez. Bu modül açılışta ve
+periyodik olarak:
+  - ölü ya da bu uygulamaya ait olmayan pid'li işleri sıraya geri alır
+    (yt-dlp .part dosyasından devam edebildiği için ilerleme korunur),
+  - süresi dolmuş uzak worker kiralarını geri alır,
+  - takip edilmeyen Chrome/chromedriver/yt-dlp proseslerini sonlandırır,
+  - artık bir işe ait olmayan cookies_*.txt dosyalarını siler.
+"""
+
+import logging
+import os
+import re
+import signal
+import time
+
+import config
+import job_registry
+import job_state
+from database import get_db
+from services import reclaim_expired_leases
+from worker import JOB_DATABASE_ENV_VAR, JOB_ENV_VAR, JOB_WORKER_PID_ENV_VAR
+
+logger = logging.getLogger(__name__)
+
+COOKIE_FILE_PATTERN = re.compile(r"^cookies_(\d+)_(movie|episode)\.txt$")
+
+
+def requeue_stale_jobs():
+    """Çalışıyor görünen ama kayıtlı canlı bir prosesi olmayan işleri sıraya alır."""
+    db = get_db()
+    live_items = job_registry.live_items(db)
+    placeholders = ", ".join("?" for _ in job_state.WORKING)
+    requeued = 0
+    for table, item_type in (("movies", "movie"), ("episodes", "episode")):
+        rows = db.execute(
+            f"SELECT id, pid FROM {table} WHERE state IN ({placeholders}) AND lease_owner IS NULL",
+            job_state.WORKING,
+        ).fetchall()
+        for row in rows:
+            if (item_type, row["id"]) in live_items:
+                continue
+            cursor = db.execute(
+                f"UPDATE {table} SET status = 'Sırada', pid = NULL WHERE id = ? AND pid IS ?",
+                (row["id"], row["pid"]),
+            )
+            requeued += cursor.rowcount
+            logger.warning(
+                f"Uzlaştırma: {table} ID {row['id']} için pid {row['pid']} takip edilmiyor "
+                "veya sonlanmış; kayıt yeniden sıraya alındı."
+            )
+    db.commit()
+    return requeued
+
+
+def _read_proc_environ(pid):
+    try:
+        with open(f"/proc/{pid}/environ", "rb") as f:
+            data = f.read()
+    except OSError:
+        return None
+    environ = {}
+    for entry in data.split(b"\0"):
+        key, sep, value = entry.partition(b"=")
+        if sep:
+            environ[key.decode(errors="ignore")] = value.decode(errors="ignore")
+    return environ
+
+
+def reap_orphan_processes():
+    """
+    Bu veritabanına ait bir işten türemiş ama sahibi olan worker artık takip
+    edilmeyen prosesleri (önceki çalıştırmadan kalan Chrome, yt-dlp vb.) sonlandırır.
+    Yalnızca /proc bulunan (Linux) sistemlerde çalışır.
+    """
+    if not os.path.isdir("/proc"):
+        return 0
+    live_pids = job_registry.live_pids(get_db())
+    own_pid = os.getpid()
+    reaped = 0
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit() or int(entry) == own_pid:
+            continue
+        pid = int(entry)
+        environ = _read_proc_environ(pid)
+        if not environ or JOB_ENV_VAR not in environ:
+            continue
+        if environ.get(JOB_DATABASE_ENV_VAR) != config.DATABASE:
+            continue
+        try:
+            worker_pid = int(environ.get(JOB_WORKER_PID_ENV_VAR, ""))
+        except ValueError:
+            worker_pid = None
+        if worker_pid in live_pids:
+            continue
+        state, age = job_registry.proc_state_and_age(pid)
+        if state is None or state == "Z" or age < config.RECONCILE_GRACE_PERIOD:
+            continue
+        try:
+            os.kill(pid, signal.SIGTERM)
+            reaped += 1
+            logger.warning(
+                f"Uzlaştırma: Sahipsiz proses sonlandırıldı (PID: {pid}, iş: {environ[JOB_ENV_VAR]})."
+            )
+        except (ProcessLookupError, PermissionError):
+            continue
+    return reaped
+
+
+def clean_stale_cookie_files(directory="."):
+    """Çalışan bir işe ait olmayan eski cookies_*.txt dosyalarını siler."""
+    db = get_db()
+    live_items = job_registry.live_items(db)
+    now = time.time()
+    removed = 0
+    for name in os.listdir(directory):
+        match = COOKIE_FILE_PATTERN.match(name)
+        if not match:
+            continue
+        path = os.path.join(directory, name)
+        try:
+            if now - os.path.getmtime(path) < config.RECONCILE_GRACE_PERIOD:
+                continue
+        except OSError:
+            continue
+        item_id, item_type = int(match.group(1)), match.group(2)
+        if (item_type, item_id) in live_items:
+            continue
+        try:
+            os.remove(path)
+            removed += 1
+        except OSError:
+            logger.warning(f"Uzlaştırma: Çerez dosyası silinemedi: {path}", exc_info=True)
+    return removed
+
+
+def reconcile():
+    """Tüm uzlaştırma adımlarını çalıştırır ve bir özet döndürür."""
+    summary = {
+        "requeued": requeue_stale_jobs(),
+        "leases_reclaimed": reclaim_expired_leases(),
+        "orphans_reaped": reap_orphan_processes(),
+        "cookie_files_removed": clean_stale_cookie_files(),
+    }
+    if any(summary.values()):
+        logger.info(f"Uzlaştırma tamamlandı: {summary}")
+    return summary
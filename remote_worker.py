@@ -0,0 +1,260 @@
+# @author: MembaCo.
+
+"""
+Uzak indirme worker'ı: başka bir makinede (veya konteynerde) çalışıp ana
+uygulamanın iş API'sinden 'Sırada' durumundaki işleri kiralar.
+
+Her iş, sunucudan alınan bir kira (lease) ile tutulur ve düzenli heartbeat'lerle
+uzatılır; heartbeat'ler ilerleme bilgisini de taşır. Worker ölürse kira süresi
+dolar ve ana uygulama işi otomatik olarak sıraya geri alır. Kullanıcı işi
+panelden durdurursa bir sonraki heartbeat 409 döner ve indirme sonlandırılır.
+
+Örnek:
+    WORKER_TOKEN=... python remote_worker.py --server http://nas:5000 \\
+        --downloads /mnt/library --slots 2
+"""
+
+import argparse
+import collections
+import logging
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+
+import requests
+
+import hls_variants
+from worker import (
+    download_with_yt_dlp,
+    find_manifest_url,
+    output_template_for,
+    write_cookie_file,
+)
+
+logger = logging.getLogger("remote_worker")
+
+# Sunucuya ulaşılamadığında heartbeat'ler arasında biriktirilecek en fazla log satırı.
+MAX_PENDING_LOG_LINES = 500
+
+
+class JobApiClient:
+    """Ana uygulamanın /api/worker uç noktaları için ince istemci."""
+
+    def __init__(self, server, token, worker_id, timeout=15):
+        self.server = server.rstrip("/")
+        self.worker_id = worker_id
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers["X-Worker-Token"] = token
+
+    def _post(self, path, payload):
+        payload = dict(payload, worker_id=self.worker_id)
+        return self.session.post(
+            f"{self.server}{path}", json=payload, timeout=self.timeout
+        )
+
+    def claim(self):
+        response = self._post("/api/worker/claim", {})
+        if response.status_code == 204:
+            return None
+        response.raise_for_status()
+        return response.json()
+
+    def heartbeat(self, job, status=None, progress=None, log_lines=None):
+        """Kira hâlâ bizdeyse True, kaybedildiyse False döndürür."""
+        response = self._post(
+            f"/api/worker/jobs/{job['item_type']}/{job['item_id']}/heartbeat",
+            {"status": status, "progress": progress, "log_lines": log_lines or []},
+        )
+        if response.status_code == 409:
+            return False
+        response.raise_for_status()
+        return True
+
+    def complete(self, job, success, message, filepath=None, log_lines=None, quality_info=None):
+        response = self._post(
+            f"/api/worker/jobs/{job['item_type']}/{job['item_id']}/complete",
+            {
+                "success": success,
+                "message": message,
+                "filepath": filepath,
+                "log_lines": log_lines or [],
+                "quality_info": quality_info,
+            },
+        )
+        if response.status_code != 409:
+            response.raise_for_status()
+
+
+class LeaseKeeper(threading.Thread):
+    """
+    İş sürerken kirayı periyodik olarak yeniler; son ilerlemeyi ve o ana kadar
+    biriken yt-dlp çıktısını heartbeat ile sunucudaki iş loguna gönderir.
+    """
+
+    def __init__(self, api, job):
+        super().__init__(daemon=True)
+        self.api = api
+        self.job = job
+        self.status = "Kaynak aranıyor..."
+        self.progress = 0.0
+        self.lost = threading.Event()
+        self._stop_event = threading.Event()
+        self._log_lines = collections.deque(maxlen=MAX_PENDING_LOG_LINES)
+        self._log_lock = threading.Lock()
+        self.interval = max(1.0, job.get("lease_seconds", 90) / 3)
+
+    def add_log_line(self, line):
+        with self._log_lock:
+            self._log_lines.append(f"{time.strftime('%H:%M:%S')} {line}")
+
+    def drain_log_lines(self):
+        with self._log_lock:
+            lines = list(self._log_lines)
+            self._log_lines.clear()
+        return lines
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            log_lines = self.drain_log_lines()
+            try:
+                if not self.api.heartbeat(self.job, self.status, self.progress, log_lines):
+                    logger.warning(
+                        f"ID {self.job['item_id']} ({self.job['item_type']}): Kira kaybedildi, iş iptal ediliyor."
+                    )
+                    self.lost.set()
+                    return
+            except requests.exceptions.RequestException as e:
+                # Geçici ağ hatası: kira süresi dolmadan bir sonraki denemede düzelebilir.
+                logger.warning(f"Heartbeat gönderilemedi: {e}")
+                with self._log_lock:
+                    pending = log_lines + list(self._log_lines)
+                    self._log_lines.clear()
+                    self._log_lines.extend(pending)
+
+    def stop(self):
+        self._stop_event.set()
+
+
+def run_job(api, job, downloads_folder):
+    item_id, item_type = job["item_id"], job["item_type"]
+    keeper = LeaseKeeper(api, job)
+    keeper.start()
+    cookie_filepath = os.path.join(
+        tempfile.gettempdir(), f"cookies_{api.worker_id}_{item_type}_{item_id}.txt"
+    )
+    try:
+        output_template = output_template_for(downloads_folder, job["output_parts"])
+        manifest_url, headers, cookies = find_manifest_url(job["url"])
+        if keeper.lost.is_set():
+            return
+        if not manifest_url:
+            api.complete(
+                job, False, "Hata: Video kaynağı bulunamadı", log_lines=keeper.drain_log_lines()
+            )
+            return
+
+        write_cookie_file(cookie_filepath, cookies)
+        download_url, format_spec, quality = hls_variants.apply_quality_policy(
+            manifest_url, headers, cookies, job.get("quality_policy")
+        )
+        keeper.status = "İndiriliyor"
+
+        def on_progress(progress):
+            keeper.progress = progress
+
+        success, message, final_filepath = download_with_yt_dlp(
+            download_url,
+            headers,
+            cookie_filepath,
+            output_template,
+            job.get("speed_limit"),
+            on_progress=on_progress,
+            should_abort=keeper.lost.is_set,
+            on_output=keeper.add_log_line,
+            format_spec=format_spec,
+        )
+        if keeper.lost.is_set():
+            return
+        if success and not (final_filepath and os.path.isfile(final_filepath)):
+            success, message = False, "Hata: İndirilen dosya bulunamadı"
+        api.complete(
+            job,
+            success,
+            message,
+            final_filepath if success else None,
+            log_lines=keeper.drain_log_lines(),
+            quality_info=quality,
+        )
+        logger.info(f"ID {item_id} ({item_type}): {message}")
+    except Exception as e:
+        logger.exception(f"ID {item_id} ({item_type}): Uzak worker'da beklenmedik hata: {e}")
+        try:
+            api.complete(job, False, "Hata: Beklenmedik Sistem Hatası")
+        except requests.exceptions.RequestException:
+            pass
+    finally:
+        keeper.stop()
+        if os.path.exists(cookie_filepath):
+            os.remove(cookie_filepath)
+
+
+def slot_loop(api, downloads_folder, poll_interval, stop_event):
+    while not stop_event.is_set():
+        try:
+            job = api.claim()
+        except requests.exceptions.RequestException as e:
+            logger.warning(f"İş kiralanamadı: {e}")
+            job = None
+        if not job:
+            stop_event.wait(poll_interval)
+            continue
+        logger.info(f"İş alındı: {job['item_type']} ID {job['item_id']} ({job['url']})")
+        run_job(api, job, downloads_folder)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Uzak indirme worker'ı")
+    parser.add_argument("--server", required=True, help="Ana uygulamanın adresi")
+    parser.add_argument("--token", default=os.getenv("WORKER_TOKEN", ""))
+    parser.add_argument("--downloads", required=True, help="Bu makinedeki kütüphane klasörü")
+    parser.add_argument("--slots", type=int, default=1, help="Eşzamanlı iş sayısı")
+    parser.add_argument("--worker-id", default=f"{socket.gethostname()}-{os.getpid()}")
+    parser.add_argument("--poll-interval", type=float, default=10)
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(process)d - %(message)s",
+        datefmt="%Y-%m-%d %H:%M:%S",
+        stream=sys.stdout,
+    )
+    if not args.token:
+        parser.error("--token veya WORKER_TOKEN ortam değişkeni gerekli.")
+
+    stop_event = threading.Event()
+    threads = []
+    for slot in range(max(1, args.slots)):
+        api = JobApiClient(args.server, args.token, f"{args.worker_id}-{slot}")
+        thread = threading.Thread(
+            target=slot_loop,
+            args=(api, args.downloads, args.poll_interval, stop_event),
+            daemon=True,
+        )
+        thread.start()
+        threads.append(thread)
+    logger.info(f"Uzak worker başlatıldı: {args.worker_id} ({len(threads)} slot)")
+    try:
+        while any(t.is_alive() for t in threads):
+            time.sleep(1)
+    except KeyboardInterrupt:
+        logger.info("Uzak worker durduruluyor...")
+        stop_event.set()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,113 @@
+# @author: MembaCo.
+
+"""
+Başarısız işlerin hata sınıfına göre otomatik olarak yeniden denenmesi.
+
+Bir iş başarısız olduğunda hata bir koda ayrılır (error_code sütunu) ve
+config.RETRY_POLICIES'teki politikası uygulanır:
+
+    http_403            sunucu reddetti (imzalı adres/çerez süresi dolmuş olabilir)
+    http_404            kaynak bulunamadı
+    enospc              diskte yer yok
+    manifest_timeout    tarayıcı video kaynağını bulamadı
+    unexpected          diğer tüm hatalar
+
+Deneme hakkı kalmışsa kayıt 'Yeniden denenecek' durumuna alınır ve
+next_attempt_at değeri üstel geri çekilmeyle (base_delay * 2^(deneme-1),
+en fazla RETRY_MAX_DELAY, ±%10 rastgele) belirlenir. Otomatik yönetici her turda
+zamanı gelen kayıtları sıraya geri koyar: politika yeniden çözme istemiyorsa ve
+önceki kaynak saklandıysa 'Hazır', aksi halde 'Sırada'. Haklar bitince kayıt
+'Hata: ...' durumunda kalır. Başarılı bir indirme veya elle yeniden başlatma
+deneme sayacını sıfırlar.
+"""
+
+import logging
+import random
+import time
+
+import config
+import job_state
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUS = job_state.LABELS[job_state.RETRY_WAIT]
+ERROR_CODES = tuple(config.RETRY_POLICIES)
+DEFAULT_ERROR_CODE = "unexpected"
+
+
+def retry_delay(error_code, attempts):
+    policy = config.RETRY_POLICIES[error_code]
+    delay = min(config.RETRY_MAX_DELAY, policy["base_delay"] * 2 ** max(0, attempts - 1))
+    return delay * random.uniform(0.9, 1.1)
+
+
+def record_failure(conn, item_id, item_type, error_code, message, now=None):
+    """
+    Başarısızlığı kaydeder. Yeniden deneme planlandıysa True, haklar bittiyse
+    (kayıt 'Hata' durumunda bırakılır) False döndürür. Commit çağırana aittir.
+    """
+    table = "movies" if item_type == "movie" else "episodes"
+    error_code = error_code if error_code in config.RETRY_POLICIES else DEFAULT_ERROR_CODE
+    now = now or time.time()
+    row = conn.execute(f"SELECT attempts FROM {table} WHERE id = ?", (item_id,)).fetchone()
+    attempts = (row[0] if row else 0) + 1
+    if attempts >= config.RETRY_POLICIES[error_code]["max_attempts"]:
+        conn.execute(
+            f"""
+            UPDATE {table} SET status = ?, error_code = ?, attempts = ?,
+                next_attempt_at = NULL, pid = NULL
+            WHERE id = ?
+            """,
+            (message, error_code, attempts, item_id),
+        )
+        logger.warning(
+            f"ID {item_id} ({item_type}): {error_code} hatası için deneme hakkı bitti ({attempts}). {message}"
+        )
+        return False
+    next_attempt_at = now + retry_delay(error_code, attempts)
+    conn.execute(
+        f"""
+        UPDATE {table} SET status = ?, error_code = ?, attempts = ?,
+            next_attempt_at = ?, pid = NULL
+        WHERE id = ?
+        """,
+        (RETRY_STATUS, error_code, attempts, next_attempt_at, item_id),
+    )
+    logger.warning(
+        f"ID {item_id} ({item_type}): {message} ({error_code}); "
+        f"{int(next_attempt_at - now)} sn sonra yeniden denenecek ({attempts}. deneme)."
+    )
+    return True
+
+
+def keeps_source(error_code):
+    """Politika, yeniden denemede önceki kaynağın kullanılmasına izin veriyor mu?"""
+    return not config.RETRY_POLICIES.get(error_code, {}).get("re_resolve", True)
+
+
+def clear(conn, table, item_id):
+    """Başarılı indirme veya elle yeniden başlatma sonrası deneme durumunu sıfırlar."""
+    conn.execute(
+        f"UPDATE {table} SET error_code = NULL, attempts = 0, next_attempt_at = NULL WHERE id = ?",
+        (item_id,),
+    )
+
+
+def release_due_retries(db, resolved_status, now=None):
+    """Yeniden deneme zamanı gelen kayıtları sıraya (veya kaynakları saklandıysa 'Hazır'a) alır."""
+    now = now or time.time()
+    released = 0
+    for table, item_type in (("movies", "movie"), ("episodes", "episode")):
+        released += db.execute(
+            f"""
+            UPDATE {table} SET status = CASE
+                WHEN id IN (SELECT item_id FROM resolved_manifests WHERE item_type = ?) THEN ?
+                ELSE 'Sırada' END
+            WHERE state = ? AND next_attempt_at <= ?
+            """,
+            (item_type, resolved_status, job_state.RETRY_WAIT, now),
+        ).rowcount
+    if released:
+        db.commit()
+        logger.info(f"{released} kayıt yeniden denenmek üzere sıraya alındı.")
+    return released
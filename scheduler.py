@@ -0,0 +1,168 @@
+# @author: MembaCo.
+
+"""
+Arka plan yöneticileri ve lider seçimi.
+
+Otomatik indirme, uzlaştırma, kütüphane ve katalog taraması, yeni bölüm takibi, indirme sonrası işleme ve taşıma döngüleri
+yalnızca tek bir proseste çalışmalıdır. Uygulama birden fazla web prosesiyle
+(gunicorn) çalıştırıldığında her proses DATA_DIR/scheduler.lock dosyası üzerinde
+kilit almaya çalışır; kilidi alan proses lider olur ve döngüleri başlatır.
+Lider sonlanırsa kilit işletim sistemi tarafından bırakılır ve bekleyen
+proseslerden biri görevi devralır.
+
+Otomatik indirmenin açık/kapalı durumu settings tablosunda tutulur; böylece
+düğmeye hangi web prosesinde basılırsa basılsın lider aynı değeri görür.
+"""
+
+import logging
+import os
+import threading
+import time
+
+import catalog_crawler
+import config
+import library_index
+import mover
+import postprocess
+import reconciler
+import series_watcher
+import services
+import settings_cache
+from database import update_setting
+
+try:
+    import fcntl
+except ImportError:  # Windows: tek proses çalıştığı varsayılır.
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+LEADER_LOCK_FILE = os.path.join(config.DATA_DIR, "scheduler.lock")
+_state = {"leader": False, "lock_file": None, "started": False}
+_lock = threading.Lock()
+
+
+def auto_download_enabled():
+    return settings_cache.get("AUTO_DOWNLOAD_ENABLED") == "true"
+
+
+def set_auto_download(enabled):
+    update_setting("AUTO_DOWNLOAD_ENABLED", "true" if enabled else "false")
+    logger.info(f"Otomatik indirme durumu: {'AKTİF' if enabled else 'PASİF'}")
+
+
+def is_leader():
+    return _state["leader"]
+
+
+def try_acquire_leadership():
+    """Lider kilidini almayı dener; bu proses lider olduysa True döndürür."""
+    if _state["leader"]:
+        return True
+    if fcntl is None:
+        _state["leader"] = True
+        return True
+    os.makedirs(os.path.dirname(LEADER_LOCK_FILE), exist_ok=True)
+    lock_file = open(LEADER_LOCK_FILE, "a+")
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock_file.close()
+        return False
+    lock_file.seek(0)
+    lock_file.truncate()
+    lock_file.write(str(os.getpid()))
+    lock_file.flush()
+    # Dosya açık kaldığı sürece kilit bu prosestedir.
+    _state["lock_file"] = lock_file
+    _state["leader"] = True
+    return True
+
+
+def auto_download_manager(app):
+    """Otomatik indirme açıkken sıradaki işleri başlatan lider thread'i."""
+    logger.info("Otomatik indirme yöneticisi thread'i başlatıldı.")
+    while True:
+        if auto_download_enabled():
+            try:
+                with app.app_context():
+                    services.run_auto_download_cycle()
+            except Exception as e:
+                logger.error(f"Otomatik indirme yöneticisinde hata: {e}", exc_info=True)
+        time.sleep(config.AUTO_DOWNLOAD_POLL_INTERVAL)
+
+
+def reconcile_manager(app):
+    """Yarım kalan işleri ve sahipsiz prosesleri periyodik olarak uzlaştıran thread."""
+    while True:
+        try:
+            with app.app_context():
+                reconciler.reconcile()
+        except Exception as e:
+            logger.error(f"Uzlaştırma sırasında hata: {e}", exc_info=True)
+        time.sleep(config.RECONCILE_INTERVAL)
+
+
+def library_manager(app):
+    """İndirme klasörünü periyodik olarak tarayıp kayıtlarla eşleyen thread."""
+    while True:
+        try:
+            with app.app_context():
+                library_index.run_scan_cycle()
+        except Exception as e:
+            logger.error(f"Kütüphane taraması sırasında hata: {e}", exc_info=True)
+        time.sleep(config.LIBRARY_SCAN_INTERVAL)
+
+
+def crawl_manager(app):
+    """Kayıtlı kategori listelerini kaldığı yerden tarayan ve senkronize eden thread."""
+    while True:
+        try:
+            with app.app_context():
+                catalog_crawler.run_due_crawls()
+        except Exception as e:
+            logger.error(f"Katalog taraması sırasında hata: {e}", exc_info=True)
+        time.sleep(config.CRAWL_CHECK_INTERVAL)
+
+
+def series_watch_manager(app):
+    """Takip edilen dizileri yeni bölümler için yenileyen thread."""
+    while True:
+        try:
+            with app.app_context():
+                series_watcher.run_watch_cycle()
+        except Exception as e:
+            logger.error(f"Dizi takibi sırasında hata: {e}", exc_info=True)
+        time.sleep(config.SERIES_WATCH_POLL_INTERVAL)
+
+
+def _run_as_leader(app):
+    logger.info(f"Bu proses (PID: {os.getpid()}) zamanlayıcı lideri seçildi.")
+    for target, args in (
+        (reconcile_manager, (app,)),
+        (library_manager, (app,)),
+        (crawl_manager, (app,)),
+        (series_watch_manager, (app,)),
+        (auto_download_manager, (app,)),
+        (postprocess.postprocess_manager, ()),
+        (mover.mover_manager, ()),
+    ):
+        threading.Thread(target=target, args=args, daemon=True).start()
+
+
+def _election_loop(app):
+    while not try_acquire_leadership():
+        time.sleep(config.LEADER_RETRY_INTERVAL)
+    _run_as_leader(app)
+
+
+def start(app):
+    """
+    Bu proseste lider seçimine katılır. Kilit hemen alınırsa yöneticiler
+    başlatılır; alınamazsa arka planda periyodik olarak yeniden denenir.
+    """
+    with _lock:
+        if _state["started"]:
+            return
+        _state["started"] = True
+    threading.Thread(target=_election_loop, args=(app,), daemon=True).start()
@@ -0,0 +1,200 @@
+# @author: MembaCo.
+
+"""
+Takip edilen dizilerin yeni bölümler için periyodik olarak yenilenmesi.
+
+Yeni bölümler eskiden yalnızca dizi linki yeniden eklendiğinde sıraya girerdi.
+Zamanlayıcı lideri her turda kontrol zamanı gelen dizilerin sayfasını koşullu
+istekle (If-None-Match / If-Modified-Since) indirir:
+
+    304 Not Modified        sayfa ayrıştırılmaz, veritabanına dokunulmaz
+    bölüm listesi aynı      bölüm adreslerinin özeti (episodes_hash) değişmemişse
+                            veritabanı karşılaştırması yapılmaz
+    yeni bölümler           sayfadaki adresler dizinin kayıtlı adresleriyle küme
+                            farkı alınarak bulunur ve 'Sırada' olarak eklenir
+
+Kontrol aralığı (SERIES_WATCH_INTERVAL saat) her dizi için ±SERIES_WATCH_JITTER
+oranında rastgele kaydırılır; ilk kez görülen diziler aralığın tamamına
+yayılır. Böylece yüzlerce dizi aynı anda değil, zamana dağılmış olarak
+kontrol edilir; istekler ayrıca host_guard'ın ortak hız sınırından geçer ve site
+erişilemezken (devre açık) diziler kontrol sırasında bekletilir.
+
+SERIES_WATCH ayarı: "all" tüm diziler, "selected" yalnızca takibe alınan
+diziler (series.watch), "off" kapalı.
+"""
+
+import hashlib
+import logging
+import random
+import time
+
+import config
+import host_guard
+import settings_cache
+from database import get_db
+
+logger = logging.getLogger(__name__)
+
+WATCH_MODES = ("all", "selected", "off")
+
+
+def _interval():
+    return settings_cache.get_typed("SERIES_WATCH_INTERVAL") * 3600
+
+
+def _next_check(now, interval):
+    jitter = config.SERIES_WATCH_JITTER
+    return now + interval * random.uniform(1 - jitter, 1 + jitter)
+
+
+def episodes_hash(seasons):
+    """Bölüm adreslerinin sıradan bağımsız özeti."""
+    urls = sorted(episode["url"] for season in seasons for episode in season["episodes"])
+    return hashlib.sha1("\n".join(urls).encode("utf-8")).hexdigest()
+
+
+def known_episode_urls(db, series_id):
+    return {
+        row["url"]
+        for row in db.execute(
+            """
+            SELECT e.url FROM episodes e JOIN seasons s ON s.id = e.season_id
+            WHERE s.series_id = ?
+            """,
+            (series_id,),
+        )
+    }
+
+
+def fetch_series_page(series):
+    """
+    Dizi sayfasını koşullu istekle indirir. Sayfa değişmemişse (304) metin None
+    döner; aksi halde (metin, etag, last_modified).
+    """
+    headers = {"User-Agent": config.USER_AGENT}
+    if series["etag"]:
+        headers["If-None-Match"] = series["etag"]
+    if series["last_modified"]:
+        headers["If-Modified-Since"] = series["last_modified"]
+    response = host_guard.get(series["source_url"], headers=headers, timeout=20)
+    if response.status_code == 304:
+        return None, series["etag"], series["last_modified"]
+    response.raise_for_status()
+    return (
+        response.text,
+        response.headers.get("ETag"),
+        response.headers.get("Last-Modified"),
+    )
+
+
+def refresh_series(db, series, now=None):
+    """Diziyi yeniler ve sıraya eklenen yeni bölümlerin sayısını döndürür."""
+    from services import claim_existing_episodes, parse_series_page, store_series_episodes
+
+    now = now or time.time()
+    new_hash = series["episodes_hash"]
+    added_ids = []
+    try:
+        text, etag, last_modified = fetch_series_page(series)
+        if text is not None:
+            series_data = parse_series_page(text, series["source_url"])
+            if series_data:
+                new_hash = episodes_hash(series_data["seasons"])
+            if series_data and new_hash != series["episodes_hash"]:
+                known = known_episode_urls(db, series["id"])
+                new_seasons = [
+                    {
+                        "season_number": season["season_number"],
+                        "episodes": [e for e in season["episodes"] if e["url"] not in known],
+                    }
+                    for season in series_data["seasons"]
+                ]
+                new_seasons = [season for season in new_seasons if season["episodes"]]
+                if new_seasons:
+                    added_ids = store_series_episodes(db, series["id"], new_seasons)
+    except host_guard.HostUnavailable:
+        # Kontrol zamanı ilerletilmez; dizi devre kapanınca ilk turda yenilenir.
+        return 0
+    except Exception as e:
+        # Hata durumunda da bir sonraki kontrol ileri alınır; aksi halde bozuk
+        # bir sayfa her turda yeniden istenirdi.
+        logger.warning(f"Dizi yenilenemedi ({series['source_url']}): {e}")
+        # Yarım kalan bölüm eklemeleri geri alınır ve eski özet korunur; aksi halde
+        # sonraki kontrol özet eşleştiği için eksik bölümleri hiç aramazdı.
+        db.rollback()
+        etag, last_modified = series["etag"], series["last_modified"]
+        new_hash = series["episodes_hash"]
+        added_ids = []
+
+    db.execute(
+        """
+        UPDATE series SET etag = ?, last_modified = ?, episodes_hash = ?,
+            last_checked_at = ?, next_check_at = ?
+        WHERE id = ?
+        """,
+        (etag, last_modified, new_hash, now, _next_check(now, _interval()), series["id"]),
+    )
+    db.commit()
+    if added_ids:
+        existing = claim_existing_episodes(db, added_ids)
+        logger.info(
+            f"'{series['title']}' dizisinde {len(added_ids)} yeni bölüm bulundu ve sıraya eklendi"
+            + (f" ({existing} bölüm kütüphanede zaten mevcut)." if existing else ".")
+        )
+    return len(added_ids)
+
+
+def _watch_filter(mode):
+    return "watch = 1" if mode == "selected" else "1 = 1"
+
+
+def _spread_unscheduled(db, mode, now, interval):
+    """Kontrol zamanı olmayan (yeni eklenen) dizileri aralığın tamamına yayar."""
+    rows = db.execute(
+        f"""
+        SELECT id FROM series
+        WHERE {_watch_filter(mode)}
+          AND (next_check_at IS NULL OR next_check_at > ?)
+        """,
+        (now + interval * (1 + config.SERIES_WATCH_JITTER),),
+    ).fetchall()
+    if rows:
+        # Aralık kısaltıldığında uzak geleceğe planlanmış diziler de yeniden yayılır.
+        db.executemany(
+            "UPDATE series SET next_check_at = ? WHERE id = ?",
+            [(now + random.uniform(0, interval), row["id"]) for row in rows],
+        )
+        db.commit()
+
+
+def run_watch_cycle():
+    """Kontrol zamanı gelen dizileri (en fazla SERIES_WATCH_BATCH) yeniler."""
+    mode = settings_cache.get("SERIES_WATCH") or "all"
+    if mode not in WATCH_MODES or mode == "off":
+        return 0
+    db = get_db()
+    now = time.time()
+    interval = _interval()
+    _spread_unscheduled(db, mode, now, interval)
+    due = db.execute(
+        f"""
+        SELECT id, title, source_url, etag, last_modified, episodes_hash FROM series
+        WHERE {_watch_filter(mode)} AND next_check_at <= ?
+        ORDER BY next_check_at LIMIT ?
+        """,
+        (now, config.SERIES_WATCH_BATCH),
+    ).fetchall()
+    return sum(refresh_series(db, series) for series in due)
+
+
+def set_watch(series_id, enabled):
+    db = get_db()
+    cursor = db.execute(
+        "UPDATE series SET watch = ? WHERE id = ?", (1 if enabled else 0, series_id)
+    )
+    db.commit()
+    if cursor.rowcount != 1:
+        return False, "Kayıt bulunamadı."
+    if enabled:
+        return True, "Dizi takibe alındı; yeni bölümler otomatik olarak sıraya eklenecek."
+    return True, "Dizi takipten çıkarıldı."
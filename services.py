@@ -3,20 +3,47 @@
 import logging
 import json
 import os
+import re
 import signal
 import subprocess
 import sys
 import threading
+import time
 from multiprocessing import Process
 import requests
 from bs4 import BeautifulSoup
 
+import catalog_crawler
 import config
-from database import get_db, get_setting
-from worker import process_video
+import hls_variants
+import host_guard
+import identity
+import job_logs
+import job_registry
+import job_state
+import library_index
+import memory_budget
+import poster_cache
+import retry_policy
+import settings_cache
+from logging_config import get_log_queue
+from database import full_text_search_available, get_db
+from worker import (
+    RESOLVED_STATUS,
+    build_output_parts,
+    download_error_code,
+    process_video,
+    quality_policy_for,
+    resolve_video,
+)
 
 logger = logging.getLogger(__name__)
 
+# Bir worker prosesinin (yerel veya uzak) üzerinde çalıştığı durumlar.
+WORKING_STATUSES = tuple(job_state.LABELS[state] for state in job_state.WORKING)
+# İndirme bittikten sonra ana süreçteki havuzların (işleme, taşıma) üzerinde çalıştığı durumlar.
+PIPELINE_STATUSES = tuple(job_state.LABELS[state] for state in job_state.PIPELINE)
+
 
 # --- FİLM İŞLEMLERİ ---
 
@@ -81,7 +108,7 @@ def _scrape_movie_from_html(soup):
 def scrape_movie_metadata(url):
     try:
         headers = {"User-Agent": config.USER_AGENT}
-        response = requests.get(url, headers=headers, timeout=20)
+        response = host_guard.get(url, headers=headers, timeout=20)
         response.raise_for_status()
         soup = BeautifulSoup(response.text, "html.parser")
         json_ld_script = soup.find("script", type="application/ld+json")
@@ -129,12 +156,19 @@ def scrape_movie_metadata(url):
                     "cast": actors,
                     "poster_url": movie_data.get("image", ""),
                 }
+                metadata.update(identity.page_identifiers(soup, movie_data))
                 logger.info("JSON-LD ile film verisi başarıyla çekildi.")
                 return metadata
         logger.warning(
             f"JSON-LD ile film verisi bulunamadı, HTML kazımaya geçiliyor. URL: {url}"
         )
-        return _scrape_movie_from_html(soup)
+        metadata = _scrape_movie_from_html(soup)
+        if metadata:
+            metadata.update(identity.page_identifiers(soup))
+        return metadata
+    except host_guard.HostUnavailable as e:
+        logger.warning(f"Meta veri çekilemedi: {e}")
+        return None
     except requests.exceptions.RequestException:
         logger.error(f"Meta veri çekilirken ağ hatası oluştu: {url}", exc_info=True)
         return None
@@ -152,8 +186,21 @@ def add_movie_to_queue(url):
     metadata = scrape_movie_metadata(url)
     if not metadata:
         return False, "Film bilgileri çekilemedi."
-    db.execute(
-        "INSERT INTO movies (url, status, title, year, genre, description, imdb_score, director, cast, poster_url, source_site) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+    duplicate = identity.find_duplicate_movie(
+        db,
+        url,
+        metadata["title"],
+        metadata["year"],
+        metadata.get("imdb_id"),
+        metadata.get("canonical_url"),
+    )
+    if duplicate and settings_cache.get("DUPLICATE_POLICY") != "flag":
+        return (
+            False,
+            f'Bu film zaten kuyrukta mevcut (aynı içerik: "{duplicate["title"]}", ID {duplicate["id"]}).',
+        )
+    cursor = db.execute(
+        "INSERT INTO movies (url, status, title, year, genre, description, imdb_score, director, cast, poster_url, source_site, identity_key, imdb_id, canonical_url) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
         (
             url,
             "Sırada",
@@ -166,28 +213,41 @@ def add_movie_to_queue(url):
             metadata["cast"],
             metadata["poster_url"],
             "hdfilmcehennemi",
+            identity.identity_key(metadata["title"], metadata["year"]),
+            metadata.get("imdb_id"),
+            metadata.get("canonical_url") or identity.normalize_url(url),
         ),
     )
     db.commit()
+    poster_cache.cache_poster_async(metadata["poster_url"])
+    if library_index.claim_existing_file(db, cursor.lastrowid, "movie"):
+        return (
+            True,
+            f'"{metadata["title"]}" eklendi; dosyası kütüphanede zaten mevcut olduğu için indirilmeyecek.',
+        )
+    if duplicate:
+        logger.warning(
+            f'"{metadata["title"]}" olası kopya olarak eklendi (aynı içerik: ID {duplicate["id"]}).'
+        )
+        return (
+            True,
+            f'"{metadata["title"]}" sıraya eklendi; olası kopya (ID {duplicate["id"]}), '
+            "aynı içerik indirilmişse otomatik indirmede atlanacak.",
+        )
     return True, f'"{metadata["title"]}" başarıyla sıraya eklendi.'
 
 
 def scrape_movie_links_from_list_page(list_url):
     logger.info(f"Toplu liste sayfasından film linkleri çekiliyor: {list_url}")
     try:
-        headers = {"User-Agent": config.USER_AGENT}
-        response = requests.get(list_url, headers=headers, timeout=20)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.text, "html.parser")
-        movie_links = []
-        for movie_card in soup.find_all("article", class_="item"):
-            link_tag = movie_card.find("a")
-            if link_tag and link_tag.get("href"):
-                movie_links.append(link_tag["href"])
+        movie_links, _ = catalog_crawler.fetch_list_page(list_url)
         if not movie_links:
             logger.warning(f"Hiç film linki bulunamadı.")
         logger.info(f"{len(movie_links)} adet film linki bulundu.")
         return movie_links, None
+    except host_guard.HostUnavailable as e:
+        logger.warning(f"Liste sayfası çekilemedi: {e}")
+        return [], str(e)
     except requests.exceptions.RequestException as e:
         error_message = f"Liste sayfası çekilirken ağ hatası oluştu: {list_url}"
         logger.error(error_message, exc_info=True)
@@ -206,84 +266,87 @@ def add_movies_from_list_page_async(app, list_url):
         if error:
             logger.error(f"Toplu ekleme işlemi başarısız: {error}")
             return
-        added, skipped, failed = 0, 0, 0
-        for link in movie_links:
-            try:
-                success, message = add_movie_to_queue(link)
-                if success:
-                    added += 1
-                elif "zaten kuyrukta mevcut" in message.lower():
-                    skipped += 1
-                else:
-                    failed += 1
-            except Exception:
-                failed += 1
-                logger.error(
-                    f"Toplu ekleme sırasında bir video ({link}) işlenirken hata oluştu.",
-                    exc_info=True,
-                )
+        # Kayıtlı filmler tek sorguda elenir; film sayfası yalnızca yeniler için indirilir.
+        known = catalog_crawler.known_urls(get_db(), movie_links)
+        try:
+            added, skipped, failed = catalog_crawler.add_links(
+                [link for link in movie_links if link not in known]
+            )
+        except host_guard.HostUnavailable as e:
+            logger.error(f"Toplu ekleme yarıda kaldı: {e}")
+            return
         logger.info(
-            f"Toplu ekleme tamamlandı. Eklenen: {added}, Atlanan: {skipped}, Başarısız: {failed}"
+            f"Toplu ekleme tamamlandı. Eklenen: {added}, Atlanan: {skipped + len(known)}, Başarısız: {failed}"
         )
 
 
 # --- DİZİ İŞLEMLERİ ---
 
 
-def scrape_series_data(series_url):
-    try:
-        logger.info(f"Dizi verisi çekiliyor: {series_url}")
-        headers = {"User-Agent": config.USER_AGENT}
-        response = requests.get(series_url, headers=headers, timeout=20)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.text, "html.parser")
+def parse_series_page(html, series_url):
+    """Dizi sayfasından dizi bilgilerini ve sezon/bölüm listesini çıkarır."""
+    soup = BeautifulSoup(html, "html.parser")
 
-        series_info = {
-            "title": soup.select_one("div.data > h1").text.strip(),
-            "poster_url": soup.select_one("div.poster > img").get("src"),
-            "description": soup.select_one("div#info div.wp-content").text.strip(),
-            "source_url": series_url,
-            "seasons": [],
-        }
+    series_info = {
+        "title": soup.select_one("div.data > h1").text.strip(),
+        "poster_url": soup.select_one("div.poster > img").get("src"),
+        "description": soup.select_one("div#info div.wp-content").text.strip(),
+        "source_url": series_url,
+        "seasons": [],
+    }
 
-        season_blocks = soup.select("div#seasons > div.se-c")
-        if not season_blocks:
-            logger.warning(f"Dizi için sezon bilgisi bulunamadı. URL: {series_url}")
-            return None
+    season_blocks = soup.select("div#seasons > div.se-c")
+    if not season_blocks:
+        logger.warning(f"Dizi için sezon bilgisi bulunamadı. URL: {series_url}")
+        return None
 
-        for block in season_blocks:
-            season_number_text = block.select_one(".se-q .se-t").text.strip()
-            try:
-                season_number = int(season_number_text)
-            except (ValueError, TypeError):
-                logger.warning(f"Geçersiz sezon numarası: {season_number_text}")
+    for block in season_blocks:
+        season_number_text = block.select_one(".se-q .se-t").text.strip()
+        try:
+            season_number = int(season_number_text)
+        except (ValueError, TypeError):
+            logger.warning(f"Geçersiz sezon numarası: {season_number_text}")
+            continue
+
+        season_data = {"season_number": season_number, "episodes": []}
+        episode_list_items = block.select("ul.episodios > li")
+        for item in episode_list_items:
+            episode_title_element = item.select_one("h2.episodiotitle > a")
+            if not episode_title_element:
                 continue
 
-            season_data = {"season_number": season_number, "episodes": []}
-            episode_list_items = block.select("ul.episodios > li")
-            for item in episode_list_items:
-                episode_title_element = item.select_one("h2.episodiotitle > a")
-                if not episode_title_element:
-                    continue
-
-                episode_url = episode_title_element.get("href")
-                episode_title = episode_title_element.contents[0].strip()
-                numerando = item.select_one("div.numerando").text.split("-")
-                episode_number = int(numerando[1].strip())
-
-                season_data["episodes"].append(
-                    {
-                        "episode_number": episode_number,
-                        "title": episode_title,
-                        "url": episode_url,
-                    }
-                )
-            series_info["seasons"].append(season_data)
+            episode_url = episode_title_element.get("href")
+            episode_title = episode_title_element.contents[0].strip()
+            numerando = item.select_one("div.numerando").text.split("-")
+            episode_number = int(numerando[1].strip())
 
-        logger.info(
-            f"'{series_info['title']}' dizisi için {len(series_info['seasons'])} sezon bulundu."
-        )
+            season_data["episodes"].append(
+                {
+                    "episode_number": episode_number,
+                    "title": episode_title,
+                    "url": episode_url,
+                }
+            )
+        series_info["seasons"].append(season_data)
+
+    return series_info
+
+
+def scrape_series_data(series_url):
+    try:
+        logger.info(f"Dizi verisi çekiliyor: {series_url}")
+        headers = {"User-Agent": config.USER_AGENT}
+        response = host_guard.get(series_url, headers=headers, timeout=20)
+        response.raise_for_status()
+        series_info = parse_series_page(response.text, series_url)
+        if series_info:
+            logger.info(
+                f"'{series_info['title']}' dizisi için {len(series_info['seasons'])} sezon bulundu."
+            )
         return series_info
+    except host_guard.HostUnavailable as e:
+        logger.warning(f"Dizi sayfası çekilemedi: {e}")
+        return None
     except requests.exceptions.RequestException as e:
         logger.error(f"Dizi sayfası çekilirken ağ hatası: {e}", exc_info=True)
         return None
@@ -292,37 +355,11 @@ def scrape_series_data(series_url):
         return None
 
 
-def add_series_to_queue(series_url):
-    db = get_db()
-    series_data = scrape_series_data(series_url)
-    if not series_data:
-        return (
-            False,
-            "Dizi bilgileri çekilemedi. Linki kontrol edin veya site yapısı değişmiş olabilir.",
-        )
-
+def store_series_episodes(db, series_id, seasons):
+    """Sezonları ve bölümleri ekler (var olanlar atlanır); eklenen bölüm kimliklerini döndürür."""
     cursor = db.cursor()
-    cursor.execute(
-        "SELECT id FROM series WHERE source_url = ?", (series_data["source_url"],)
-    )
-    series_row = cursor.fetchone()
-
-    if not series_row:
-        cursor.execute(
-            "INSERT INTO series (title, poster_url, description, source_url) VALUES (?, ?, ?, ?)",
-            (
-                series_data["title"],
-                series_data["poster_url"],
-                series_data["description"],
-                series_data["source_url"],
-            ),
-        )
-        series_id = cursor.lastrowid
-    else:
-        series_id = series_row["id"]
-
-    added_count = 0
-    for season in series_data["seasons"]:
+    added_episode_ids = []
+    for season in seasons:
         cursor.execute(
             "SELECT id FROM seasons WHERE series_id = ? AND season_number = ?",
             (series_id, season["season_number"]),
@@ -349,15 +386,60 @@ def add_series_to_queue(series_url):
                 ),
             )
             if res.rowcount > 0:
-                added_count += 1
-
+                added_episode_ids.append(res.lastrowid)
     db.commit()
-    return (
-        True,
-        f'"{series_data["title"]}" dizisi için {added_count} yeni bölüm sıraya eklendi.',
+    return added_episode_ids
+
+
+def claim_existing_episodes(db, episode_ids):
+    """Dosyası kütüphanede bulunan bölümleri indirmeden tamamlar; sayısını döndürür."""
+    settings = settings_cache.get_all()
+    return sum(
+        1
+        for episode_id in episode_ids
+        if library_index.claim_existing_file(db, episode_id, "episode", settings)
     )
 
 
+def add_series_to_queue(series_url):
+    db = get_db()
+    series_data = scrape_series_data(series_url)
+    if not series_data:
+        return (
+            False,
+            "Dizi bilgileri çekilemedi. Linki kontrol edin veya site yapısı değişmiş olabilir.",
+        )
+
+    cursor = db.cursor()
+    cursor.execute(
+        "SELECT id FROM series WHERE source_url = ?", (series_data["source_url"],)
+    )
+    series_row = cursor.fetchone()
+
+    if not series_row:
+        cursor.execute(
+            "INSERT INTO series (title, poster_url, description, source_url) VALUES (?, ?, ?, ?)",
+            (
+                series_data["title"],
+                series_data["poster_url"],
+                series_data["description"],
+                series_data["source_url"],
+            ),
+        )
+        series_id = cursor.lastrowid
+        poster_cache.cache_poster_async(series_data["poster_url"])
+    else:
+        series_id = series_row["id"]
+
+    added_episode_ids = store_series_episodes(db, series_id, series_data["seasons"])
+    added_count = len(added_episode_ids)
+    existing_count = claim_existing_episodes(db, added_episode_ids)
+    message = f'"{series_data["title"]}" dizisi için {added_count} yeni bölüm sıraya eklendi.'
+    if existing_count:
+        message += f" {existing_count} bölüm kütüphanede zaten mevcut olduğu için indirilmeyecek."
+    return True, message
+
+
 def add_series_to_queue_async(app, series_url):
     with app.app_context():
         success, message = add_series_to_queue(series_url)
@@ -370,35 +452,103 @@ def add_series_to_queue_async(app, series_url):
 # --- ORTAK İŞLEMLER ---
 
 
-def start_download(item_id, item_type, active_processes):
+def _claim(db, table, item_id, previous_status, status):
+    """
+    Kaydı proses başlatılmadan önce koşullu güncellemeyle sahiplenir. Aynı anda
+    başlatmaya çalışan diğer çağıranlar (zamanlayıcı, başka gunicorn worker'ı,
+    uzak worker'ın claim_next_job'u) satırı değişmiş bulur ve geri çekilir.
+    """
+    cursor = db.execute(
+        f"""
+        UPDATE {table} SET status = ?, pid = NULL, progress = 0, filepath = NULL
+        WHERE id = ? AND status = ?
+        """,
+        (status, item_id, previous_status),
+    )
+    return cursor.rowcount == 1
+
+
+def _spawn(db, table, item_id, item_type, target, previous_status, status, stage="download"):
+    """
+    Sahiplenilmiş kayıt için prosesi başlatır, kaydeder ve pid'i yazar. Kısa işler
+    (ör. hemen hazırlanan kaynak) pid yazılmadan durumu ilerletip bitebilir; bu
+    durumda pid yazılmaz. Proses başlatılamazsa kayıt eski durumuna döner.
+    """
+    try:
+        p = Process(target=target, args=(item_id, item_type, get_log_queue()))
+        p.start()
+    except Exception:
+        db.execute(
+            f"UPDATE {table} SET status = ? WHERE id = ? AND status = ? AND pid IS NULL",
+            (previous_status, item_id, status),
+        )
+        db.commit()
+        raise
+    job_registry.register(db, item_type, item_id, p, stage=stage)
+    placeholders = ", ".join("?" for _ in WORKING_STATUSES)
+    db.execute(
+        f"UPDATE {table} SET pid = ? WHERE id = ? AND pid IS NULL AND status IN ({placeholders})",
+        (p.pid, item_id, *WORKING_STATUSES),
+    )
+    db.commit()
+    return p.pid
+
+
+def start_download(item_id, item_type):
     db = get_db()
     table = "movies" if item_type == "movie" else "episodes"
 
     item = db.execute(f"SELECT * FROM {table} WHERE id = ?", (item_id,)).fetchone()
     if not item:
         return False, "Kayıt bulunamadı."
-    if item["status"] in ["Kaynak aranıyor...", "İndiriliyor"]:
+    if item["status"] in WORKING_STATUSES:
         return False, "Bu indirme zaten devam ediyor."
+    if item["status"] in PIPELINE_STATUSES:
+        return False, "Bu dosya şu anda işleniyor veya kütüphaneye taşınıyor."
 
-    p = Process(target=process_video, args=(item_id, item_type))
-    p.start()
-    pid = p.pid
-    active_processes[pid] = p
-
-    db.execute(
-        f"UPDATE {table} SET status = ?, pid = ?, progress = 0, filepath = NULL WHERE id = ?",
-        ("Kaynak aranıyor...", pid, item_id),
-    )
+    # Kaynağı hazır iş doğrudan indirmeye geçer; yeniden aranıyor gibi gösterilmez.
+    status = "İndiriliyor" if item["status"] == RESOLVED_STATUS else "Kaynak aranıyor..."
+    if not _claim(db, table, item_id, item["status"], status):
+        db.rollback()
+        return False, "Bu indirme zaten devam ediyor."
+    if item["status"].startswith("Hata") or item["status"] == retry_policy.RETRY_STATUS:
+        # Elle yeniden başlatma deneme sayacını sıfırlar.
+        retry_policy.clear(db, table, item_id)
     db.commit()
+
+    pid = _spawn(db, table, item_id, item_type, process_video, item["status"], status)
     title = item["title"] if item_type == "movie" else f"Bölüm {item['episode_number']}"
     logger.info(f"ID {item_id} ('{title}') için indirme başlatıldı. PID: {pid}")
     return True, f'"{title}" için indirme başlatıldı.'
 
 
+def start_resolve(item_id, item_type):
+    """Sıradaki işin kaynağını ayrı bir proseste (çözücü havuzu) önceden hazırlar."""
+    db = get_db()
+    table = "movies" if item_type == "movie" else "episodes"
+    if not _claim(db, table, item_id, "Sırada", "Kaynak aranıyor..."):
+        db.rollback()
+        return
+    db.commit()
+    pid = _spawn(
+        db, table, item_id, item_type, resolve_video, "Sırada", "Kaynak aranıyor...", stage="resolve"
+    )
+    logger.info(f"ID {item_id} ({item_type}) için kaynak hazırlanıyor. PID: {pid}")
+
+
 def stop_download(item_id, item_type):
     db = get_db()
     table = "movies" if item_type == "movie" else "episodes"
     item = db.execute(f"SELECT * FROM {table} WHERE id = ?", (item_id,)).fetchone()
+    if item and not item["pid"] and item["lease_owner"]:
+        # Uzak worker'daki iş: kirayı geri almak yeterli, worker bir sonraki
+        # heartbeat'te kiranın kaybolduğunu görüp indirmeyi kendisi sonlandırır.
+        db.execute(
+            f"UPDATE {table} SET status = 'Duraklatıldı', lease_owner = NULL, lease_expires_at = NULL WHERE id = ?",
+            (item_id,),
+        )
+        db.commit()
+        return True, f"Uzak worker'a ({item['lease_owner']}) durdurma isteği gönderildi."
     if not (item and item["pid"]):
         return False, "Durdurulacak bir işlem bulunamadı."
     pid = item["pid"]
@@ -422,27 +572,26 @@ def stop_download(item_id, item_type):
         f"UPDATE {table} SET status = 'Duraklatıldı', pid = NULL WHERE id = ?",
         (item_id,),
     )
+    job_registry.unregister(db, item_type, item_id, pid)
     db.commit()
     return True, message
 
 
-def delete_record(item_id, item_type, active_processes):
+def delete_record(item_id, item_type):
     db = get_db()
     table = "movies" if item_type == "movie" else "episodes"
     item = db.execute(f"SELECT * FROM {table} WHERE id = ?", (item_id,)).fetchone()
 
     if item and item["pid"]:
-        pid = item["pid"]
         stop_download(item_id, item_type)
-        if pid in active_processes:
-            del active_processes[pid]
 
     db.execute(f"DELETE FROM {table} WHERE id = ?", (item_id,))
     db.commit()
+    job_logs.delete_archived(item_type, item_id)
     return True, "Kayıt başarıyla silindi."
 
 
-def delete_series_record(series_id, active_processes):
+def delete_series_record(series_id):
     """Bir diziyi, tüm sezonlarını ve bölümlerini veritabanından siler."""
     db = get_db()
 
@@ -456,11 +605,9 @@ def delete_series_record(series_id, active_processes):
     ).fetchall()
 
     for episode in episodes_to_delete:
+        job_logs.delete_archived("episode", episode["id"])
         if episode["pid"]:
-            pid = episode["pid"]
             stop_download(episode["id"], "episode")
-            if pid in active_processes:
-                del active_processes[pid]
 
     series = db.execute(
         "SELECT title FROM series WHERE id = ?", (series_id,)
@@ -483,9 +630,15 @@ def start_all_episodes_for_series(series_id):
         """
         SELECT e.id FROM episodes e
         JOIN seasons s ON e.season_id = s.id
-        WHERE s.series_id = ? AND e.status NOT IN ('Tamamlandı', 'İndiriliyor', 'Kaynak aranıyor...')
+        WHERE s.series_id = ? AND e.state NOT IN (?, ?, ?, ?, ?, ?)
     """,
-        (series_id,),
+        (
+            series_id,
+            job_state.COMPLETED,
+            job_state.READY,
+            *job_state.WORKING,
+            *job_state.PIPELINE,
+        ),
     ).fetchall()
 
     if not episodes_to_queue:
@@ -535,41 +688,458 @@ def delete_item_file(item_id, item_type):
 
 
 # --- OTOMATİK İNDİRME YÖNETİCİSİ ---
-def run_auto_download_cycle(active_processes):
-    """Sıradaki filmleri ve bölümleri otomatik olarak indirmeye başlar."""
+# İki aşamalı hat: küçük bir çözücü havuzu (RESOLVER_CONCURRENCY) sıradaki işlerin
+# manifest, başlık ve çerezlerini tarayıcıyla önceden hazırlar ve kaydı 'Hazır'
+# durumuna alır; indirme slotları (CONCURRENT_DOWNLOADS) yalnızca hazır işlerle
+# doldurulur. Böylece bir indirme slotu tarayıcıyı beklemez ve 6 indirmeyi dolu
+# tutmak için 6 Chrome açılmaz.
+_memory_wait_logged = False
+
+
+def _expire_resolved_sources(db):
+    """Yaşı MANIFEST_MAX_AGE'i aşan hazır kaynakları ve sahipsiz kayıtları temizler."""
+    cutoff = time.time() - config.MANIFEST_MAX_AGE
+    for table, item_type in (("movies", "movie"), ("episodes", "episode")):
+        db.execute(
+            f"""
+            DELETE FROM resolved_manifests
+            WHERE item_type = ? AND (
+                (resolved_at < ? AND item_id IN (SELECT id FROM {table} WHERE state = ?))
+                OR item_id NOT IN (
+                    SELECT id FROM {table} WHERE state IN (?, ?, ?, ?)
+                )
+            )
+            """,
+            (
+                item_type,
+                cutoff,
+                job_state.READY,
+                job_state.QUEUED,
+                job_state.RESOLVING,
+                job_state.READY,
+                job_state.RETRY_WAIT,
+            ),
+        )
+        cursor = db.execute(
+            f"""
+            UPDATE {table} SET status = 'Sırada'
+            WHERE state = ?
+              AND id NOT IN (SELECT item_id FROM resolved_manifests WHERE item_type = ?)
+            """,
+            (job_state.READY, item_type),
+        )
+        if cursor.rowcount:
+            logger.info(f"{cursor.rowcount} hazır {table} kaydının kaynağı eskidi; yeniden sırada.")
+    db.commit()
+
+
+def _next_ready_item(db):
+    """Kaynağı hazır işlerden önceliği en yüksek ve en önce hazırlananı."""
+    return db.execute(
+        """
+        SELECT m.id, 'movie' AS type, m.priority, r.resolved_at FROM movies m
+        JOIN resolved_manifests r ON r.item_type = 'movie' AND r.item_id = m.id
+        WHERE m.state = ?
+        UNION ALL
+        SELECT e.id, 'episode' AS type, e.priority, r.resolved_at FROM episodes e
+        JOIN resolved_manifests r ON r.item_type = 'episode' AND r.item_id = e.id
+        WHERE e.state = ?
+        ORDER BY priority DESC, resolved_at
+        LIMIT 1
+        """,
+        (job_state.READY, job_state.READY),
+    ).fetchone()
+
+
+def _ready_count(db):
+    return sum(
+        db.execute(f"SELECT COUNT(*) FROM {table} WHERE state = ?", (job_state.READY,)).fetchone()[0]
+        for table in ("movies", "episodes")
+    )
+
+
+def run_auto_download_cycle():
+    """Hazır işlerle indirme slotlarını doldurur, ardından sıradaki işlerin kaynağını hazırlar."""
     db = get_db()
-    try:
-        concurrent_limit = int(get_setting("CONCURRENT_DOWNLOADS", db))
-    except (ValueError, TypeError):
-        concurrent_limit = 1
-
-    # Ölü prosesleri temizle
-    for pid, process in list(active_processes.items()):
-        if not process.is_alive():
-            del active_processes[pid]
+    concurrent_limit = settings_cache.get_typed("CONCURRENT_DOWNLOADS")
+    resolver_limit = settings_cache.get_typed("RESOLVER_CONCURRENCY")
+
+    # Hangi web prosesi başlatmış olursa olsun tüm canlı yerel işler sayılır;
+    # sonlanmış proseslerin kayıtları bu sırada temizlenir.
+    jobs = job_registry.live_jobs(db)
+    downloading = sum(1 for job in jobs if job["stage"] == "download")
+    resolving = len(jobs) - downloading
+    # Yeni işler yalnızca tahmini bellek ihtiyaçları bütçeye sığarsa başlatılır.
+    memory_usage = memory_budget.sample(jobs)
+
+    reclaim_expired_leases()
+    retry_policy.release_due_retries(db, RESOLVED_STATUS)
+    _expire_resolved_sources(db)
+
+    while downloading < concurrent_limit:
+        ready_item = _next_ready_item(db)
+        if not ready_item or not _admit_by_memory("download", memory_usage):
+            break
+        logger.info(
+            f"[Auto-Download] Kaynağı hazır iş bulundu ({ready_item['type']} ID: {ready_item['id']}). İndirme başlatılıyor."
+        )
+        start_download(ready_item["id"], ready_item["type"])
+        downloading += 1
+
+    # Boş slotlar ve RESOLVE_AHEAD kadar fazlası için kaynak hazırlanır; hazırda
+    # bekleyen ve çözülmekte olan işler bu hedeften düşülür.
+    wanted = concurrent_limit - downloading + config.RESOLVE_AHEAD - _ready_count(db)
+    if host_guard.retry_at(config.ALLOWED_DOMAIN):
+        # Site engelleme yanıtları döndürüyor: devre kapanana kadar yeni kaynak
+        # aranmaz, işler hata sayacı tüketmeden sırada bekler.
+        return
+    while resolving < min(resolver_limit, wanted):
+        if not _admit_by_memory("resolve", memory_usage):
+            break
+        next_item = _next_queued_item(db)
+        if not next_item:
+            break
+        start_resolve(next_item["id"], next_item["type"])
+        resolving += 1
+
+
+def _admit_by_memory(stage, memory_usage):
+    global _memory_wait_logged
+    if not memory_budget.admit(stage, memory_usage):
+        if not _memory_wait_logged:
             logger.info(
-                f"Otomatik yönetici: Tamamlanmış proses (PID: {pid}) temizlendi."
+                f"[Auto-Download] Bellek bütçesi dolu; yeni {stage} işi bellek boşalınca başlatılacak."
             )
+            _memory_wait_logged = True
+        return False
+    _memory_wait_logged = False
+    memory_budget.reserve(stage, memory_usage)
+    return True
+
+
+# --- ÖNCELİK VE ADİL SIRALAMA ---
+# Aynı öncelikteki işler kulvarlar arasında sırayla (round-robin) dağıtılır:
+# filmler tek bir kulvardır (0), her dizi kendi kulvarıdır (series_id). Böylece
+# 200 bölümlük bir dizi eklendiğinde sıradaki filmler ve diğer diziler beklemez.
+# Tüm sorgular idx_movies_state_queue / idx_episodes_state_queue indekslerinde tek
+# bir aramayla (seek) biter; kuyruk büyüdükçe seçim maliyeti logaritmik kalır.
+MOVIE_LANE = 0
+# Planlayıcı başka bir state indeksini seçip sıralama yapmasın diye en yüksek
+# öncelik aramasında kuyruk indeksi açıkça belirtilir.
+QUEUE_INDEXES = {"movies": "idx_movies_state_queue", "episodes": "idx_episodes_state_queue"}
+_last_lane = -1
+
+
+def _top_queued_priority(db, table, exclude_sql="", params=()):
+    row = db.execute(
+        f"SELECT priority FROM {table} INDEXED BY {QUEUE_INDEXES[table]} "
+        f"WHERE state = ?{exclude_sql} ORDER BY priority DESC LIMIT 1",
+        (job_state.QUEUED, *params),
+    ).fetchone()
+    return row["priority"] if row else None
+
+
+def _next_series_lane(db, priority, after_series_id):
+    row = db.execute(
+        """
+        SELECT series_id FROM episodes
+        WHERE state = ? AND priority = ? AND series_id > ?
+        ORDER BY series_id LIMIT 1
+        """,
+        (job_state.QUEUED, priority, after_series_id),
+    ).fetchone()
+    return row["series_id"] if row else None
 
-    # Mevcut indirme slotlarını doldurana kadar döngüye gir
-    while len(active_processes) < concurrent_limit:
-        next_item = db.execute("""
-            SELECT id, 'movie' as type, created_at FROM movies WHERE status = 'Sırada'
-            UNION ALL
-            SELECT id, 'episode' as type, created_at FROM episodes WHERE status = 'Sırada'
-            ORDER BY created_at ASC
-            LIMIT 1
-        """).fetchone()
 
+def _pick_queued_item(db):
+    """En yüksek öncelikte, son kullanılan kulvardan sonraki kulvarın en eski işi."""
+    global _last_lane
+    movie_priority = _top_queued_priority(db, "movies")
+    episode_priority = _top_queued_priority(db, "episodes")
+    if movie_priority is None and episode_priority is None:
+        return None
+    priority = max(p for p in (movie_priority, episode_priority) if p is not None)
+    has_movies = movie_priority == priority
+
+    if has_movies and _last_lane < MOVIE_LANE:
+        lane = MOVIE_LANE
+    else:
+        lane = _next_series_lane(db, priority, max(_last_lane, MOVIE_LANE))
+        if lane is None:
+            lane = MOVIE_LANE if has_movies else _next_series_lane(db, priority, MOVIE_LANE)
+    if lane is None:
+        return None
+    _last_lane = lane
+
+    if lane == MOVIE_LANE:
+        return db.execute(
+            """
+            SELECT id, 'movie' AS type, created_at FROM movies
+            WHERE state = ? AND priority = ?
+            ORDER BY created_at, id LIMIT 1
+            """,
+            (job_state.QUEUED, priority),
+        ).fetchone()
+    return db.execute(
+        """
+        SELECT id, 'episode' AS type, created_at FROM episodes
+        WHERE state = ? AND priority = ? AND series_id = ?
+        ORDER BY created_at, id LIMIT 1
+        """,
+        (job_state.QUEUED, priority, lane),
+    ).fetchone()
+
+
+def _next_queued_item(db):
+    while True:
+        next_item = _pick_queued_item(db)
         if not next_item:
-            break  # Sırada başka öğe yoksa döngüden çık
+            return None
+        # Dosyası kütüphanede zaten olan kayıt indirilmeden tamamlanır.
+        if library_index.claim_existing_file(db, next_item["id"], next_item["type"]):
+            continue
+        if next_item["type"] != "movie" or not _skip_if_duplicate(db, next_item["id"]):
+            return next_item
+
+
+def move_to_front(item_id, item_type):
+    """
+    Öğeyi sıradaki diğer tüm işlerin önüne alır. Dizi için tüm bölümleri (ve dizinin
+    varsayılan önceliği) güncellenir; bölümler kendi aralarındaki sırayı korur.
+    """
+    db = get_db()
+    # Öğenin kendisi hariç tutulur; art arda basmak önceliği sürekli artırmaz.
+    movie_exclude = episode_exclude = ("", ())
+    if item_type == "series":
+        series = db.execute("SELECT title FROM series WHERE id = ?", (item_id,)).fetchone()
+        if not series:
+            return False, "Dizi bulunamadı."
+        episode_exclude = (" AND series_id != ?", (item_id,))
+        label = f"'{series['title']}' dizisi"
+    else:
+        table = "movies" if item_type == "movie" else "episodes"
+        item = db.execute(f"SELECT status FROM {table} WHERE id = ?", (item_id,)).fetchone()
+        if not item:
+            return False, "Kayıt bulunamadı."
+        if item["status"] != "Sırada":
+            return False, "Yalnızca sırada bekleyen öğeler öne alınabilir."
+        if item_type == "movie":
+            movie_exclude = (" AND id != ?", (item_id,))
+        else:
+            episode_exclude = (" AND id != ?", (item_id,))
+        label = "Film" if item_type == "movie" else "Bölüm"
 
-        item_id = next_item["id"]
-        item_type = next_item["type"]
-        logger.info(
-            f"[Auto-Download] Sırada bekleyen bulundu ({item_type} ID: {item_id}). İndirme başlatılıyor."
+    others = [
+        _top_queued_priority(db, "movies", *movie_exclude),
+        _top_queued_priority(db, "episodes", *episode_exclude),
+    ]
+    priority = max([p for p in others if p is not None] + [0]) + 1
+    return _apply_priority(db, item_id, item_type, priority, f"{label} sıranın başına alındı.")
+
+
+def set_priority(item_id, item_type, priority):
+    """Film, bölüm veya dizinin önceliğini ayarlar (büyük değer önce indirilir)."""
+    try:
+        priority = max(-100, min(100, int(priority)))
+    except (TypeError, ValueError):
+        return False, "Geçersiz öncelik değeri."
+    return _apply_priority(
+        get_db(), item_id, item_type, priority, f"Öncelik {priority} olarak ayarlandı."
+    )
+
+
+def _apply_priority(db, item_id, item_type, priority, message):
+    if item_type == "series":
+        cursor = db.execute("UPDATE series SET priority = ? WHERE id = ?", (priority, item_id))
+        db.execute("UPDATE episodes SET priority = ? WHERE series_id = ?", (priority, item_id))
+    else:
+        table = "movies" if item_type == "movie" else "episodes"
+        cursor = db.execute(f"UPDATE {table} SET priority = ? WHERE id = ?", (priority, item_id))
+    db.commit()
+    if cursor.rowcount != 1:
+        return False, "Kayıt bulunamadı."
+    logger.info(f"ID {item_id} ({item_type}) önceliği {priority} olarak ayarlandı.")
+    return True, message
+
+
+def set_series_quality_policy(series_id, policy_text):
+    """Dizinin kalite politikasını ayarlar; boş değer genel ayarı kullanır."""
+    policy_text = (policy_text or "").strip()
+    try:
+        hls_variants.parse_quality_policy(policy_text)
+    except ValueError as e:
+        return False, str(e)
+    db = get_db()
+    cursor = db.execute(
+        "UPDATE series SET quality_policy = ? WHERE id = ?", (policy_text or None, series_id)
+    )
+    db.commit()
+    if cursor.rowcount != 1:
+        return False, "Kayıt bulunamadı."
+    logger.info(f"Dizi ID {series_id} kalite politikası: {policy_text or 'genel ayar'}")
+    return True, "Kalite politikası kaydedildi."
+
+
+def _skip_if_duplicate(db, movie_id):
+    """
+    İndirme öncesi son kontrol: aynı içerik başka bir kayıtla indirilmişse veya
+    şu anda indiriliyorsa filmi atlar. Manuel başlatma bu kontrolü yapmaz.
+    """
+    movie = db.execute(
+        "SELECT url, title, year, imdb_id, canonical_url FROM movies WHERE id = ?",
+        (movie_id,),
+    ).fetchone()
+    duplicate = identity.find_duplicate_movie(
+        db,
+        movie["url"],
+        movie["title"],
+        movie["year"],
+        movie["imdb_id"],
+        movie["canonical_url"],
+        exclude_id=movie_id,
+        statuses=WORKING_STATUSES + PIPELINE_STATUSES + (RESOLVED_STATUS, "Tamamlandı"),
+    )
+    if not duplicate:
+        return False
+    db.execute(
+        "UPDATE movies SET status = ? WHERE id = ? AND status = 'Sırada'",
+        (
+            f"{identity.DUPLICATE_STATUS_PREFIX}: Aynı içerik zaten mevcut (ID {duplicate['id']})",
+            movie_id,
+        ),
+    )
+    db.commit()
+    logger.info(
+        f"Film ID {movie_id} atlandı: aynı içerik ID {duplicate['id']} ile zaten mevcut."
+    )
+    return True
+
+
+# --- DAĞITIK WORKER İŞ KİRALAMA ---
+
+
+def reclaim_expired_leases():
+    """Heartbeat göndermeyi bırakmış (ölmüş) uzak worker'ların işlerini sıraya geri alır."""
+    db = get_db()
+    now = time.time()
+    reclaimed = 0
+    for table in ("movies", "episodes"):
+        cursor = db.execute(
+            f"""
+            UPDATE {table}
+            SET status = 'Sırada', progress = 0, lease_owner = NULL, lease_expires_at = NULL
+            WHERE lease_owner IS NOT NULL AND lease_expires_at < ?
+            """,
+            (now,),
+        )
+        reclaimed += cursor.rowcount
+    db.commit()
+    if reclaimed:
+        logger.warning(f"Süresi dolan {reclaimed} iş kirası geri alınıp sıraya eklendi.")
+    return reclaimed
+
+
+def claim_next_job(worker_id):
+    """
+    Sıradaki işi verilen worker adına atomik olarak kiralar. Aynı satırı iki worker
+    aynı anda seçse bile koşullu UPDATE yalnızca birinde etkili olur.
+    """
+    db = get_db()
+    reclaim_expired_leases()
+    for _ in range(5):
+        next_item = _next_queued_item(db)
+        if not next_item:
+            return None
+        item_id, item_type = next_item["id"], next_item["type"]
+        table = "movies" if item_type == "movie" else "episodes"
+        lease_expires_at = time.time() + config.WORKER_LEASE_SECONDS
+        cursor = db.execute(
+            f"""
+            UPDATE {table}
+            SET status = 'Kaynak aranıyor...', pid = NULL, progress = 0, filepath = NULL,
+                lease_owner = ?, lease_expires_at = ?
+            WHERE id = ? AND status = 'Sırada'
+            """,
+            (worker_id, lease_expires_at, item_id),
         )
-        start_download(item_id, item_type, active_processes)
+        db.commit()
+        if cursor.rowcount != 1:
+            continue
+
+        settings = settings_cache.get_all()
+        url, output_parts = build_output_parts(db, item_id, item_type, settings)
+        logger.info(f"ID {item_id} ({item_type}) uzak worker '{worker_id}' tarafından kiralandı.")
+        return {
+            "item_id": item_id,
+            "item_type": item_type,
+            "url": url,
+            "output_parts": output_parts,
+            "speed_limit": str(settings_cache.get_typed("SPEED_LIMIT") or ""),
+            "quality_policy": quality_policy_for(db, item_id, item_type, settings),
+            "lease_expires_at": lease_expires_at,
+            "lease_seconds": config.WORKER_LEASE_SECONDS,
+        }
+    return None
+
+
+def renew_job_lease(item_id, item_type, worker_id, status=None, progress=None):
+    """Heartbeat: kirayı uzatır ve ilerlemeyi kaydeder. Kira kaybedildiyse None döner."""
+    db = get_db()
+    table = "movies" if item_type == "movie" else "episodes"
+    if status not in (None, "Kaynak aranıyor...", "İndiriliyor"):
+        status = None
+    lease_expires_at = time.time() + config.WORKER_LEASE_SECONDS
+    cursor = db.execute(
+        f"""
+        UPDATE {table}
+        SET lease_expires_at = ?, status = COALESCE(?, status), progress = COALESCE(?, progress)
+        WHERE id = ? AND lease_owner = ?
+        """,
+        (lease_expires_at, status, progress, item_id, worker_id),
+    )
+    db.commit()
+    return lease_expires_at if cursor.rowcount == 1 else None
+
+
+def complete_remote_job(
+    item_id, item_type, worker_id, success, message, filepath=None, quality_info=None
+):
+    """Uzak worker'ın bildirdiği sonucu kaydeder ve kirayı serbest bırakır."""
+    db = get_db()
+    table = "movies" if item_type == "movie" else "episodes"
+    if success:
+        status, progress = "Tamamlandı", 100
+    else:
+        status = message if (message or "").startswith("Hata") else f"Hata: {message}"
+        progress, filepath = None, None
+    cursor = db.execute(
+        f"""
+        UPDATE {table}
+        SET status = ?, progress = COALESCE(?, progress), filepath = ?,
+            quality_info = COALESCE(?, quality_info),
+            lease_owner = NULL, lease_expires_at = NULL
+        WHERE id = ? AND lease_owner = ?
+        """,
+        (
+            status,
+            progress,
+            filepath,
+            json.dumps(quality_info, ensure_ascii=False) if quality_info else None,
+            item_id,
+            worker_id,
+        ),
+    )
+    if cursor.rowcount == 1:
+        if success:
+            retry_policy.clear(db, table, item_id)
+        else:
+            retry_policy.record_failure(
+                db, item_id, item_type, download_error_code(status), status
+            )
+    db.commit()
+    if cursor.rowcount == 1:
+        logger.info(f"ID {item_id} ({item_type}): Uzak worker '{worker_id}' sonucu: {status}")
+    return cursor.rowcount == 1
 
 
 # --- API İÇİN VERİ ÇEKME FONKSİYONLARI ---
@@ -581,27 +1151,203 @@ def get_all_movies_status():
     return {m["id"]: dict(m) for m in movies}
 
 
+def _attach_seasons(db, series_rows):
+    """Sezon ve bölümleri seri başına sorgu atmadan, toplu olarak ekler."""
+    series_data = [dict(s) for s in series_rows]
+    if not series_data:
+        return series_data
+    by_id = {s["id"]: s for s in series_data}
+    for s in series_data:
+        s["seasons"] = []
+
+    if len(series_data) <= LIST_MAX_PER_PAGE:
+        placeholders = ", ".join("?" for _ in by_id)
+        seasons = db.execute(
+            f"SELECT * FROM seasons WHERE series_id IN ({placeholders}) "
+            "ORDER BY series_id, season_number ASC",
+            tuple(by_id),
+        ).fetchall()
+        episodes = db.execute(
+            f"""
+            SELECT e.* FROM episodes e JOIN seasons s ON e.season_id = s.id
+            WHERE s.series_id IN ({placeholders})
+            ORDER BY e.season_id, e.episode_number ASC
+            """,
+            tuple(by_id),
+        ).fetchall()
+    else:
+        seasons = db.execute(
+            "SELECT * FROM seasons ORDER BY series_id, season_number ASC"
+        ).fetchall()
+        episodes = db.execute(
+            "SELECT * FROM episodes ORDER BY season_id, episode_number ASC"
+        ).fetchall()
+
+    seasons_by_id = {}
+    for season in seasons:
+        series = by_id.get(season["series_id"])
+        if series is None:
+            continue
+        season_dict = dict(season)
+        season_dict["episodes"] = []
+        seasons_by_id[season["id"]] = season_dict
+        series["seasons"].append(season_dict)
+    for ep in episodes:
+        season = seasons_by_id.get(ep["season_id"])
+        if season is not None:
+            season["episodes"].append(dict(ep))
+    return series_data
+
+
 def get_all_series_status():
     db = get_db()
     series_list = db.execute("SELECT * FROM series ORDER BY title ASC").fetchall()
+    return _attach_seasons(db, series_list)
 
-    series_data = []
-    for s in series_list:
-        series_dict = dict(s)
-        seasons = db.execute(
-            "SELECT * FROM seasons WHERE series_id = ? ORDER BY season_number ASC",
-            (s["id"],),
-        ).fetchall()
 
-        series_dict["seasons"] = []
-        for season in seasons:
-            season_dict = dict(season)
-            episodes = db.execute(
-                "SELECT * FROM episodes WHERE season_id = ? ORDER BY episode_number ASC",
-                (season["id"],),
-            ).fetchall()
-            season_dict["episodes"] = [dict(ep) for ep in episodes]
-            series_dict["seasons"].append(season_dict)
-        series_data.append(series_dict)
+# --- SAYFALI KÜTÜPHANE API'Sİ ---
 
-    return series_data
+LIST_DEFAULT_PER_PAGE = 50
+LIST_MAX_PER_PAGE = 200
+MOVIE_SORT_COLUMNS = {
+    "created_at": "m.created_at",
+    "title": "m.title COLLATE NOCASE",
+    "year": "m.year",
+    "imdb_score": "CAST(m.imdb_score AS REAL)",
+    "status": "m.status",
+}
+MOVIE_LIST_COLUMNS = (
+    "m.id, m.url, m.status, m.title, m.year, m.genre, m.description, m.imdb_score, "
+    "m.director, m.poster_url, m.progress, m.filepath, m.pid, m.created_at, m.priority, "
+    "m.quality_info, m.error_code, m.attempts, m.next_attempt_at, m.state, m.error_detail"
+)
+
+
+def _page_bounds(page, per_page):
+    try:
+        page = max(1, int(page))
+    except (TypeError, ValueError):
+        page = 1
+    try:
+        per_page = min(LIST_MAX_PER_PAGE, max(1, int(per_page)))
+    except (TypeError, ValueError):
+        per_page = LIST_DEFAULT_PER_PAGE
+    return page, per_page
+
+
+def _fts_match_query(text):
+    """Kullanıcı aramasını güvenli bir FTS5 önek sorgusuna çevirir."""
+    terms = re.findall(r"\w+", text or "", re.UNICODE)
+    return " ".join('"' + term.replace('"', '""') + '"*' for term in terms)
+
+
+def _status_filter(column, status, where, params):
+    # Panel filtresi durum metni gönderir ('Hata' tüm hata mesajlarını kapsar).
+    # Tanınmayan metin ValueError yükseltir; yazım hatası hata listesini döndürmemeli.
+    state = job_state.from_status(status, strict=True)
+    where.append(f"{column} = ?")
+    params.append(state)
+
+
+def _paged_result(items, page, per_page, total):
+    return {
+        "items": items,
+        "page": page,
+        "per_page": per_page,
+        "total": total,
+        "pages": (total + per_page - 1) // per_page,
+    }
+
+
+def query_movies(
+    page=1,
+    per_page=LIST_DEFAULT_PER_PAGE,
+    sort="created_at",
+    order="desc",
+    status=None,
+    year=None,
+    genre=None,
+    added_from=None,
+    added_to=None,
+    q=None,
+):
+    """Filmleri sunucu tarafında filtreleyip sayfalar."""
+    db = get_db()
+    page, per_page = _page_bounds(page, per_page)
+    where, params = [], []
+    if status:
+        _status_filter("m.state", status, where, params)
+    if year:
+        where.append("m.year = ?")
+        params.append(str(year))
+    if genre:
+        where.append("m.genre LIKE ?")
+        params.append(f"%{genre}%")
+    if added_from:
+        where.append("m.created_at >= ?")
+        params.append(added_from)
+    if added_to:
+        where.append("m.created_at < date(?, '+1 day')")
+        params.append(added_to)
+    match_query = _fts_match_query(q) if q else ""
+    if match_query and full_text_search_available(db):
+        where.append("m.id IN (SELECT rowid FROM movies_fts WHERE movies_fts MATCH ?)")
+        params.append(match_query)
+    elif q:
+        where.append(
+            "(m.title LIKE ? OR m.description LIKE ? OR m.director LIKE ? OR m.\"cast\" LIKE ?)"
+        )
+        params.extend([f"%{q}%"] * 4)
+
+    where_sql = f"WHERE {' AND '.join(where)}" if where else ""
+    order_sql = MOVIE_SORT_COLUMNS.get(sort, MOVIE_SORT_COLUMNS["created_at"])
+    direction = "ASC" if str(order).lower() == "asc" else "DESC"
+
+    total = db.execute(f"SELECT COUNT(*) FROM movies m {where_sql}", params).fetchone()[0]
+    rows = db.execute(
+        f"SELECT {MOVIE_LIST_COLUMNS} FROM movies m {where_sql} "
+        f"ORDER BY {order_sql} {direction}, m.id {direction} LIMIT ? OFFSET ?",
+        params + [per_page, (page - 1) * per_page],
+    ).fetchall()
+    items = []
+    for row in rows:
+        movie = dict(row)
+        movie["poster_thumb"] = poster_cache.thumbnail_url("movie", movie["id"], movie["poster_url"])
+        items.append(movie)
+    return _paged_result(items, page, per_page, total)
+
+
+def query_series(page=1, per_page=LIST_DEFAULT_PER_PAGE, status=None, q=None):
+    """Dizileri sayfalar; yalnızca sayfadaki dizilerin sezon ve bölümlerini yükler."""
+    db = get_db()
+    page, per_page = _page_bounds(page, per_page)
+    where, params = [], []
+    if status:
+        episode_where, episode_params = [], []
+        _status_filter("e.state", status, episode_where, episode_params)
+        where.append(
+            "EXISTS (SELECT 1 FROM episodes e JOIN seasons s ON e.season_id = s.id "
+            f"WHERE s.series_id = ser.id AND {episode_where[0]})"
+        )
+        params.extend(episode_params)
+    match_query = _fts_match_query(q) if q else ""
+    if match_query and full_text_search_available(db):
+        where.append("ser.id IN (SELECT rowid FROM series_fts WHERE series_fts MATCH ?)")
+        params.append(match_query)
+    elif q:
+        where.append("(ser.title LIKE ? OR ser.description LIKE ?)")
+        params.extend([f"%{q}%"] * 2)
+
+    where_sql = f"WHERE {' AND '.join(where)}" if where else ""
+    total = db.execute(f"SELECT COUNT(*) FROM series ser {where_sql}", params).fetchone()[0]
+    rows = db.execute(
+        f"SELECT ser.* FROM series ser {where_sql} "
+        "ORDER BY ser.title COLLATE NOCASE ASC, ser.id ASC LIMIT ? OFFSET ?",
+        params + [per_page, (page - 1) * per_page],
+    ).fetchall()
+    items = _attach_seasons(db, rows)
+    for series in items:
+        series["poster_thumb"] = poster_cache.thumbnail_url(
+            "series", series["id"], series["poster_url"]
+        )
+    return _paged_result(items, page, per_page, total)
@@ -0,0 +1,133 @@
+# @author: MembaCo.
+
+"""
+Ayarlar için süreç içi önbellek.
+
+Ayarlar settings tablosundan bir kez okunur, tipli değerler (sayılar, hız
+limitleri) o anda doğrulanır ve bellekte bir anlık görüntü olarak tutulur.
+Zamanlayıcı döngüsü, giriş ve worker başlatma gibi sık çalışan yollar
+SQLite'a dokunmadan bu görüntüyü okur.
+
+update_setting çağrıldığında ve ayarlar formu kaydedildiğinde görüntü geçersiz
+kılınır ve paylaşılan sürüm numarası artırılır. İndirme prosesleri ana süreçten
+fork edildiği için hem görüntüyü hem de sürüm sayacını devralır; sürüm
+değişmişse kendi kopyalarını veritabanından yeniler.
+"""
+
+import logging
+import multiprocessing
+import re
+import sqlite3
+import threading
+
+import config
+
+logger = logging.getLogger(__name__)
+
+# Paylaşılan bellekte tutulur; fork edilen prosesler aynı sayacı görür.
+_version = multiprocessing.Value("i", 0)
+_lock = threading.Lock()
+_snapshot = None  # (sürüm, ham değerler, tipli değerler)
+
+
+def parse_size(value, label="boyut"):
+    """'500K', '2.5M', '1G' gibi değerleri bayt olarak döndürür (boşsa None)."""
+    if not value or not str(value).strip():
+        return None
+    match = re.fullmatch(r"\s*([0-9.]+)\s*([KMG]?)\s*", str(value), re.IGNORECASE)
+    if not match:
+        logger.warning(f"Geçersiz {label} yok sayıldı: {value}")
+        return None
+    multiplier = {"": 1, "K": 1024, "M": 1024**2, "G": 1024**3}
+    return int(float(match.group(1)) * multiplier[match.group(2).upper()])
+
+
+def parse_rate_limit(value):
+    """Hız limitlerini bayt/sn olarak döndürür (boşsa None)."""
+    return parse_size(value, "hız limiti")
+
+
+def _positive_int(value):
+    number = int(str(value).strip())
+    if number < 1:
+        raise ValueError(value)
+    return number
+
+
+# Ayar anahtarı -> (ayrıştırıcı, geçersiz/boş değerde kullanılacak varsayılan)
+TYPED_SETTINGS = {
+    "CONCURRENT_DOWNLOADS": (_positive_int, 1),
+    "MOVER_CONCURRENCY": (_positive_int, 1),
+    "POSTPROCESS_CONCURRENCY": (_positive_int, 1),
+    "RESOLVER_CONCURRENCY": (_positive_int, 1),
+    "SERIES_WATCH_INTERVAL": (_positive_int, 6),
+    "SPEED_LIMIT": (parse_rate_limit, None),
+    "MOVER_SPEED_LIMIT": (parse_rate_limit, None),
+    "MEMORY_BUDGET": (parse_size, None),
+}
+
+
+def _parse(raw):
+    typed = {}
+    for key, (parser, default) in TYPED_SETTINGS.items():
+        value = raw.get(key)
+        if value in (None, ""):
+            typed[key] = default
+            continue
+        try:
+            parsed = parser(value)
+        except (TypeError, ValueError):
+            logger.warning(f"Geçersiz ayar değeri yok sayıldı: {key}={value!r}")
+            parsed = None
+        typed[key] = default if parsed is None else parsed
+    return typed
+
+
+def _load():
+    global _snapshot
+    # Sürüm okumadan önce alınır; yükleme sırasında gelen bir güncelleme bir
+    # sonraki okumada yeniden yüklemeye yol açar.
+    version = _version.value
+    conn = sqlite3.connect(config.DATABASE, timeout=30)
+    try:
+        raw = dict(conn.execute("SELECT key, value FROM settings").fetchall())
+    finally:
+        conn.close()
+    snapshot = (version, raw, _parse(raw))
+    with _lock:
+        _snapshot = snapshot
+    return snapshot
+
+
+def _current():
+    snapshot = _snapshot
+    if snapshot is None or snapshot[0] != _version.value:
+        snapshot = _load()
+    return snapshot
+
+
+def get_all():
+    """Tüm ayarların (metin olarak) bir kopyasını döndürür."""
+    return dict(_current()[1])
+
+
+def get(key, default=None):
+    return _current()[1].get(key, default)
+
+
+def get_typed(key):
+    """TYPED_SETTINGS içindeki bir ayarın doğrulanmış değerini döndürür."""
+    return _current()[2][key]
+
+
+def version():
+    return _version.value
+
+
+def invalidate():
+    """Görüntüyü geçersiz kılar; bu süreç ve fork edilmiş prosesler yeniden okur."""
+    global _snapshot
+    with _version.get_lock():
+        _version.value += 1
+    with _lock:
+        _snapshot = None
@@ -0,0 +1,80 @@
+# @author: MembaCo.
+
+"""
+İndirme sonrası aşamaların (işleme, kütüphaneye taşıma) ortak thread havuzu.
+
+Her aşama belirli bir state'teki kayıtları tarar ve kendi işlevini sınırlı
+sayıda thread'de çalıştırır. Aynı kayıt, önceki işi bitmeden yeniden
+gönderilmez. Eşzamanlılık ayarı değişirse havuz, yalnızca üzerinde iş yokken
+yeni boyutla yeniden kurulur.
+"""
+
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import config
+import settings_cache
+
+
+class StagePool:
+    """state'teki kayıtları worker(item_type, item_id, filepath, settings) ile işler."""
+
+    def __init__(self, name, state, worker, concurrency_setting):
+        self.name = name
+        self.state = state
+        self.worker = worker
+        self.concurrency_setting = concurrency_setting
+        self._executor = None
+        self._executor_size = 0
+        self._in_flight = set()
+        self._lock = threading.Lock()
+
+    def _pending_rows(self):
+        conn = sqlite3.connect(config.DATABASE, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            return conn.execute(
+                """
+                SELECT id, 'movie' AS type, filepath FROM movies WHERE state = ?
+                UNION ALL
+                SELECT id, 'episode' AS type, filepath FROM episodes WHERE state = ?
+                """,
+                (self.state, self.state),
+            ).fetchall()
+        finally:
+            conn.close()
+
+    def _get_executor(self, size):
+        # Çağıran _lock'u tutar; boyut yalnızca üzerinde iş yokken değiştirilir.
+        if self._executor is None or (self._executor_size != size and not self._in_flight):
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+            self._executor = ThreadPoolExecutor(max_workers=size, thread_name_prefix=self.name)
+            self._executor_size = size
+        return self._executor
+
+    def _run(self, item_type, item_id, filepath, settings):
+        try:
+            self.worker(item_type, item_id, filepath, settings)
+        finally:
+            with self._lock:
+                self._in_flight.discard((item_type, item_id))
+
+    def run_cycle(self):
+        """Bekleyen kayıtları havuza gönderir."""
+        rows = self._pending_rows()
+        if not rows:
+            return
+
+        settings = settings_cache.get_all()
+        concurrency = settings_cache.get_typed(self.concurrency_setting)
+
+        with self._lock:
+            executor = self._get_executor(concurrency)
+            for row in rows:
+                key = (row["type"], row["id"])
+                if key in self._in_flight or not row["filepath"]:
+                    continue
+                self._in_flight.add(key)
+                executor.submit(self._run, row["type"], row["id"], row["filepath"], settings)
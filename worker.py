@@ -1,26 +1,71 @@
 # @author: MembaCo.
 
+import collections
+import errno
+import json
 import sqlite3
 import time
+import signal
 import subprocess
 import re
 import os
 import sys
 import logging
-import glob
+import requests
 from seleniumwire import webdriver
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException
+from selenium.common.exceptions import TimeoutException, WebDriverException
 
 import config
-from logging_config import setup_logging
-from database import get_all_settings as get_all_settings_from_db
+import hls_variants
+import host_guard
+import job_registry
+import job_state
+import retry_policy
+from job_logs import JOB_OUTPUT_LOGGER, job_key
+import settings_cache
+from logging_config import setup_worker_logging
+
+try:
+    import resource
+except ImportError:  # Windows: bellek sınırı uygulanmaz.
+    resource = None
 
 logger = logging.getLogger(__name__)
 
+# yt-dlp'nin dosyayı son konumuna taşıdıktan sonra yazdırdığı satırın öneki.
+# Çıktı yolu dizin taraması yapmadan doğrudan bu satırdan okunur.
+FILEPATH_MARKER = "[avd-filepath] "
+
+# process_video bu ortam değişkenlerini ayarlar; Chrome, chromedriver ve yt-dlp
+# gibi tüm alt prosesler bunları miras alır. reconciler.py, uygulama yeniden
+# başladığında sahipsiz kalmış prosesleri bu işaretlerle tanır.
+JOB_ENV_VAR = "AVD_JOB"
+JOB_WORKER_PID_ENV_VAR = "AVD_WORKER_PID"
+JOB_DATABASE_ENV_VAR = "AVD_DATABASE"
+
+# selenium-wire yalnızca bu desene uyan istekleri yakalar ve saklar; diğer
+# istekler proxy'den arabelleğe alınmadan akış olarak geçer.
+VIDEO_REQUEST_PATTERN = r".*(" + "|".join(re.escape(k) for k in config.VIDEO_KEYWORDS) + r").*"
+
+# resolve_video kaynağı hazırladığında kayıt bu duruma geçer; otomatik yönetici
+# indirme slotlarını yalnızca bu durumdaki işlerle doldurur.
+RESOLVED_STATUS = job_state.LABELS[job_state.READY]
+# Önceden çözülmüş imzalı adresin süresinin dolduğunu gösteren yanıt kodları.
+EXPIRED_SOURCE_CODES = (401, 403, 404, 410)
+
+# yt-dlp çıktısında aranan hatalar: işaret -> (hata kodu, kullanıcıya gösterilen mesaj).
+YT_DLP_ERRORS = {
+    "403 Forbidden": ("http_403", "Hata: Sunucu erişimi reddetti (403)."),
+    "No space left on device": ("enospc", "Hata: Diskte yeterli alan yok."),
+    "HTTP Error 404": ("http_404", "Hata: Video kaynağı bulunamadı (404)."),
+}
+YT_DLP_ERROR_MARKERS = tuple(YT_DLP_ERRORS)
+SOURCE_NOT_FOUND_MESSAGE = "Hata: Video kaynağı bulunamadı"
+
 
 def _update_status_worker(
     conn, item_id, item_type, status=None, source_url=None, progress=None, filepath=None
@@ -56,21 +101,69 @@ def _update_status_worker(
         )
 
 
-def find_manifest_url(target_url):
-    """Selenium ile manifest URL'sini, gerekli headerları ve çerezleri bulur."""
+def _resolver_chrome_options():
     options = webdriver.ChromeOptions()
     options.add_argument("--headless=new")
     options.add_argument("--no-sandbox")
     options.add_argument("--disable-dev-shm-usage")
     options.add_argument("--log-level=3")
     options.add_argument("--mute-audio")
+    options.add_argument("--disable-gpu")
+    options.add_argument("--disable-extensions")
     options.add_argument(f"user-agent={config.USER_AGENT}")
+    if config.RESOLVER_BLOCK_ASSETS:
+        options.add_experimental_option(
+            "prefs", {"profile.managed_default_content_settings.images": 2}
+        )
+        # Oynatıcı iframe'i ayrı bir renderer'a taşınırsa aşağıdaki CDP engeli
+        # ona uygulanmaz; iframe'ler sayfayla aynı proseste tutulur.
+        options.add_argument("--disable-features=IsolateOrigins,site-per-process")
+    return options
+
+
+def _block_heavy_assets(driver):
+    """Font, medya ve reklam/analitik isteklerini tarayıcı içinde iptal eder."""
+    try:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd(
+            "Network.setBlockedURLs", {"urls": config.RESOLVER_BLOCKED_URL_PATTERNS}
+        )
+    except WebDriverException as e:
+        logger.warning(f"Ağır içerik engeli uygulanamadı: {e.msg}")
+
+
+def find_manifest_url(target_url):
+    """
+    Selenium ile manifest URL'sini, gerekli headerları ve çerezleri bulur. Site
+    erişilemez durumdaysa (devre açık) tarayıcı hiç açılmadan HostUnavailable
+    fırlatılır.
+    """
+    host_guard.acquire(target_url)
     driver = None
     try:
         service = Service()
-        driver = webdriver.Chrome(service=service, options=options)
+        driver = webdriver.Chrome(
+            service=service,
+            options=_resolver_chrome_options(),
+            seleniumwire_options={
+                "request_storage": "memory",
+                "request_storage_max_size": config.RESOLVER_REQUEST_STORAGE_MAX,
+            },
+        )
+        driver.scopes = [VIDEO_REQUEST_PATTERN]
+        if config.RESOLVER_BLOCK_ASSETS:
+            _block_heavy_assets(driver)
         wait = WebDriverWait(driver, 30)
-        driver.get(target_url)
+        try:
+            driver.get(target_url)
+        except WebDriverException as e:
+            if "net::ERR" in str(e):
+                host_guard.record(target_url, False, "ağ hatası")
+            raise
+        if host_guard.is_challenge_page(driver.title):
+            host_guard.record(target_url, False, "Cloudflare doğrulama sayfası")
+            logger.warning(f"Site doğrulama sayfası döndürdü. URL: {target_url}")
+            return None, None, None
         play_button_main = wait.until(EC.element_to_be_clickable((By.ID, "fimcnt")))
         driver.execute_script("arguments[0].click();", play_button_main)
         iframe_locator = (By.CSS_SELECTOR, ".play-box-iframe iframe")
@@ -78,11 +171,9 @@ def find_manifest_url(target_url):
         play_button_iframe = wait.until(EC.element_to_be_clickable((By.ID, "player")))
         del driver.requests
         driver.execute_script("arguments[0].click();", play_button_iframe)
-        request = driver.wait_for_request(
-            r".*(" + "|".join(re.escape(k) for k in config.VIDEO_KEYWORDS) + r").*",
-            timeout=20,
-        )
+        request = driver.wait_for_request(VIDEO_REQUEST_PATTERN, timeout=20)
         logger.info(f"Manifest URL'si bulundu: {request.url}")
+        host_guard.record(target_url, True)
         headers = dict(request.headers)
         cookies = driver.get_cookies()
         return request.url, headers, cookies
@@ -90,23 +181,40 @@ def find_manifest_url(target_url):
         logger.warning(
             f"Manifest URL'si beklenirken zaman aşımına uğradı. URL: {target_url}"
         )
+        # Sayfa yüklendiyse zaman aşımı siteden değil sayfa yapısından kaynaklanır.
+        challenged = host_guard.is_challenge_page(driver.title if driver else "")
+        host_guard.record(target_url, not challenged, "Cloudflare doğrulama sayfası")
         return None, None, None
     finally:
         if driver:
             driver.quit()
 
 
+def _yt_dlp_preexec():
+    """yt-dlp'yi kendi proses grubunda ve isteğe bağlı bellek sınırıyla başlatır."""
+    os.setsid()
+    limit = settings_cache.parse_size(config.DOWNLOAD_RLIMIT_AS)
+    if limit and resource is not None:
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+
 def download_with_yt_dlp(
-    conn,
-    item_id,
-    item_type,
     manifest_url,
     headers,
     cookie_filepath,
     output_template,
     speed_limit,
+    on_progress=None,
+    should_abort=None,
+    on_output=None,
+    format_spec=None,
 ):
-    """yt-dlp ile videoyu indirir ve ilerlemeyi veritabanına yazar."""
+    """
+    yt-dlp ile videoyu indirir. İlerleme yüzdesi on_progress'e, ilerleme dışındaki
+    çıktı satırları on_output'a iletilir; should_abort True döndürürse yt-dlp proses
+    grubu sonlandırılır. format_spec verilirse yt-dlp'ye -f olarak geçilir.
+    (başarılı_mı, mesaj, son_dosya_yolu) döndürür.
+    """
     command = [
         "yt-dlp",
         "--cookies",
@@ -117,11 +225,16 @@ def download_with_yt_dlp(
         "--progress",
         "--verbose",
         "--hls-use-mpegts",
+        "--no-simulate",
+        "--print",
+        f"after_move:{FILEPATH_MARKER}%(filepath)s",
         "-o",
         f"{output_template}.%(ext)s",
     ]
     if speed_limit:
         command.extend(["--limit-rate", speed_limit])
+    if format_spec:
+        command.extend(["-f", format_spec])
     for key, value in headers.items():
         command.extend(["--add-header", f"{key}: {value}"])
     command.append(manifest_url)
@@ -130,34 +243,82 @@ def download_with_yt_dlp(
         command,
         stdout=subprocess.PIPE,
         stderr=subprocess.STDOUT,
-        preexec_fn=os.setsid if sys.platform != "win32" else None,
+        preexec_fn=_yt_dlp_preexec if sys.platform != "win32" else None,
     )
-    full_output = ""
+    # Tüm çıktıyı biriktirmek yerine yalnızca son satırlar ve bilinen hata
+    # işaretleri tutulur; uzun indirmelerde bellek kullanımı sabit kalır.
+    recent_lines = collections.deque(maxlen=20)
+    seen_errors = set()
+    final_filepath = None
+    aborted = False
     for line_bytes in iter(process.stdout.readline, b""):
         line = line_bytes.decode("utf-8", errors="ignore")
-        full_output += line
+        if line.startswith(FILEPATH_MARKER):
+            final_filepath = line[len(FILEPATH_MARKER) :].rstrip("\r\n")
+            continue
+        recent_lines.append(line.rstrip("\r\n"))
+        for marker in YT_DLP_ERROR_MARKERS:
+            if marker in line:
+                seen_errors.add(marker)
+        if should_abort and should_abort():
+            aborted = True
+            _terminate_process_group(process)
+            break
         progress_match = re.search(r"\[download\]\s+([0-9\.]+)%", line)
         if progress_match:
-            try:
-                progress = float(progress_match.group(1))
-                _update_status_worker(conn, item_id, item_type, progress=progress)
-            except (ValueError, IndexError):
-                continue
+            if on_progress:
+                try:
+                    on_progress(float(progress_match.group(1)))
+                except (ValueError, IndexError):
+                    continue
+        elif on_output and line.strip():
+            on_output(line.rstrip("\r\n"))
     process.wait()
 
+    if aborted:
+        return False, "Hata: İndirme iptal edildi.", None
     if process.returncode == 0:
-        return True, "İndirme tamamlandı."
+        return True, "İndirme tamamlandı.", final_filepath
     else:
-        if "403 Forbidden" in full_output:
-            error_message = "Hata: Sunucu erişimi reddetti (403)."
-        elif "No space left on device" in full_output:
-            error_message = "Hata: Diskte yeterli alan yok."
-        elif "HTTP Error 404" in full_output:
-            error_message = "Hata: Video kaynağı bulunamadı (404)."
+        marker = next((m for m in YT_DLP_ERROR_MARKERS if m in seen_errors), None)
+        if marker:
+            error_message = YT_DLP_ERRORS[marker][1]
         else:
-            last_lines = "\n".join(full_output.strip().split("\n")[-5:])
+            last_lines = "\n".join(list(recent_lines)[-5:]).strip()
             error_message = f"Hata: İndirme başarısız oldu. Detay: ...{last_lines}"
-        return False, error_message
+        return False, error_message, None
+
+
+def download_error_code(message):
+    """Hata mesajının retry_policy hata kodu (bilinmeyen mesajlar 'unexpected')."""
+    for code, text in YT_DLP_ERRORS.values():
+        if message == text:
+            return code
+    if message == SOURCE_NOT_FOUND_MESSAGE:
+        return "manifest_timeout"
+    return retry_policy.DEFAULT_ERROR_CODE
+
+
+def _terminate_process_group(process):
+    try:
+        if sys.platform != "win32":
+            os.killpg(os.getpgid(process.pid), signal.SIGTERM)
+        else:
+            process.terminate()
+    except (ProcessLookupError, OSError):
+        pass
+
+
+def write_cookie_file(cookie_filepath, cookies):
+    """Selenium çerezlerini yt-dlp'nin okuyabileceği Netscape formatında yazar."""
+    with open(cookie_filepath, "w", encoding="utf-8") as f:
+        f.write("# Netscape HTTP Cookie File\n")
+        for cookie in cookies:
+            if "name" not in cookie or "value" not in cookie:
+                continue
+            f.write(
+                f"{cookie.get('domain', '')}\t{'TRUE'}\t{cookie.get('path', '/')}\t{'FALSE'}\t{int(cookie.get('expiry', 0))}\t{cookie['name']}\t{cookie['value']}\n"
+            )
 
 
 def to_ascii_safe(text):
@@ -183,143 +344,384 @@ def to_ascii_safe(text):
     return text
 
 
-def process_video(item_id, item_type):
-    global logger
-    logger = setup_logging()
-    conn = None
-    cookie_filepath = f"cookies_{item_id}_{item_type}.txt"
-    try:
-        conn = sqlite3.connect(config.DATABASE)
-        conn.row_factory = sqlite3.Row
-        settings = get_all_settings_from_db(conn)
-        base_download_folder = settings.get("DOWNLOADS_FOLDER", "downloads")
+def build_output_parts(conn, item_id, item_type, settings):
+    """
+    Kaydın kaynak URL'sini ve dosya adı şablonundan türetilen göreli çıktı yolunu
+    (klasör parçaları listesi olarak, uzantısız) döndürür. Kayıt yoksa (None, None).
+    """
+    if item_type == "movie":
+        item = conn.execute("SELECT * FROM movies WHERE id = ?", (item_id,)).fetchone()
+        if not item:
+            return None, None
+        filename_template = settings.get("FILENAME_TEMPLATE", "{title} - {year}")
+        filename_base = filename_template.format(
+            title=item["title"] or "Bilinmeyen", year=item["year"] or "YYYY"
+        )
+        return item["url"], [to_ascii_safe(filename_base)]
 
-        url_to_fetch = None
-        output_template = None
+    item = conn.execute(
+        """
+        SELECT e.*, s.season_number, ser.title as series_title
+        FROM episodes e
+        JOIN seasons s ON e.season_id = s.id
+        JOIN series ser ON s.series_id = ser.id
+        WHERE e.id = ?
+    """,
+        (item_id,),
+    ).fetchone()
+    if not item:
+        return None, None
+    filename_template = settings.get(
+        "SERIES_FILENAME_TEMPLATE",
+        "{series_title}/S{season_number:02d}E{episode_number:02d} - {episode_title}",
+    )
 
-        if item_type == "movie":
-            item = conn.execute(
-                "SELECT * FROM movies WHERE id = ?", (item_id,)
-            ).fetchone()
-            if not item:
-                return
-            url_to_fetch = item["url"]
-            filename_template = settings.get("FILENAME_TEMPLATE", "{title} - {year}")
-            filename_base = filename_template.format(
-                title=item["title"] or "Bilinmeyen", year=item["year"] or "YYYY"
-            )
-            output_template = os.path.join(
-                base_download_folder, to_ascii_safe(filename_base)
-            )
+    # Şablonu doldururken tüm bileşenlerin güvenli olduğundan emin ol
+    path_string = filename_template.format(
+        series_title=to_ascii_safe(item["series_title"]),
+        season_number=item["season_number"],
+        season_num=item["season_number"],
+        episode_number=item["episode_number"],
+        episode_num=item["episode_number"],
+        episode_title=to_ascii_safe(item["title"] or ""),
+    )
+    return item["url"], [part for part in path_string.split("/") if part]
 
-        elif item_type == "episode":
-            item = conn.execute(
-                """
-                SELECT e.*, s.season_number, ser.title as series_title
-                FROM episodes e
-                JOIN seasons s ON e.season_id = s.id
-                JOIN series ser ON s.series_id = ser.id
-                WHERE e.id = ?
+
+def quality_policy_for(conn, item_id, item_type, settings):
+    """Bölümler için dizinin kalite politikası, yoksa genel politika."""
+    if item_type == "episode":
+        row = conn.execute(
+            """
+            SELECT ser.quality_policy FROM episodes e
+            JOIN series ser ON ser.id = e.series_id
+            WHERE e.id = ?
             """,
-                (item_id,),
-            ).fetchone()
-            if not item:
-                return
-            url_to_fetch = item["url"]
-            filename_template = settings.get(
-                "SERIES_FILENAME_TEMPLATE",
-                "{series_title}/S{season_number:02d}E{episode_number:02d} - {episode_title}",
-            )
+            (item_id,),
+        ).fetchone()
+        if row and row[0]:
+            return row[0]
+    return settings.get("QUALITY_POLICY") or ""
 
-            # Şablonu doldururken tüm bileşenlerin güvenli olduğundan emin ol
-            path_string = filename_template.format(
-                series_title=to_ascii_safe(item["series_title"]),
-                season_number=item["season_number"],
-                season_num=item["season_number"],
-                episode_number=item["episode_number"],
-                episode_num=item["episode_number"],  # <-- BU SATIRI EKLEDİK
-                episode_title=to_ascii_safe(item["title"] or ""),
+
+def output_template_for(base_folder, output_parts):
+    """Göreli çıktı yolunu verilen klasör altında işletim sistemine uygun yola çevirir."""
+    output_template = os.path.join(base_folder, *output_parts)
+    os.makedirs(os.path.dirname(output_template) or ".", exist_ok=True)
+    return output_template
+
+
+def _status_after_download(settings):
+    """İndirme biter bitmez kaydın geçeceği durum; sonraki aşamalar ana süreçte çalışır."""
+    if settings.get("POSTPROCESS_FORMAT"):
+        return "İşleniyor"
+    if settings.get("STAGING_FOLDER"):
+        return "Taşınıyor"
+    return "Tamamlandı"
+
+
+def _prepare_source(conn, item_id, item_type, settings, url_to_fetch):
+    """
+    Tarayıcıyla manifesti, başlıkları ve çerezleri bulur; kalite politikasını
+    uygulayıp seçimi kayda yazar. Kaynak bulunamazsa None döndürür.
+    """
+    manifest_url, headers, cookies = find_manifest_url(url_to_fetch)
+    if not manifest_url:
+        return None
+    download_url, format_spec, quality = hls_variants.apply_quality_policy(
+        manifest_url,
+        headers,
+        cookies,
+        quality_policy_for(conn, item_id, item_type, settings),
+    )
+    if quality:
+        logger.info(f"ID {item_id} ({item_type}): Seçilen varyant: {quality}")
+        conn.execute(
+            f"UPDATE {'movies' if item_type == 'movie' else 'episodes'} "
+            "SET quality_info = ? WHERE id = ?",
+            (json.dumps(quality, ensure_ascii=False), item_id),
+        )
+        conn.commit()
+    return {
+        "manifest_url": manifest_url,
+        "download_url": download_url,
+        "format_spec": format_spec,
+        "headers": headers,
+        "cookies": cookies,
+    }
+
+
+def _save_resolved_source(conn, item_id, item_type, source):
+    conn.execute(
+        """
+        INSERT INTO resolved_manifests
+            (item_type, item_id, manifest_url, download_url, format_spec, headers, cookies, resolved_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (item_type, item_id) DO UPDATE SET
+            manifest_url = excluded.manifest_url, download_url = excluded.download_url,
+            format_spec = excluded.format_spec, headers = excluded.headers,
+            cookies = excluded.cookies, resolved_at = excluded.resolved_at,
+            attempts = attempts + 1
+        """,
+        (
+            item_type,
+            item_id,
+            source["manifest_url"],
+            source["download_url"],
+            source["format_spec"],
+            json.dumps(source["headers"] or {}),
+            json.dumps(source["cookies"] or []),
+            # Yeniden deneme için saklanan kaynak yaşını korur (MANIFEST_MAX_AGE).
+            source.get("resolved_at") or time.time(),
+        ),
+    )
+
+
+def store_resolved_source(conn, item_id, item_type, source):
+    """Hazırlanan kaynağı kaydeder ve işi 'Hazır' durumuna alır."""
+    table = "movies" if item_type == "movie" else "episodes"
+    _save_resolved_source(conn, item_id, item_type, source)
+    conn.execute(
+        f"UPDATE {table} SET status = ?, pid = NULL WHERE id = ?", (RESOLVED_STATUS, item_id)
+    )
+    conn.commit()
+
+
+def load_resolved_source(conn, item_id, item_type):
+    """MANIFEST_MAX_AGE içinde hazırlanmış kaynağı döndürür; yoksa None."""
+    row = conn.execute(
+        "SELECT * FROM resolved_manifests WHERE item_type = ? AND item_id = ? AND resolved_at >= ?",
+        (item_type, item_id, time.time() - config.MANIFEST_MAX_AGE),
+    ).fetchone()
+    if not row:
+        return None
+    return {
+        "manifest_url": row["manifest_url"],
+        "download_url": row["download_url"],
+        "format_spec": row["format_spec"],
+        "headers": json.loads(row["headers"]),
+        "cookies": json.loads(row["cookies"]),
+        "attempts": row["attempts"],
+        "resolved_at": row["resolved_at"],
+    }
+
+
+def source_is_fresh(source):
+    """
+    Önceden hazırlanan imzalı adresin hâlâ geçerli olup olmadığını tek bir istekle
+    kontrol eder. Sunucuya ulaşılamazsa karar yt-dlp'ye bırakılır.
+    """
+    try:
+        response = requests.get(
+            source["download_url"],
+            stream=True,
+            **hls_variants.request_options(source["headers"], source["cookies"]),
+        )
+        response.close()
+    except requests.exceptions.RequestException:
+        return True
+    return response.status_code not in EXPIRED_SOURCE_CODES
+
+
+def _enter_job(item_id, item_type, log_queue):
+    """Kaynak çözme ve indirme proseslerinin ortak başlangıcı."""
+    if sys.platform != "win32":
+        # Durdurma isteği proses grubuna gönderilir; web sunucusunun grubunu
+        # paylaşmamak için iş kendi oturumunda çalışır.
+        os.setsid()
+    setup_worker_logging(log_queue, job=job_key(item_type, item_id))
+    os.environ[JOB_ENV_VAR] = f"{item_type}:{item_id}"
+    os.environ[JOB_WORKER_PID_ENV_VAR] = str(os.getpid())
+    os.environ[JOB_DATABASE_ENV_VAR] = config.DATABASE
+    return logging.getLogger(JOB_OUTPUT_LOGGER)
+
+
+def _leave_job(conn, item_id, item_type, output_logger):
+    if conn:
+        try:
+            job_registry.unregister(conn, item_type, item_id, os.getpid())
+            conn.commit()
+        except sqlite3.Error:
+            logger.warning(f"ID {item_id} ({item_type}): İş kaydı silinemedi.", exc_info=True)
+        conn.close()
+    # Ana süreçteki arabelleğin diske kaydedilmesi için bitiş işareti.
+    output_logger.info("", extra={"job_only": True, "job_finished": True})
+
+
+def _record_failure(conn, item_id, item_type, error_code, message, source=None):
+    """Hatayı sınıflandırılmış olarak kaydeder; politika izin veriyorsa yeniden denemeyi planlar."""
+    try:
+        if source and retry_policy.keeps_source(error_code):
+            # Kaynak yeniden denemede tarayıcı açılmadan kullanılmak üzere saklanır.
+            _save_resolved_source(conn, item_id, item_type, source)
+        retry_policy.record_failure(conn, item_id, item_type, error_code, message)
+        conn.commit()
+    except sqlite3.Error as e:
+        logger.error(f"ID {item_id} ({item_type}): Hata durumu kaydedilemedi: {e}", exc_info=True)
+
+
+def _unexpected_error_code(error):
+    if isinstance(error, OSError) and error.errno == errno.ENOSPC:
+        return "enospc"
+    return retry_policy.DEFAULT_ERROR_CODE
+
+
+def _requeue_until_host_available(conn, item_id, item_type, error):
+    """Site erişilemezken iş hata sayılmaz; sıraya geri alınır."""
+    table = "movies" if item_type == "movie" else "episodes"
+    conn.execute(f"UPDATE {table} SET status = 'Sırada', pid = NULL WHERE id = ?", (item_id,))
+    conn.commit()
+    logger.warning(f"ID {item_id} ({item_type}): {error} İş sıraya geri alındı.")
+
+
+def resolve_video(item_id, item_type, log_queue=None):
+    """
+    Kaynak çözme aşaması: tarayıcıyla manifesti bulur, resolved_manifests
+    tablosuna yazar ve kaydı 'Hazır' durumuna alır. İndirme aşaması
+    (process_video) bu kaynağı tarayıcı açmadan kullanır.
+    """
+    output_logger = _enter_job(item_id, item_type, log_queue)
+    conn = None
+    try:
+        conn = sqlite3.connect(config.DATABASE)
+        conn.row_factory = sqlite3.Row
+        settings = settings_cache.get_all()
+        url_to_fetch, _ = build_output_parts(conn, item_id, item_type, settings)
+        if not url_to_fetch:
+            return
+        source = _prepare_source(conn, item_id, item_type, settings, url_to_fetch)
+        if source:
+            store_resolved_source(conn, item_id, item_type, source)
+            logger.info(f"ID {item_id} ({item_type}): Kaynak hazır, indirme slotu bekleniyor.")
+        else:
+            logger.warning(f"ID {item_id} ({item_type}): Manifest URL bulunamadı.")
+            _record_failure(
+                conn, item_id, item_type, "manifest_timeout", SOURCE_NOT_FOUND_MESSAGE
             )
-            # İşletim sistemine uygun yola dönüştür
-            final_path = os.path.join(base_download_folder, *path_string.split("/"))
+    except host_guard.HostUnavailable as e:
+        _requeue_until_host_available(conn, item_id, item_type, e)
+    except Exception as e:
+        logger.exception(
+            f"ID {item_id} ({item_type}): resolve_video içinde beklenmedik hata: {e}"
+        )
+        if conn:
+            _record_failure(
+                conn, item_id, item_type, _unexpected_error_code(e),
+                "Hata: Beklenmedik Sistem Hatası",
+            )
+    finally:
+        _leave_job(conn, item_id, item_type, output_logger)
 
-            # Dosya adını ve dizin yolunu ayır
-            final_dir = os.path.dirname(final_path)
-            safe_filename = os.path.basename(final_path)
 
-            os.makedirs(final_dir, exist_ok=True)
-            output_template = os.path.join(final_dir, safe_filename)
+def process_video(item_id, item_type, log_queue=None):
+    output_logger = _enter_job(item_id, item_type, log_queue)
+    table = "movies" if item_type == "movie" else "episodes"
+    conn = None
+    cookie_filepath = f"cookies_{item_id}_{item_type}.txt"
+    try:
+        conn = sqlite3.connect(config.DATABASE)
+        conn.row_factory = sqlite3.Row
+        # Ana süreçten devralınan görüntü; ayarlar değiştiyse yeniden okunur.
+        settings = settings_cache.get_all()
+        # Hazırlık klasörü tanımlıysa indirme önce hızlı yerel diske yapılır,
+        # kütüphaneye taşıma işini mover.py'deki havuz üstlenir.
+        staging_folder = settings.get("STAGING_FOLDER") or ""
+        base_download_folder = staging_folder or settings.get(
+            "DOWNLOADS_FOLDER", "downloads"
+        )
 
-        if not url_to_fetch or not output_template:
+        url_to_fetch, output_parts = build_output_parts(
+            conn, item_id, item_type, settings
+        )
+        if url_to_fetch is None and output_parts is None:
+            return
+        if not url_to_fetch or not output_parts:
             raise ValueError("URL veya çıktı şablonu oluşturulamadı.")
+        output_template = output_template_for(base_download_folder, output_parts)
 
-        _update_status_worker(conn, item_id, item_type, status="Kaynak aranıyor...")
-        manifest_url, headers, cookies = find_manifest_url(url_to_fetch)
-
-        if manifest_url:
-            with open(cookie_filepath, "w", encoding="utf-8") as f:
-                f.write("# Netscape HTTP Cookie File\n")
-                for cookie in cookies:
-                    if "name" not in cookie or "value" not in cookie:
-                        continue
-                    f.write(
-                        f"{cookie.get('domain', '')}\t{'TRUE'}\t{cookie.get('path', '/')}\t{'FALSE'}\t{int(cookie.get('expiry', 0))}\t{cookie['name']}\t{cookie['value']}\n"
-                    )
+        source = load_resolved_source(conn, item_id, item_type)
+        if source and not source_is_fresh(source):
+            if source["attempts"] < config.MANIFEST_MAX_RESOLVES:
+                # Slotu tarayıcıyla meşgul etmek yerine iş çözücü havuzuna geri verilir.
+                conn.execute(
+                    f"UPDATE {table} SET status = 'Sırada', pid = NULL WHERE id = ?", (item_id,)
+                )
+                conn.commit()
+                logger.warning(
+                    f"ID {item_id} ({item_type}): Hazır kaynağın süresi dolmuş; yeniden çözülecek."
+                )
+                return
+            source = None
+        conn.execute(
+            "DELETE FROM resolved_manifests WHERE item_type = ? AND item_id = ?",
+            (item_type, item_id),
+        )
+        conn.commit()
+        if source is None:
+            # Manuel başlatma veya süresi dolan kaynak: çözme bu proseste yapılır.
+            _update_status_worker(conn, item_id, item_type, status="Kaynak aranıyor...")
+            source = _prepare_source(conn, item_id, item_type, settings, url_to_fetch)
 
+        if source:
+            write_cookie_file(cookie_filepath, source["cookies"])
             _update_status_worker(conn, item_id, item_type, status="İndiriliyor")
 
-            success, message = download_with_yt_dlp(
-                conn,
-                item_id,
-                item_type,
-                manifest_url,
-                headers,
+            success, message, final_filepath = download_with_yt_dlp(
+                source["download_url"],
+                source["headers"],
                 cookie_filepath,
                 output_template,
-                settings.get("SPEED_LIMIT"),
+                str(settings_cache.get_typed("SPEED_LIMIT") or ""),
+                on_progress=lambda progress: _update_status_worker(
+                    conn, item_id, item_type, progress=progress
+                ),
+                on_output=lambda line: output_logger.info(line, extra={"job_only": True}),
+                format_spec=source["format_spec"],
             )
 
             if success:
-                files = glob.glob(f"{output_template}.*")
-                if files:
-                    final_filepath = files[0]
+                if final_filepath and os.path.isfile(final_filepath):
                     _update_status_worker(
                         conn,
                         item_id,
                         item_type,
-                        status="Tamamlandı",
+                        status=_status_after_download(settings),
                         progress=100,
                         filepath=final_filepath,
                     )
+                    retry_policy.clear(conn, table, item_id)
+                    conn.commit()
                     logger.info(
                         f"ID {item_id} ({item_type}): İndirme başarıyla tamamlandı. Dosya: {final_filepath}"
                     )
                 else:
-                    _update_status_worker(
-                        conn,
-                        item_id,
-                        item_type,
-                        status="Hata: İndirilen dosya bulunamadı",
+                    _record_failure(
+                        conn, item_id, item_type, retry_policy.DEFAULT_ERROR_CODE,
+                        "Hata: İndirilen dosya bulunamadı",
                     )
             else:
-                _update_status_worker(conn, item_id, item_type, status=message)
                 logger.error(f"ID {item_id} ({item_type}): İndirme hatası - {message}")
+                _record_failure(
+                    conn, item_id, item_type, download_error_code(message), message, source
+                )
         else:
-            _update_status_worker(
-                conn, item_id, item_type, status="Hata: Video kaynağı bulunamadı"
-            )
             logger.warning(f"ID {item_id} ({item_type}): Manifest URL bulunamadı.")
+            _record_failure(
+                conn, item_id, item_type, "manifest_timeout", SOURCE_NOT_FOUND_MESSAGE
+            )
 
+    except host_guard.HostUnavailable as e:
+        _requeue_until_host_available(conn, item_id, item_type, e)
     except Exception as e:
         logger.exception(
             f"ID {item_id} ({item_type}): process_video içinde beklenmedik hata: {e}"
         )
         if conn:
-            _update_status_worker(
-                conn, item_id, item_type, status="Hata: Beklenmedik Sistem Hatası"
+            _record_failure(
+                conn, item_id, item_type, _unexpected_error_code(e),
+                "Hata: Beklenmedik Sistem Hatası",
             )
     finally:
-        if conn:
-            conn.close()
         if os.path.exists(cookie_filepath):
             os.remove(cookie_filepath)
+        _leave_job(conn, item_id, item_type, output_logger)
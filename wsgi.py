@@ -0,0 +1,16 @@
+# @author: MembaCo.
+
+"""
+Üretim sunucusu giriş noktası.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+gunicorn.conf.py uygulamayı worker'lar fork edilmeden önce yükler (preload):
+veritabanı hazırlığı ve merkezi log dinleyicisi ana proseste bir kez kurulur,
+worker'lar ise yalnızca istekleri karşılar. Zamanlayıcı, worker'lar arasından
+seçilen tek bir lider proseste çalışır (bkz. scheduler.py).
+"""
+
+from app import app, boot
+
+boot()